@@ -0,0 +1,277 @@
+"""
+Headless batch match simulator for balance runs.
+
+Plays whole matches through stickman_core with no window, no sound and no
+frame pacing: the player is driven either by update_ai (mirrored to fight
+from the left) or by a small scripted policy that presses keys through the
+same move()/attack() path a human uses. Every match is seeded, so a run can
+be repeated exactly.
+
+Results are grouped by character, level and difficulty: win rate, how the
+round ended, time-to-kill percentiles and how much damage each attack
+(punch, fireball, shockwave, ...) did on both sides.
+
+    python stickman_balance.py --levels 1-10 --matches 500 --json balance.json
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+import pygame # Key constants only
+
+import stickman_core as core
+from stickman_core import CHARACTER_TYPES, FPS, GAME_DURATION_SECONDS, MAX_LEVEL, all_powerups
+from stickman_profiler import percentile
+
+DIFFICULTIES = ("Easy", "Medium", "Hard")
+CONTROLLERS = ("ai", "scripted")
+MAX_MATCH_STEPS = GAME_DURATION_SECONDS * FPS
+DAMAGE_BUCKET = 25 # HP per histogram bucket
+SCRIPTED_MELEE_RANGE = 55 # Punch and kick hitboxes reach a body about this far away
+
+
+class PressedKeys(frozenset):
+    """The set of held keys, indexable like pygame.key.get_pressed()."""
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        return key in self
+
+NO_KEYS = PressedKeys()
+
+
+def scripted_keys(player, enemy):
+    """A simple human-like policy: close in, combo, throw fireballs at range, block, ult when full."""
+    keys = set()
+    distance = abs(enemy.x - player.x)
+    toward = pygame.K_d if enemy.x > player.x else pygame.K_a
+
+    if player.ultimate_charge == player.max_ultimate_charge:
+        keys.add(pygame.K_u)
+        return PressedKeys(keys)
+
+    # Jump enemy fireballs heading our way
+    for p in core.projectiles:
+        if not p.is_player_projectile and 0 < (p.x - player.x) * -p.direction < 250:
+            keys.add(pygame.K_w)
+            break
+
+    if enemy.is_attacking and distance < 120 and random.random() < 0.3:
+        keys.add(pygame.K_s) # Block (and maybe parry)
+    elif 200 < distance < 600 and player.special_cooldown == 0:
+        keys.add(toward) # Face the enemy before casting
+        keys.add(pygame.K_l)
+    elif distance < SCRIPTED_MELEE_RANGE:
+        keys.add(toward) # Turn round if the enemy got behind us
+        keys.add(pygame.K_k if player.combo_step == 1 else pygame.K_j) # Punch, kick: combo
+    else:
+        keys.add(toward)
+    return PressedKeys(keys)
+
+
+POWERUPS_BY_NAME = {p['name']: p for p in all_powerups}
+
+
+def make_player_stats(character, char_level=0, powerups=0, powerup_names=()):
+    """
+    Fresh stats for `character` at an XP level, with the named power-ups
+    applied, then `powerups` more chosen at random.
+    """
+    stats = core.new_player_stats(character)
+    stats['level'] = char_level
+    for name in powerup_names:
+        core.apply_powerup(stats, POWERUPS_BY_NAME[name])
+    for _ in range(powerups):
+        core.apply_powerup(stats, random.choice(all_powerups))
+    return stats
+
+
+def simulate_match(character, level, difficulty, seed, controller="ai", char_level=0, powerups=0, powerup_names=()):
+    """Plays one match to the end and returns its result as a plain dict."""
+    random.seed(seed) # str seeds hash the same in every process
+    core.seed_match(seed)
+    core.set_cosmetics(False) # Particles and floating text can't change the outcome
+    player_stats = make_player_stats(character, char_level, powerups, powerup_names)
+    player, enemy = core.setup_level(player_stats, character, level, difficulty)
+
+    events = core.damage_events = []
+    player_ai = controller == "ai"
+    match_round = core.Round(level, player_ai=player_ai)
+    try:
+        # Stop as soon as the result is known; the round-over animation changes nothing
+        while not match_round.pending and match_round.steps < MAX_MATCH_STEPS + FPS: # Backstop
+            match_round.step(NO_KEYS if player_ai else scripted_keys(player, enemy))
+    finally:
+        core.damage_events = None
+    message = match_round.pending
+    steps = match_round.steps
+
+    dealt = {}
+    taken = {}
+    for target, _attacker, amount, source in events:
+        side = taken if target is player else dealt # Clone hits on the player count as taken
+        side[source] = side.get(source, 0.0) + amount
+
+    return {
+        'outcome': {"You Win!": "win", "You Lose!": "loss"}.get(message, "draw"),
+        'ko': not (player.is_alive and enemy.is_alive),
+        'seconds': steps / FPS,
+        'player_health': max(0.0, player.health),
+        'enemy_health': max(0.0, enemy.health),
+        'dealt': dealt,
+        'taken': taken,
+    }
+
+
+def histogram(values, bucket=DAMAGE_BUCKET):
+    """{bucket start: count} for non-negative values."""
+    counts = {}
+    for v in values:
+        start = int(v // bucket) * bucket
+        counts[start] = counts.get(start, 0) + 1
+    return dict(sorted(counts.items()))
+
+
+def summarize_damage(results, side):
+    """Per-source totals, per-match means and per-match damage histograms for 'dealt' or 'taken'."""
+    sources = sorted({source for r in results for source in r[side]})
+    summary = {}
+    for source in sources:
+        per_match = [r[side].get(source, 0.0) for r in results]
+        summary[source] = {
+            'total': sum(per_match),
+            'per_match_mean': sum(per_match) / len(per_match),
+            'histogram': histogram(per_match),
+        }
+    return summary
+
+
+def time_percentiles(times):
+    """p10/p50/p90 of sorted times, or None for each if there are none (not 0.0, which reads as an instant KO)."""
+    if not times:
+        return {'p10': None, 'p50': None, 'p90': None}
+    return {'p10': percentile(times, 0.10), 'p50': percentile(times, 0.50), 'p90': percentile(times, 0.90)}
+
+
+def summarize(results):
+    """Aggregates match results for one (character, level, difficulty)."""
+    n = len(results)
+    wins = [r for r in results if r['outcome'] == "win"]
+    losses = [r for r in results if r['outcome'] == "loss"]
+    kill_times = sorted(r['seconds'] for r in wins if r['ko'])
+    death_times = sorted(r['seconds'] for r in losses if r['ko'])
+    return {
+        'matches': n,
+        'win_rate': len(wins) / n if n else 0.0,
+        'loss_rate': len(losses) / n if n else 0.0,
+        'draw_rate': (n - len(wins) - len(losses)) / n if n else 0.0,
+        'ko_rate': sum(1 for r in results if r['ko']) / n if n else 0.0,
+        'time_to_kill': {
+            'count': len(kill_times),
+            **time_percentiles(kill_times),
+            'histogram': histogram(kill_times, bucket=5),
+        },
+        'time_to_death': {
+            'count': len(death_times),
+            **time_percentiles(death_times),
+        },
+        'damage_dealt': summarize_damage(results, 'dealt'),
+        'damage_taken': summarize_damage(results, 'taken'),
+    }
+
+
+def match_seed(base_seed, character, level, difficulty, index):
+    """Deterministic per-match seed, independent of run order (and of which process plays it)."""
+    return f"{base_seed}:{character}:{level}:{difficulty}:{index}"
+
+
+def run_config(character, level, difficulty, matches, base_seed=0, controller="ai", char_level=0, powerups=0):
+    """Plays `matches` seeded matches for one configuration and returns the raw results."""
+    return [simulate_match(character, level, difficulty, match_seed(base_seed, character, level, difficulty, i),
+                           controller, char_level, powerups)
+            for i in range(matches)]
+
+
+def parse_levels(text):
+    """'3', '1-10' or '1,4,7' -> list of levels."""
+    levels = []
+    for part in text.split(','):
+        if '-' in part:
+            first, last = part.split('-', 1)
+            levels.extend(range(int(first), int(last) + 1))
+        else:
+            levels.append(int(part))
+    for level in levels:
+        if not 1 <= level <= MAX_LEVEL:
+            raise argparse.ArgumentTypeError(f"level {level} is outside 1-{MAX_LEVEL}")
+    return levels
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Play headless AI-vs-AI matches and report balance statistics.")
+    parser.add_argument('--characters', nargs='+', choices=list(CHARACTER_TYPES), default=list(CHARACTER_TYPES))
+    parser.add_argument('--levels', type=parse_levels, default=list(range(1, MAX_LEVEL + 1)), help="e.g. 5, 1-10 or 1,4,7")
+    parser.add_argument('--difficulties', nargs='+', choices=DIFFICULTIES, default=list(DIFFICULTIES))
+    parser.add_argument('--matches', type=int, default=100, help="Matches per character/level/difficulty")
+    parser.add_argument('--seed', default="0", help="Base seed; the same seed replays the same matches")
+    parser.add_argument('--player', choices=CONTROLLERS, default="ai", help="Who drives the player: update_ai or the scripted policy")
+    parser.add_argument('--char-level', type=int, default=0, help="Player XP level (adds the character's level bonuses)")
+    parser.add_argument('--powerups', type=int, default=0, help="Random power-ups given to the player before each match")
+    parser.add_argument('--json', metavar='PATH', help="Also write the full summary (with histograms) here")
+    return parser
+
+
+def configs_from_args(args):
+    return [(character, level, difficulty)
+            for character in args.characters for level in args.levels for difficulty in args.difficulties]
+
+
+def format_seconds(value):
+    """A percentile column: '-' when there was nothing to measure."""
+    return "    -" if value is None else f"{value:5.1f}"
+
+
+def format_row(character, level, difficulty, summary):
+    ttk = summary['time_to_kill']
+    dealt = summary['damage_dealt']
+    total_dealt = sum(s['total'] for s in dealt.values()) or 1.0
+    top = sorted(dealt.items(), key=lambda item: -item[1]['total'])[:3]
+    sources = ", ".join(f"{name} {s['total'] / total_dealt:.0%}" for name, s in top)
+    return (f"{character:<8} L{level:<2} {difficulty:<6} win {summary['win_rate']:6.1%}  ko {summary['ko_rate']:6.1%}  "
+            f"ttk p10/p50/p90 {format_seconds(ttk['p10'])}/{format_seconds(ttk['p50'])}/{format_seconds(ttk['p90'])}s  "
+            f"dmg: {sources}")
+
+
+def write_report(rows, args, path):
+    """Writes every summary as JSON, keyed character -> level -> difficulty."""
+    report = {'settings': {k: v for k, v in vars(args).items() if k != 'json'}, 'results': {}}
+    for (character, level, difficulty), summary in rows:
+        report['results'].setdefault(character, {}).setdefault(str(level), {})[difficulty] = summary
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=4)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    rows = []
+    total_seconds = 0.0
+    start = time.perf_counter()
+    for character, level, difficulty in configs_from_args(args):
+        results = run_config(character, level, difficulty, args.matches, args.seed, args.player, args.char_level, args.powerups)
+        total_seconds += sum(r['seconds'] for r in results)
+        summary = summarize(results)
+        rows.append(((character, level, difficulty), summary))
+        print(format_row(character, level, difficulty, summary))
+    wall = time.perf_counter() - start
+
+    print(f"{sum(s['matches'] for _, s in rows)} matches, {total_seconds:.0f}s of game time in {wall:.1f}s "
+          f"({total_seconds / wall if wall else 0:.0f}x real time)")
+    if args.json:
+        write_report(rows, args, args.json)
+        print(f"Summary written to {args.json}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Broad-phase collision for Stickman Fighter.
+
+A uniform grid buckets every hitbox by the cells it overlaps, so finding what
+might touch what costs roughly O(n) instead of testing every pair. The core
+refills one grid each frame with bodies, attack hitboxes and projectiles,
+keeps the level's platforms in a second, static grid, and asks either one for
+overlapping pairs by kind and team.
+"""
+
+# Entry kinds
+BODY = 0
+ATTACK = 1
+PROJECTILE = 2
+PLATFORM = 3
+
+# Teams
+PLAYER_TEAM = 0
+ENEMY_TEAM = 1
+NO_TEAM = 2 # Platforms
+
+CELL_SIZE = 64 # Pixels; about two fireballs across
+LINEAR_SCAN_LIMIT = 16 # With this few entries, scanning them all beats walking the cells
+
+
+class SpatialGrid:
+    """
+    Uniform-grid broad phase over pygame Rects.
+    Entries remember their insertion order, and every result comes back in
+    that order, so callers get the same answers a plain list scan would give.
+    Rects are stored by reference: callers can reuse Rect objects frame to
+    frame, as long as they don't move them between insert and query.
+    The cells are only built once a lookup needs them, and small grids (a
+    normal 1v1 fight) never build them at all.
+    """
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {} # (cell_x, cell_y) -> [entry index, ...]
+        self.cells_built = True
+        self.objs = []
+        self.rects = []
+        self.kinds = []
+        self.teams = []
+
+    def clear(self):
+        """Removes every entry (the lists are reused, not reallocated)."""
+        self.cells.clear()
+        self.cells_built = True
+        self.objs.clear()
+        self.rects.clear()
+        self.kinds.clear()
+        self.teams.clear()
+
+    def __len__(self):
+        return len(self.objs)
+
+    def _cell_keys(self, rect):
+        size = self.cell_size
+        # Zero-area rects (e.g. an invulnerable body) give empty ranges: they can't collide anyway
+        for cell_x in range(rect.left // size, (rect.right - 1) // size + 1):
+            for cell_y in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                yield cell_x, cell_y
+
+    def insert(self, obj, rect, kind, team=NO_TEAM):
+        """Adds obj with its hitbox; returns its entry index."""
+        index = len(self.objs)
+        self.objs.append(obj)
+        self.rects.append(rect)
+        self.kinds.append(kind)
+        self.teams.append(team)
+        self.cells_built = False
+        return index
+
+    def _build_cells(self):
+        cells = self.cells
+        cells.clear()
+        for index, rect in enumerate(self.rects):
+            for key in self._cell_keys(rect):
+                bucket = cells.get(key)
+                if bucket is None:
+                    cells[key] = [index]
+                else:
+                    bucket.append(index)
+        self.cells_built = True
+
+    def _matches(self, i, kind, team):
+        return (kind is None or self.kinds[i] == kind) and (team is None or self.teams[i] == team)
+
+    def query(self, rect, kind=None, team=None):
+        """Objects whose hitboxes overlap rect, optionally filtered by kind/team."""
+        rects = self.rects
+        if len(rects) <= LINEAR_SCAN_LIMIT:
+            # Called several times every step: test the Rect (C) before the filters (Python)
+            kinds, teams, objs = self.kinds, self.teams, self.objs
+            return [objs[i] for i, r in enumerate(rects)
+                    if r.colliderect(rect) and (kind is None or kinds[i] == kind) and (team is None or teams[i] == team)]
+
+        if not self.cells_built:
+            self._build_cells()
+        found = set()
+        for key in self._cell_keys(rect):
+            for i in self.cells.get(key, ()):
+                if self._matches(i, kind, team) and rects[i].colliderect(rect):
+                    found.add(i)
+        return [self.objs[i] for i in sorted(found)]
+
+    def candidate_pairs(self, kind_a, team_a, kind_b, team_b):
+        """
+        Broad phase: entry index pairs (a, b), a of (kind_a, team_a) and b of
+        (kind_b, team_b), that share at least one cell. Each pair appears once,
+        sorted by a then b.
+        """
+        kinds, teams = self.kinds, self.teams
+        if len(kinds) <= LINEAR_SCAN_LIMIT:
+            # Every (a, b) of the right kinds is a candidate; colliding_pairs does the rest
+            side_a = [i for i in range(len(kinds)) if kinds[i] == kind_a and teams[i] == team_a]
+            side_b = [i for i in range(len(kinds)) if kinds[i] == kind_b and teams[i] == team_b]
+            return [(a, b) for a in side_a for b in side_b if a != b]
+
+        if not self.cells_built:
+            self._build_cells()
+        pairs = set()
+        for bucket in self.cells.values():
+            if len(bucket) < 2:
+                continue
+            side_a = [i for i in bucket if kinds[i] == kind_a and teams[i] == team_a]
+            if not side_a:
+                continue
+            side_b = [i for i in bucket if kinds[i] == kind_b and teams[i] == team_b]
+            for a in side_a:
+                for b in side_b:
+                    if a != b:
+                        pairs.add((a, b))
+        return sorted(pairs)
+
+    def colliding_pairs(self, kind_a, team_a, kind_b, team_b):
+        """Candidate pairs that really overlap, as (obj_a, obj_b) in insertion order."""
+        rects, objs = self.rects, self.objs
+        return [(objs[a], objs[b]) for a, b in self.candidate_pairs(kind_a, team_a, kind_b, team_b)
+                if rects[a].colliderect(rects[b])]
@@ -0,0 +1,1614 @@
+"""
+Headless simulation core for Stickman Fighter.
+
+Holds the game rules: Stickman physics and AI, damage, projectiles and the
+per-frame collision step. Nothing in here touches the display, the mixer or
+fonts, so it can be imported and stepped on a machine with no screen.
+stickman_fighter.py is the windowed front end on top of it.
+"""
+import pygame # Only used for Rect and key constants, never initialised here
+import random
+
+from stickman_collision import SpatialGrid, BODY, ATTACK, PROJECTILE, PLATFORM, PLAYER_TEAM, ENEMY_TEAM
+from stickman_particles import ParticleSystem
+from stickman_pool import ObjectPool
+from stickman_profiler import FrameProfiler
+
+# --- Game Constants ---
+SCREEN_WIDTH = 1600 # Made screen wider
+SCREEN_HEIGHT = 900 # Made screen taller
+FPS = 60 # Simulation steps per second
+SIM_DT = 1.0 / FPS # Seconds of game time covered by one step()
+GROUND_Y = 800 # Adjusted ground for new size
+SKY_COLOR = (20, 20, 40)
+GROUND_COLOR = (50, 50, 50)
+GAME_DURATION_SECONDS = 60 # 1 minute timer
+MAX_LEVEL = 10
+PROJECTILE_RADIUS = 15 # Fireballs and boss shockwaves
+PROJECTILE_POOL_SIZE = 64 # Far more than a fight ever has in flight; past it, shots are allocated as before
+TEXT_POOL_SIZE = 32 # Floating texts on screen at once; past it, new ones are skipped
+PARTICLE_CAPACITY = 20000 # Live particles; bigger bursts are trimmed
+
+# --- Colors ---
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+RED = (255, 0, 0)
+GREEN = (0, 255, 0)
+BLUE = (0, 0, 255)
+GRAY = (128, 128, 128)
+YELLOW = (255, 255, 0)
+PURPLE = (128, 0, 128)
+ORANGE = (255, 165, 0)
+LIGHT_GRAY = (170, 170, 170)
+LIGHT_GREEN = (144, 238, 144)
+LIGHT_RED = (240, 128, 128)
+LIGHT_ORANGE = (255, 200, 100)
+
+# --- Sound Effects ---
+# The core only triggers sounds by name. The front end fills this dict with
+# mixer Sounds; left empty (headless), play_sound does nothing.
+sounds = {}
+
+def play_sound(name, volume=0.7):
+    """Plays a sound from the loaded sounds dictionary."""
+    if name in sounds and not resimulating:
+        sounds[name].set_volume(volume)
+        sounds[name].play()
+
+# --- Global Lists (will be reset each level) ---
+projectiles = []
+particles = ParticleSystem(PARTICLE_CAPACITY) # Struct-of-arrays, see stickman_particles
+text_animations = []
+screen_shake = 0
+platforms = []
+player = None
+enemy = None
+clones = [] # For boss fight
+platform_grid = SpatialGrid() # Static: rebuilt only when the platforms change
+platform_tops = set() # Every platform's top y, for "is it standing on a platform" checks
+collision_grid = SpatialGrid() # Refilled by every check_collisions()
+profiler = FrameProfiler() # Disabled unless the front end (or a tool) turns it on
+# Two random streams, both seeded by seed_match(). Anything that can change how
+# a match plays out rolls `rng`; anything that only changes how it looks rolls
+# `cosmetic_rng` (or the particles' own generator), so drawing more, less or
+# nothing at all never shifts a gameplay roll.
+rng = random.Random()
+cosmetic_rng = random.Random()
+cosmetics_enabled = True # False skips particles and floating text entirely (headless / fast-forward)
+resimulating = False # True while netplay re-runs steps after a rollback: no sounds, and particles/text stand still
+damage_events = None # Set to a list to record (target, attacker, amount, source) for every hit; None = off
+
+def seed_match(seed):
+    """Seeds both RNG streams. The same seed and the same inputs replay the same match."""
+    rng.seed(seed)
+    cosmetic_rng.seed(f"{seed}:cosmetic") # Derived without drawing from `rng`
+    particles.seed(cosmetic_rng.getrandbits(64))
+
+def set_cosmetics(enabled):
+    """Turns particles and floating text on or off. Gameplay is identical either way."""
+    global cosmetics_enabled
+    cosmetics_enabled = enabled
+    particles.enabled = enabled
+    if not enabled:
+        particles.clear()
+        text_pool.release_all(text_animations)
+
+def set_resimulating(active):
+    """
+    Marks steps that are being re-run (rollback netplay). They were already
+    seen and heard once, so sounds, particles and floating text are skipped,
+    and the particles and text already on screen don't age either; unlike
+    set_cosmetics(False) nothing is cleared.
+    """
+    global resimulating
+    resimulating = active
+    particles.enabled = cosmetics_enabled and not active
+
+def show_text(text, x, y, color, font='special', lifespan=40):
+    """Queues a floating TextAnimation from text_pool, unless cosmetics are off."""
+    if cosmetics_enabled and not resimulating:
+        ta = text_pool.acquire(text, x, y, color, font, lifespan)
+        if ta is not None: # Pool full: this one is skipped
+            text_animations.append(ta)
+
+def record_damage(target, attacker, amount, source):
+    """Appends one hit to damage_events, if something is listening."""
+    if damage_events is not None and amount > 0:
+        damage_events.append((target, attacker, amount, source))
+
+# --- Character Definitions ---
+CHARACTER_TYPES = {
+    "Brawler": {
+        "color": BLUE,
+        "base_health": 120,
+        "base_damage": 12,
+        "base_speed": 6,
+        "special_move_type": "fireball", # Default for now, could be unique later
+        "ultimate_move_type": "meteor_slam",
+        "desc": "A balanced fighter with good health and damage. Gains +5 HP, +1 DMG, +0.1 SPD per level."
+    },
+    "Agile": {
+        "color": GREEN,
+        "base_health": 90,
+        "base_damage": 10,
+        "base_speed": 8,
+        "special_move_type": "fireball",
+        "ultimate_move_type": "meteor_slam",
+        "desc": "Fast and nimble, but with lower health. Gains +4 HP, +0.5 DMG, +0.2 SPD per level."
+    },
+    "Tank": {
+        "color": ORANGE,
+        "base_health": 150,
+        "base_damage": 10,
+        "base_speed": 5,
+        "special_move_type": "fireball",
+        "ultimate_move_type": "meteor_slam",
+        "desc": "High health, but slower movement. Gains +7 HP, +0.5 DMG, +0.05 SPD per level."
+    }
+}
+
+# XP Curve (example)
+XP_LEVELS = [
+    0,    # Level 0
+    100,  # Level 1
+    250,  # Level 2
+    450,  # Level 3
+    700,  # Level 4
+    1000, # Level 5
+    1350, # Level 6
+    1750, # Level 7
+    2200, # Level 8
+    2700, # Level 9
+    3250  # Level 10 (Max level for now)
+]
+
+# --- Power-Up Definitions ---
+all_powerups = [
+    {'name': 'Health Boost', 'effect': 'max_health', 'value': 25, 'desc': '+25 Max HP'},
+    {'name': 'Damage Up', 'effect': 'damage', 'value': 2, 'desc': '+2 Melee Damage'},
+    {'name': 'Speed Up', 'effect': 'speed', 'value': 0.5, 'desc': '+ Move Speed'},
+    {'name': 'Special Cooldown', 'effect': 'special_cd', 'value': -30, 'desc': 'Special Recharges Faster'},
+    {'name': 'Dash Cooldown', 'effect': 'dash_cd', 'value': -15, 'desc': 'Dash Recharges Faster'},
+    {'name': 'Teleport Cooldown', 'effect': 'teleport_cd', 'value': -20, 'desc': 'Teleport Recharges Faster'},
+    {'name': 'Full Heal', 'effect': 'full_heal', 'value': 0, 'desc': 'Restores all HP (for next level)'},
+    {'name': 'Critical Hit', 'effect': 'crit_chance', 'value': 0.1, 'desc': '+10% Crit Chance (2x Dmg)'},
+    {'name': 'Fireball Damage', 'effect': 'fireball_damage', 'value': 10, 'desc': '+10 Fireball Damage'},
+    {'name': 'Stomp Damage', 'effect': 'stomp_damage', 'value': 15, 'desc': '+15 Air Attack Damage'},
+    {'name': 'Ultimate Charge', 'effect': 'ult_charge_rate', 'value': 5, 'desc': '+5 Bonus Ult Charge on Hit'},
+    {'name': 'Air Dash', 'effect': 'max_air_dash', 'value': 1, 'desc': '+1 Max Air Dash'},
+    {'name': 'Ultimate Aura', 'effect': 'ult_aura', 'value': 1, 'desc': '+Dmg/Speed when Ult is full'},
+    {'name': 'Lifesteal', 'effect': 'lifesteal', 'value': 0.05, 'desc': 'Heal 5% of damage dealt'},
+    {'name': 'Reflect Projectiles', 'effect': 'reflect_projectiles', 'value': 1, 'desc': 'Blocking reflects fireballs'}
+]
+# Powerups the AI can receive
+ai_powerups = [p for p in all_powerups if p['effect'] not in ['full_heal', 'ult_aura', 'ult_charge_rate']]
+
+class TextAnimation:
+    """
+    Floating, fading text for special moves.
+    `font` is a key ('special' or 'level') the front end resolves to a real font.
+    Pooled (see text_pool): reset() reuses an instance for new text.
+    """
+    __slots__ = ('text', 'x', 'y', 'color', 'font', 'lifespan', 'max_lifespan')
+
+    def __init__(self, text="", x=0, y=0, color=WHITE, font='special', lifespan=40):
+        self.reset(text, x, y, color, font, lifespan)
+
+    def reset(self, text, x, y, color, font='special', lifespan=40):
+        self.text = text
+        self.x = int(x)
+        self.y = int(y)
+        self.color = color
+        self.font = font
+        self.lifespan = lifespan
+        self.max_lifespan = lifespan
+
+    def update(self):
+        self.y -= 1 # Float up
+        self.lifespan -= 1
+
+text_pool = ObjectPool(TextAnimation, TEXT_POOL_SIZE)
+
+class Projectile:
+    """
+    A fireball special move (or the boss's ground shockwave, kind='shockwave').
+    Pooled (see projectile_pool): reset() reuses an instance for a new shot.
+    """
+    __slots__ = ('x', 'y', 'prev_x', 'prev_y', 'direction', 'color', 'vel', 'radius', 'damage',
+                 'is_player_projectile', 'kind', 'hitbox')
+
+    def __init__(self, x=0, y=0, direction=1, color=RED, damage=0, is_player_projectile=False, kind='fireball'):
+        self.hitbox = pygame.Rect(0, 0, 0, 0) # Reused by get_hitbox() every frame
+        self.reset(x, y, direction, color, damage, is_player_projectile, kind)
+
+    def reset(self, x, y, direction, color, damage, is_player_projectile, kind='fireball'):
+        self.x = int(x)
+        self.y = int(y)
+        self.prev_x = self.x # Position at the previous step, for render interpolation
+        self.prev_y = self.y
+        self.direction = direction
+        self.color = color # This will be the "core" color
+        self.vel = 12 * direction
+        self.radius = PROJECTILE_RADIUS
+        self.damage = damage # Use passed-in damage
+        self.is_player_projectile = is_player_projectile
+        self.kind = kind # Damage source name for record_damage
+
+    def update(self):
+        self.x += self.vel
+
+    def get_hitbox(self):
+        self.hitbox.update(self.x - self.radius, self.y - self.radius, self.radius * 2, self.radius * 2)
+        return self.hitbox
+
+# Overflow on: dropping a shot would change the match, so an empty pool allocates instead
+projectile_pool = ObjectPool(Projectile, PROJECTILE_POOL_SIZE, overflow=True)
+
+def remove_projectile(p):
+    """Takes a projectile out of play and hands it back to projectile_pool."""
+    projectiles.remove(p)
+    projectile_pool.release(p)
+
+def pool_stats():
+    """{'projectiles' | 'text' | 'particles': occupancy dict} (see ObjectPool.stats())."""
+    return {'projectiles': projectile_pool.stats(), 'text': text_pool.stats(), 'particles': particles.stats()}
+
+def reset_pool_stats():
+    """Restarts every pool's high-water mark and miss counters."""
+    projectile_pool.reset_stats()
+    text_pool.reset_stats()
+    particles.reset_stats()
+
+class Stickman:
+    """
+    Represents both the Player and the Enemy.
+    Handles movement, attacking, and health. Drawing lives in the front end.
+    """
+    def __init__(self, x, y, color, is_player, character_type_name=None):
+        self.x = x
+        self.y = y
+        self.prev_x = x # Position at the previous step, for render interpolation
+        self.prev_y = y
+        self.color = color
+        self.is_clone = False # For boss clones
+        self.is_player = is_player # Which side: the left fighter, whose projectiles hit the right one
+        self.player_rules = is_player # Fights like the player: meteor slam, crits, lifesteal, reflect, hit charge
+        
+        self.width = 50
+        self.height = 100
+        
+        self.vel_x = 0
+        self.vel_y = 0
+        self.scale = 1.0 # For boss scaling
+        self.jump_power = 18
+        self.gravity = 0.9
+        self.on_ground = True
+        
+        # Stats that get modified by powerups
+        self.health = 100
+        self.max_health = 100
+        self.base_damage = 10 # Store base stats for auras
+        self.base_speed = 7
+        self.damage = 10
+        self.speed = 7
+        self.speed_multiplier = 1.0 # For AI
+        self.crit_chance = 0.0
+        self.fireball_damage = 30
+        self.stomp_damage = 15
+        self.ultimate_damage = 75 # Player ult damage
+        self.ult_charge_rate = 0 # Bonus ult charge
+        self.lifesteal = 0.0
+        self.can_reflect = False
+        self.has_ult_aura = False
+        
+        self.is_attacking = False
+        self.attack_type = "punch"
+        self.attack_frame = 0
+        self.attack_cooldown = 0
+        self.attack_hitbox = None
+        # Rects reused frame to frame instead of allocating new ones
+        self.attack_rect = pygame.Rect(0, 0, 0, 0)
+        self.body_rect = pygame.Rect(0, 0, 0, 0)
+        self.feet_rect = pygame.Rect(0, 0, 0, 0)
+        self.last_feet_rect = pygame.Rect(0, 0, 0, 0)
+        
+        self.combo_step = 0
+        self.combo_timer = 0
+        
+        self.special_cooldown = 0
+        self.max_special_cooldown = 180
+        
+        # New Ultimate stats
+        self.ultimate_charge = 0
+        self.max_ultimate_charge = 100
+        self.is_ulting = False
+        self.ult_step = 0 # 0: inactive, 1: rising/paused, 2: slamming
+        self.ult_timer = 0
+        self.ult_target_x = 0
+        self.ult_hit_count = 0 # For enemy ult
+        
+        self.dodge_cooldown = 0
+        
+        self.hit_duration = 0 # Red flash
+        self.is_alive = True
+        
+        self.is_dying = False 
+        self.death_anim_timer = 0
+        
+        self.is_blocking = False
+        self.parry_window = 0 # For parry mechanic
+        self.is_stunned = 0
+        
+        self.is_hit = False # New state for hit animation
+        self.hit_anim_timer = 0
+        
+        # --- Boss Specific ---
+        self.is_boss = False
+        self.shockwave_cooldown = 0
+        self.summon_cooldown = 0
+        
+        self.took_damage_this_round = False
+        # Dash state
+        self.dash_cooldown = 0
+        self.max_dash_cooldown = 60
+        self.dash_duration = 0
+        self.is_dashing = False
+        self.dash_invulnerability = 0
+        self.max_air_dash = 1 # New Air Dash
+        self.air_dash_count = 1
+        
+        # Teleport state
+        self.teleport_cooldown = 0
+        self.max_teleport_cooldown = 120
+        
+        self.walk_frame = 0
+        self.direction = 1 if is_player else -1
+
+        # --- Character Progression ---
+        self.character_type_name = character_type_name
+        self.level = 0
+        self.xp = 0
+
+
+    def move(self, keys):
+        """Handles player movement based on key presses."""
+        if not self.is_alive or self.is_dying or self.is_stunned > 0 or self.is_dashing or self.is_hit or self.is_ulting:
+            self.vel_x = 0
+            return
+            
+        # --- DASH LOGIC ---
+        if self.dash_cooldown > 0:
+            self.dash_cooldown -= 1
+        
+        if keys[pygame.K_LSHIFT] and self.dash_cooldown == 0:
+            if self.on_ground:
+                self.is_dashing = True
+                self.dash_duration = 10 # 1/6th of a second dash
+                self.dash_cooldown = self.max_dash_cooldown
+                self.dash_invulnerability = 10 # Invulnerable during dash
+                play_sound('dash')
+                particles.emit(self.x, self.y - 50, WHITE, 10) # Dash effect
+                return
+            elif self.air_dash_count > 0: # --- NEW AIR DASH ---
+                self.air_dash_count -= 1
+                self.is_dashing = True
+                self.dash_duration = 10
+                self.dash_cooldown = self.max_dash_cooldown
+                self.dash_invulnerability = 10
+                self.vel_y = 0 # Stop falling
+                play_sound('dash')
+                particles.emit(self.x, self.y - 50, WHITE, 10) # Dash effect
+                return
+            
+        # --- TELEPORT LOGIC ---
+        if self.teleport_cooldown > 0:
+            self.teleport_cooldown -= 1
+        
+        if keys[pygame.K_t] and self.teleport_cooldown == 0 and self.on_ground:
+            self.teleport_cooldown = self.max_teleport_cooldown
+            play_sound('teleport')
+            # Poof effect at old location
+            particles.emit(self.x, self.y - 50, PURPLE, 20)
+            
+            self.x += 250 * self.direction # Teleport distance
+            
+            # Poof effect at new location
+            particles.emit(self.x, self.y - 50, PURPLE, 20)
+            return
+
+        # --- BLOCKING & MOVEMENT ---
+        self.is_blocking = False # Default to not blocking
+        if keys[pygame.K_s] and self.on_ground:
+            self.is_blocking = True
+            self.parry_window = 10 # Parry is active for 10 frames
+
+        # --- NORMAL MOVEMENT ---
+        self.vel_x = 0
+        if keys[pygame.K_a]:
+            self.vel_x = -self.speed # Use speed stat
+            self.direction = -1
+        if keys[pygame.K_d]:
+            self.vel_x = self.speed # Use speed stat
+            self.direction = 1
+        
+        # Reduce speed if blocking
+        if self.is_blocking:
+            self.vel_x *= 0.5 # Half speed
+            
+        # Jump
+        if keys[pygame.K_w] and self.on_ground and not self.is_blocking: # Can't jump while blocking
+            self.vel_y = -self.jump_power
+            self.on_ground = False
+            play_sound('jump', volume=0.5)
+
+    def attack(self, keys, enemy_x): # Pass enemy_x for ult
+        """Handles player attacks."""
+        # --- ULTIMATE ATTACK ---
+        if keys[pygame.K_u] and self.ultimate_charge == self.max_ultimate_charge and not self.is_ulting:
+            if self.player_rules:
+                self.start_meteor_slam(enemy_x)
+                return
+            if self.on_ground: # A key-driven fighter built without player stats
+                self.start_shadow_barrage()
+                return
+
+        if self.attack_cooldown == 0 and self.is_alive and not self.is_dying and not self.is_blocking and self.is_stunned == 0 and not self.is_hit and not self.is_ulting:
+            # --- GROUND POUND ---
+            if not self.on_ground and keys[pygame.K_s]:
+                self.is_attacking = True
+                self.attack_type = "ground_pound"
+                self.attack_frame = 30 # Active until hits ground
+                self.attack_cooldown = 30
+                self.vel_y = 25 # Rocket downwards
+                self.vel_x = 0 # Stop horizontal movement
+            # Air Kick
+            elif not self.on_ground and keys[pygame.K_k]:
+                self.is_attacking = True
+                self.attack_type = "air_kick"
+                self.attack_frame = 20 # Duration of attack
+                self.attack_cooldown = 40 # Cooldown
+                self.vel_y = 15 # Go down fast
+                self.vel_x = 3 * self.direction
+            # Ground attacks
+            elif self.on_ground and keys[pygame.K_j]: # Punch
+                self.is_attacking = True
+                self.attack_type = "punch"
+                self.attack_frame = 15 # Duration of attack
+                self.attack_cooldown = 30 # Cooldown
+                play_sound('punch')
+                
+                # Combo logic
+                if self.combo_step == 0:
+                    self.combo_step = 1
+                    self.combo_timer = 30 # 0.5 seconds to press next key
+            elif self.on_ground and keys[pygame.K_k]: # Kick
+                self.is_attacking = True
+                self.attack_type = "kick"
+                self.attack_frame = 20 # Duration of attack
+                self.attack_cooldown = 40 # Cooldown
+                play_sound('kick')
+                
+                # Combo logic
+                if self.combo_step == 1 and self.combo_timer > 0:
+                    # COMBO SUCCESS!
+                    self.special_cooldown = 0 # Instantly fill special
+                    self.combo_step = 0
+                    self.combo_timer = 0
+                    show_text("COMBO!", self.x, self.y - 150, YELLOW)
+                else:
+                    # Reset combo if kick is pressed out of sequence
+                    self.combo_step = 0
+                    self.combo_timer = 0
+                    
+            elif self.on_ground and keys[pygame.K_l] and self.special_cooldown == 0: # Fireball
+                self.is_attacking = True
+                self.attack_type = "fireball"
+                self.attack_frame = 10 # Short casting animation
+                self.attack_cooldown = 20
+                self.special_cooldown = self.max_special_cooldown
+                # Spawn projectile in main loop
+                play_sound('fireball')
+                show_text("FIREBALL!", self.x + (50 * self.direction), self.y - 150, PURPLE)
+            
+            # Reset combo if any other key is pressed
+            if not keys[pygame.K_j] and not keys[pygame.K_k]:
+                if self.combo_step == 1 and not self.is_attacking:
+                    self.combo_step = 0 # Allows non-attack keys to not break combo
+                    
+    def start_shadow_barrage(self):
+        """Starts the enemy's ultimate: teleport behind the player and punch five times."""
+        self.is_ulting = True
+        self.ult_step = 1 # Teleport step
+        self.ultimate_charge = 0
+        self.dash_invulnerability = 60 # Invulnerable for 1 sec
+        self.is_attacking = False # Stop other attacks
+        self.is_blocking = False
+        show_text("SHADOW BARRAGE!", self.x, self.y - 150, PURPLE, font='level', lifespan=60)
+        play_sound('teleport', volume=1.0)
+
+    def start_meteor_slam(self, enemy_x):
+        """Starts the player's ultimate: teleport above enemy_x, hang, then slam down."""
+        self.is_ulting = True
+        self.ult_step = 1
+        self.ult_timer = 20 # Pause duration in air
+        self.ultimate_charge = 0
+        self.dash_invulnerability = 120 # Invulnerable for 2 seconds
+        self.ult_target_x = enemy_x
+        self.x = self.ult_target_x
+        self.y = 100 # Teleport high
+        self.vel_x = 0
+        self.vel_y = 0
+        self.is_attacking = False
+        self.is_blocking = False
+        show_text("METEOR SLAM!", self.x, self.y + 50, ORANGE, font='level', lifespan=60)
+        play_sound('stomp', volume=1.0)
+
+    def update_ai(self, player, current_level, use_boss_ai=True):
+        """
+        Controls the enemy AI. The boss falls back to it with use_boss_ai=False.
+        `player` is the opponent: the same AI can drive the player against the
+        enemy (headless balance runs), mirrored to face the other way.
+        """
+        if not self.is_alive or self.is_dying or self.is_stunned > 0 or self.is_dashing or self.is_hit or self.is_ulting:
+            self.vel_x = 0
+            return
+            
+        # --- BOSS AI ---
+        if self.is_boss and use_boss_ai:
+            self.update_boss_ai(player)
+            return
+        
+        # --- AI ULTIMATE ---
+        if self.player_rules and self.ultimate_charge == self.max_ultimate_charge and self.on_ground:
+            self.start_meteor_slam(player.x) # update() only knows how to play the player's ult
+            return
+        if self.ultimate_charge == self.max_ultimate_charge and self.on_ground:
+            self.start_shadow_barrage()
+        
+        if self.dash_cooldown > 0:
+            self.dash_cooldown -= 1
+        
+        if self.teleport_cooldown > 0:
+            self.teleport_cooldown -= 1
+            
+        if self.dodge_cooldown > 0:
+            self.dodge_cooldown -= 1
+            
+        # Stop moving if blocking
+        if self.is_blocking:
+            self.vel_x = 0
+            # AI will auto-stop blocking
+            if self.attack_cooldown > 0: # Cooldown is used to time the block
+                self.attack_cooldown -= 1
+            else:
+                self.is_blocking = False
+            return
+            
+        # --- AI Dodge Logic ---
+        if self.dodge_cooldown == 0 and self.on_ground:
+            # 1. Dodge Projectiles
+            for p in projectiles:
+                if p.is_player_projectile != self.is_player: # Opponent's projectile
+                    proj_dist = self.x - p.x if not self.is_player else p.x - self.x
+                    if 0 < proj_dist < 300 and abs(self.y - p.y) < 50:
+                        if rng.random() < 0.9: # 90% dodge chance
+                            self.vel_y = -self.jump_power * 0.8 # Smaller dodge jump
+                            play_sound('jump', volume=0.4)
+                            self.on_ground = False
+                            self.dodge_cooldown = 60
+                            break
+            # 2. Dodge/Block Melee
+            distance = abs(player.x - self.x)
+            if (player.is_attacking or (player.is_ulting and player.ult_step == 2)) and distance < 120 and self.dodge_cooldown == 0: # Also dodge meteor
+                roll = rng.random()
+                if roll < 0.4: # 40% chance to block
+                    self.is_blocking = True
+                    self.vel_x = 0
+                    self.parry_window = 10 # AI can parry too
+                    self.attack_cooldown = 30 # How long to hold block
+                    self.dodge_cooldown = 40
+                elif roll < 0.8: # 40% chance to dodge
+                    # New: 50/50 chance to dash or jump back
+                    if rng.random() < 0.5:
+                        self.vel_x = -7 * self.direction # Dash back
+                        self.dodge_cooldown = 40
+                    elif self.dash_cooldown == 0: # AI Dash
+                        self.is_dashing = True
+                        self.dash_duration = 10 
+                        self.dash_cooldown = self.max_dash_cooldown
+                        play_sound('dash')
+                        self.dash_invulnerability = 10
+                        self.vel_x = 25 * -self.direction # Dash away
+                # 20% chance to do nothing and get hit
+        
+        # If dodging, don't do other logic
+        if self.dodge_cooldown > 0:
+            return
+            
+        # Face the player
+        if player.x < self.x:
+            self.direction = -1
+            self.vel_x = -self.speed * self.speed_multiplier
+        else:
+            self.direction = 1
+            self.vel_x = self.speed * self.speed_multiplier
+            
+        # Stop moving if too close or too far
+        distance = abs(player.x - self.x)
+        
+        # --- AI Platform Logic ---
+        player_on_platform = player.y in platform_tops
+        ai_on_platform = self.y in platform_tops
+        
+        if player_on_platform and not ai_on_platform and self.on_ground:
+            # Find closest platform to player
+            closest_plat = min(platforms, key=lambda plat: abs(plat.centerx - player.x))
+            if abs(self.x - closest_plat.centerx) < 50:
+                if rng.random() < 0.05:
+                    self.vel_y = -self.jump_power
+                    play_sound('jump', volume=0.4)
+                    self.on_ground = False
+            else:
+                # Move towards that platform
+                if closest_plat.centerx < self.x:
+                    self.vel_x = -self.speed * self.speed_multiplier
+                else:
+                    self.vel_x = self.speed * self.speed_multiplier
+
+        elif not player_on_platform and ai_on_platform and distance > 100:
+            # If player is not on platform, just walk off
+            pass
+        
+        # --- AI Air Kick / Ground Pound ---
+        if not self.on_ground and self.y < player.y - 50 and abs(self.x - player.x) < 100 and self.attack_cooldown == 0:
+            roll = rng.random()
+            if roll < 0.05: # 5% chance for Air Kick
+                self.is_attacking = True
+                self.attack_type = "air_kick"
+                self.attack_frame = 20
+                self.attack_cooldown = 40
+                self.vel_y = 15
+            elif roll < 0.10: # 5% chance for Ground Pound
+                self.is_attacking = True
+                self.attack_type = "ground_pound"
+                self.attack_frame = 30
+                self.attack_cooldown = 30
+                self.vel_y = 25
+                self.vel_x = 0
+        
+        # --- AI Teleport ---
+        if self.teleport_cooldown == 0 and self.on_ground and distance > 400 and rng.random() < 0.02:
+            self.teleport_cooldown = self.max_teleport_cooldown
+            play_sound('teleport')
+            particles.emit(self.x, self.y - 50, PURPLE, 20)
+            self.x += 250 * self.direction # Teleport towards player
+            particles.emit(self.x, self.y - 50, PURPLE, 20)
+        
+        # AI Special Move Logic
+        if self.special_cooldown == 0 and player.is_alive and distance > 200 and distance < 500 and self.on_ground:
+            self.is_attacking = True
+            self.attack_type = "fireball"
+            self.attack_frame = 10
+            self.attack_cooldown = 20
+            self.special_cooldown = self.max_special_cooldown # AI has same cooldown
+            play_sound('fireball')
+            show_text("FIREBALL!", self.x + (50 * self.direction), self.y - 150, RED)
+        
+        # AI Melee Logic
+        elif distance < 80 and self.on_ground:
+            self.vel_x = 0
+            # AI attack logic
+            if self.attack_cooldown == 0 and player.is_alive:
+                self.is_attacking = True
+                self.attack_type = "punch" if rng.random() < 0.7 else "kick"
+                self.attack_frame = 15 if self.attack_type == "punch" else 20
+                play_sound('punch' if self.attack_type == "punch" else 'kick')
+                self.attack_cooldown = 50 # Slower attack rate for AI
+        elif distance > 400 and distance < 600: # Stay in this "mid-range"
+            self.vel_x = 0
+        elif distance >= 600: # Only move if very far
+            self.vel_x = 0
+        
+    def update_boss_ai(self, player):
+        """Unique AI for the final boss."""
+        # Cooldowns
+        if self.shockwave_cooldown > 0: self.shockwave_cooldown -= 1
+        if self.summon_cooldown > 0: self.summon_cooldown -= 1
+        
+        # --- Boss Unique Attacks ---
+        distance = abs(player.x - self.x)
+        
+        # 1. Summon Clones (when health is at 75% and 25%)
+        if (self.health < self.max_health * 0.75 and self.summon_cooldown == 0) or \
+           (self.health < self.max_health * 0.25 and self.summon_cooldown == 120): # Can summon twice
+            self.summon_cooldown = 600 # 10 second cooldown
+            self.is_attacking = True
+            self.attack_type = "kick" # Just a visual pose
+            self.attack_frame = 30
+            show_text("ARISE!", self.x, self.y - 150, PURPLE, font='level')
+            play_sound('teleport')
+            
+            # Summon two clones
+            clone1 = Stickman(self.x - 100, self.y, self.color, is_player=False)
+            clone1.is_clone = True
+            clone1.health = 1
+            clone1.max_health = 1
+            clone1.damage = 10
+            clone1.speed = 5
+            
+            clone2 = Stickman(self.x + 100, self.y, self.color, is_player=False)
+            clone2.is_clone = True
+            clone2.health = 1
+            clone2.max_health = 1
+            clone2.damage = 10
+            clone2.speed = 5
+            
+            clones.append(clone1)
+            clones.append(clone2)
+            return # Pause other actions while summoning
+
+        # 2. Ground Shockwave
+        if self.shockwave_cooldown == 0 and distance > 300 and self.on_ground:
+            self.shockwave_cooldown = 240 # 4 second cooldown
+            self.is_attacking = True
+            self.attack_type = "ground_pound"
+            self.attack_frame = 30
+            self.vel_y = 25 # Do the pound animation
+            self.vel_x = 0
+            # The shockwave projectile will be spawned in `update()` when it lands
+            return
+
+        # Use the normal AI for movement and basic attacks
+        self.update_ai(player, 10, use_boss_ai=False) # Pass level 10 to use the base AI logic
+
+    def update_clone_ai(self, player):
+        """Extremely simple AI for boss clones."""
+        if not self.is_alive or self.is_stunned > 0 or self.is_hit:
+            self.vel_x = 0
+            return
+        
+        # Always face and move towards the player
+        if player.x < self.x:
+            self.direction = -1
+            self.vel_x = -self.speed
+        else:
+            self.direction = 1
+            self.vel_x = self.speed
+        
+        # Simple attack
+        if abs(player.x - self.x) < 60 and self.attack_cooldown == 0:
+            self.is_attacking = True
+            self.attack_type = "punch"
+            self.attack_frame = 15
+            self.attack_cooldown = 60
+            play_sound('punch', volume=0.3)
+
+    def update(self):
+        """Updates the stickman's state each frame."""
+        global player, enemy, clones # Add this line to access the global player/enemy
+
+        # Hit flash and walk cycle tick here (not in drawing) so the
+        # simulation never depends on how often it gets rendered
+        if self.hit_duration > 0:
+            self.hit_duration -= 1
+        if self.on_ground and self.vel_x != 0 and not (self.is_hit or self.is_dashing or self.is_blocking):
+            self.walk_frame += 0.5
+
+        # Handle stun
+        if self.is_stunned > 0:
+            self.is_stunned -= 1
+            self.vel_x = 0
+            self.is_attacking = False
+            # Stun visual
+            return
+            
+        # Handle hit stun
+        if self.is_hit:
+            self.hit_anim_timer -= 1
+            self.vel_x = -2 * self.direction # Knockback
+            if self.hit_anim_timer <= 0:
+                self.is_hit = False
+            return # Stop other logic
+            
+        # --- AURA BUFFS (Player, or a versus enemy built from player stats) ---
+        if self.player_rules or self.has_ult_aura:
+            if self.has_ult_aura and self.ultimate_charge == self.max_ultimate_charge:
+                self.damage = self.base_damage + 2
+                self.speed = self.base_speed + 0.5
+            else:
+                self.damage = self.base_damage
+                self.speed = self.base_speed
+        
+        # --- DASH UPDATE ---
+        if self.dash_invulnerability > 0:
+            self.dash_invulnerability -= 1
+
+        if self.is_dashing:
+            self.dash_duration -= 1
+            self.vel_x = 25 * self.direction # Maintain dash speed
+            self.vel_y = 0 # No gravity during dash
+            if self.dash_duration % 2 == 0: # Leave a trail
+                particles.emit(self.x, self.y - 30, GRAY)
+            if self.dash_duration <= 0:
+                self.is_dashing = False
+                self.vel_x = 0
+        # --- END DASH UPDATE ---
+        
+        # --- ULTIMATE UPDATE ---
+        if self.is_ulting:
+            self.dash_invulnerability = 10 # Stay invulnerable
+            
+            if self.player_rules:
+                # --- Player Ult: Meteor Slam ---
+                if self.ult_step == 1: # Paused in air
+                    self.vel_x = 0
+                    self.vel_y = 0
+                    self.x = self.ult_target_x
+                    self.y = 100
+                    self.ult_timer -= 1
+                    # Spawn charging particles
+                    if self.ult_timer % 5 == 0:
+                        particles.emit(self.x + cosmetic_rng.randint(-20, 20), self.y, YELLOW)
+                    if self.ult_timer <= 0:
+                        self.ult_step = 2
+                elif self.ult_step == 2: # Slamming down
+                    self.is_attacking = True
+                    self.attack_type = "ultimate_pound"
+                    self.attack_frame = 2 # Keep it active
+                    self.vel_y = 40 # Rocket down
+                    self.vel_x = 0
+            
+            else:
+                # --- Enemy Ult: Shadow Barrage ---
+                if self.ult_step == 1: # Teleporting
+                    # Find player
+                    enemy = [s for s in [player, enemy] if not s.is_player][0]
+                    player = [s for s in [player, enemy] if s.is_player][0]
+                    # Teleport behind player
+                    self.x = player.x - (player.direction * 60)
+                    self.y = player.y
+                    self.direction = player.direction
+                    self.vel_x = 0
+                    self.vel_y = 0
+                    self.ult_step = 2
+                    self.ult_timer = 40 # Duration of the barrage
+                    self.ult_hit_count = 5 # 5 hits
+                
+                elif self.ult_step == 2: # Barraging
+                    self.vel_x = 0
+                    self.vel_y = 0
+                    self.ult_timer -= 1
+                    # At specific frames, do an attack
+                    if self.ult_timer % 8 == 0 and self.ult_hit_count > 0:
+                        self.is_attacking = True
+                        self.attack_type = "shadow_punch"
+                        self.attack_frame = 5
+                        play_sound('punch', volume=0.5)
+                        self.ult_hit_count -= 1
+                        # Create purple particles for shadow effect
+                        particles.emit(self.x, self.y - 50, PURPLE, 5)
+                    
+                    if self.ult_timer <= 0:
+                        self.is_ulting = False
+                        self.ult_step = 0
+                        self.is_attacking = False
+        # --- END ULTIMATE UPDATE ---
+            
+        # Handle dying animation first
+        if self.is_dying:
+            self.death_anim_timer -= 1
+            # Keep applying gravity
+            self.vel_y += self.gravity
+            self.y += self.vel_y
+            # Ground collision
+            if self.y > GROUND_Y:
+                self.y = GROUND_Y
+                self.vel_y = 0
+            
+            if self.death_anim_timer <= 0:
+                self.is_dying = False # Switch from "dying" to "dead"
+            return # Don't do any other logic
+            
+        # If dead and not dying, do nothing
+        if not self.is_alive:
+            return
+            
+        # Update combo timer
+        if self.combo_timer > 0:
+            self.combo_timer -= 1
+        if self.dodge_cooldown > 0:
+            self.dodge_cooldown -= 1
+        
+        # Update parry window
+        if self.parry_window > 0:
+            self.parry_window -= 1
+            
+        # Apply gravity (only if not dashing or ulting)
+        if not self.is_dashing and not self.is_ulting:
+            self.vel_y += self.gravity
+        
+        # Don't apply gravity if ground pounding
+        if self.is_attacking and self.attack_type == "ground_pound":
+            self.vel_y = 25
+        
+        if not (self.is_ulting and (self.ult_step == 1 or (not self.player_rules and self.ult_step == 2))): # Don't apply y vel if charging or shadow barraging
+            self.y += self.vel_y
+        
+        # Apply horizontal movement
+        # vel_x is set by move() or by is_dashing block
+        if not (self.is_ulting): # Don't apply x vel if ulting
+            self.x += self.vel_x
+        
+        # --- Platform Collision ---
+        on_platform = False
+        if self.vel_y > 0 and not self.is_dashing: # Only check if falling, not dashing
+            stick_rect = self.feet_rect
+            stick_rect.update(self.x - self.width * 0.25, self.y - self.height, self.width * 0.5, self.height)
+            
+            for plat in platform_grid.query(stick_rect, PLATFORM): # Only platforms actually touched
+                # Check if the stickman's *bottom* from last frame was *above* the platform's *top*
+                last_stick_rect = self.last_feet_rect
+                last_stick_rect.update(self.x - self.vel_x - self.width * 0.25, self.y - self.vel_y - self.height, self.width * 0.5, self.height)
+                if last_stick_rect.bottom <= plat.top:
+                    self.y = plat.top # Set feet to platform top
+                    self.vel_y = 0
+                    self.on_ground = True
+                    on_platform = True
+                    self.air_dash_count = self.max_air_dash # Reset air dash
+                    break
+        
+        # Ground collision
+        if not on_platform and self.y > GROUND_Y:
+            self.y = GROUND_Y
+            self.vel_y = 0
+            self.on_ground = True
+            self.air_dash_count = self.max_air_dash # Reset air dash
+            
+        # Screen boundaries
+        if self.x < self.width / 2:
+            self.x = self.width / 2
+        if self.x > SCREEN_WIDTH - self.width / 2:
+            self.x = SCREEN_WIDTH - self.width / 2
+            
+        # Update attack cooldown
+        if self.attack_cooldown > 0:
+            self.attack_cooldown -= 1
+            
+        # Update special cooldown
+        if self.special_cooldown > 0:
+            self.special_cooldown -= 1
+            
+        # Update attack animation
+        self.attack_hitbox = None
+        if self.is_attacking:
+            self.attack_frame -= 1
+            
+            # Define attack hitbox
+            if self.attack_type == "punch":
+                hitbox_x = self.x + (self.width * 0.5 * self.direction)
+                hitbox_y = self.y - self.height * 0.7
+                self.attack_hitbox = self._set_attack_rect(hitbox_x, hitbox_y, self.width * 0.6, self.height * 0.2)
+            elif self.attack_type == "kick":
+                hitbox_x = self.x + (self.width * 0.3 * self.direction)
+                hitbox_y = self.y - self.height * 0.2
+                self.attack_hitbox = self._set_attack_rect(hitbox_x, hitbox_y, self.width * 0.7, self.height * 0.2)
+            elif self.attack_type == "air_kick":
+                self.vel_y = 15 # Keep moving down
+                hitbox_y = self.y - self.height * 0.3
+                self.attack_hitbox = self._set_attack_rect(self.x - self.width * 0.2, hitbox_y, self.width * 0.4, self.height * 0.3)
+            elif self.attack_type == "ground_pound":
+                self.vel_y = 25 # Keep moving down fast
+                # Hitbox is a small area around the feet
+                self.attack_hitbox = self._set_attack_rect(self.x - 30, self.y - 20, 60, 40)
+            elif self.attack_type == "ultimate_pound":
+                self.vel_y = 40 # Keep moving down fast
+                # Hitbox is a LARGE area around the feet
+                self.attack_hitbox = self._set_attack_rect(self.x - 80, self.y - 40, 160, 60)
+            elif self.attack_type == "shadow_punch":
+                hitbox_x = self.x + (self.width * 0.5 * self.direction)
+                hitbox_y = self.y - self.height * 0.7
+                self.attack_hitbox = self._set_attack_rect(hitbox_x, hitbox_y, self.width * 0.6, self.height * 0.2)
+            # No hitbox for fireball, it creates a projectile
+            
+            # End attack
+            if self.attack_frame <= 0 and not self.is_ulting: # Don't end ult attack prematurely
+                self.is_attacking = False
+                self.attack_hitbox = None
+            
+            # End air kick / ground pound / ult on landing
+            if (self.attack_type == "air_kick" or self.attack_type == "ground_pound" or self.attack_type == "ultimate_pound") and self.on_ground:
+                self.is_attacking = False
+                self.attack_hitbox = None
+                
+                # Add a shockwave effect
+                if self.attack_type == "ground_pound" or self.attack_type == "ultimate_pound":
+                    pound_size = 15 if self.attack_type == "ground_pound" else 40
+                    screen_shake = 10 if self.attack_type == "ground_pound" else 20
+                    pound_text = "STOMP!" if self.attack_type == "ground_pound" else "METEOR!"
+                    play_sound('stomp')
+                    show_text(pound_text, self.x, self.y - 50, ORANGE)
+                    
+                    # Boss shockwave attack
+                    if self.is_boss and self.attack_type == "ground_pound":
+                        # Spawn a shockwave projectile
+                        shockwave = projectile_pool.acquire(self.x, GROUND_Y - 20, 1, RED, self.damage, False, kind='shockwave')
+                        projectiles.append(shockwave)
+                    
+                    particles.emit(self.x, self.y, ORANGE, pound_size, vel_x_range=(-5, 5), vel_y_range=(-3, 0)) # Only go up/out
+                
+                # Reset ult state AFTER landing
+                if self.attack_type == "ultimate_pound":
+                    self.is_ulting = False
+                    self.ult_step = 0
+                
+    def _set_attack_rect(self, x, y, width, height):
+        """Moves the reusable attack Rect and returns it."""
+        self.attack_rect.update(x, y, width, height)
+        return self.attack_rect
+
+    def get_hitbox(self):
+        """Returns the main body hitbox (the same Rect object every call)."""
+        if not self.is_alive or self.is_dying or self.is_dashing or self.is_hit:
+            self.body_rect.update(0, 0, 0, 0)
+        else:
+            self.body_rect.update(self.x - self.width * 0.25, self.y - self.height, self.width * 0.5, self.height)
+        return self.body_rect
+
+    def take_damage(self, damage, attacker, source=None):
+        """
+        Reduces health when hit. Attacker is the other stickman object.
+        `source` names the attack (punch, fireball, ...) for record_damage.
+        """
+        global screen_shake
+        if (self.is_alive and not self.is_dying) and self.dash_invulnerability == 0:
+            
+            # Check for Block
+            if self.is_blocking:
+                # Check if the hit is from the front
+                is_hit_from_front = (attacker.x < self.x and self.direction == -1) or \
+                                    (attacker.x > self.x and self.direction == 1)
+                
+                if is_hit_from_front:
+                    # --- PARRY LOGIC ---
+                    if self.parry_window > 0:
+                        attacker.is_stunned = 60 # Stun attacker for 1 second
+                        attacker.is_attacking = False # Cancel their attack
+                        show_text("PARRY!", self.x, self.y - 150, YELLOW, font='level', lifespan=40)
+                        particles.emit(self.x + 30 * self.direction, self.y - 60, YELLOW, 15)
+                        play_sound('parry')
+                        screen_shake = 15
+                        return # Successful parry
+
+                    # --- REGULAR BLOCK ---
+                    else:
+                        record_damage(self, attacker, min(damage * 0.2, self.health), source)
+                        self.health -= damage * 0.2 # Blocked, take 20% damage
+                        self.hit_duration = 5
+                        show_text("Blocked", self.x, self.y - 150, GRAY)
+                        play_sound('block')
+                        # Spawn block sparks
+                        particles.emit(self.x + 20 * self.direction, self.y - 50, WHITE, 3)
+                        return # Successfully blocked
+                else:
+                    # Hit from behind while blocking! Fall through to normal hit.
+                    pass
+                
+            # Normal hit (or hit from behind)
+            record_damage(self, attacker, min(damage, self.health), source)
+            self.health -= damage
+            self.took_damage_this_round = True
+            play_sound('hit')
+            self.hit_duration = 10 # Frames to flash red
+            self.is_hit = True # Trigger hit animation
+            self.hit_anim_timer = 15 # 0.25 seconds
+            self.is_attacking = False # Cancel current attack
+            show_text("Hit!", self.x, self.y - 150, RED) # Added Hit text
+            screen_shake = max(screen_shake, 5) # Add a small shake on hit
+            if self.health <= 0:
+                # If a clone is hit, it just dies
+                if self.is_clone:
+                    self.health = 0
+                    self.is_alive = False
+                    # No death animation for clones, they just disappear
+                    particles.emit(self.x, self.y - 50, PURPLE, 10)
+                    show_text("Faded", self.x, self.y - 150, PURPLE, font='special', lifespan=40)
+                    # No further logic for clones
+                    return
+
+                # Normal death logic for player/enemy
+                self.health = 0
+                self.is_alive = False
+                self.is_dying = True
+                self.death_anim_timer = 60 # 1 second animation
+                self.vel_x = 0 # Stop moving
+                # Added Dead text
+                show_text("Dead", self.x, self.y - 150, RED, font='level', lifespan=60)
+
+# --- Level Setup ---
+# Enemy stats per level: (health, speed multiplier, damage, is_boss)
+LEVEL_STATS = {
+    1: (100, 1.0, 5, False), 2: (120, 1.0, 7, False), 3: (140, 1.1, 9, False),
+    4: (160, 1.1, 11, False), 5: (200, 1.2, 13, False), 6: (220, 1.2, 15, False),
+    7: (250, 1.3, 16, False), 8: (280, 1.3, 17, False), 9: (320, 1.4, 18, False),
+    10: (600, 1.2, 25, True) # Boss level
+}
+
+def new_player_stats(character_name):
+    """Returns fresh progression/powerup stats for a character."""
+    char_info = CHARACTER_TYPES[character_name]
+    return {
+        'character_type': character_name,
+        'level': 0,
+        'xp': 0,
+        'current_level': 1, # Tracks game level progression (1-10)
+        'max_health': char_info['base_health'],
+        'damage': char_info['base_damage'],
+        'speed': char_info['base_speed'],
+        'color': char_info['color'],
+        'special_cd': 180, 'dash_cd': 60, 'teleport_cd': 120, 'crit_chance': 0.0,
+        'fireball_damage': 30, 'stomp_damage': 15, 'ultimate_damage': 75, 'ult_charge_rate': 0,
+        'ultimate_charge': 0, 'max_ultimate_charge': 100, 'full_heal_next_level': False,
+        'max_air_dash': 1, 'has_ult_aura': False, 'lifesteal': 0.0, 'reflect_projectiles': False
+    }
+
+def apply_powerup(player_stats, choice):
+    """Applies a chosen power-up from all_powerups to player_stats."""
+    effect = choice['effect']
+    value = choice['value']
+
+    if effect == 'full_heal':
+        player_stats['full_heal_next_level'] = True
+    elif effect == 'ult_aura':
+        player_stats['has_ult_aura'] = True
+    elif effect == 'lifesteal':
+        player_stats['lifesteal'] += value
+    elif effect == 'reflect_projectiles':
+        player_stats['reflect_projectiles'] = True
+    else:
+        player_stats[effect] += value
+        # Ensure cooldowns don't go below a minimum
+        if 'cd' in effect and player_stats[effect] < 30:
+            player_stats[effect] = 30
+
+def create_player(player_stats, character_name):
+    """Builds the player Stickman from saved stats plus character level bonuses."""
+    player = Stickman(200, GROUND_Y, player_stats['color'], is_player=True, character_type_name=character_name)
+    # Apply all stats from player_stats
+    player.max_health = player_stats['max_health']
+    if player_stats['full_heal_next_level']:
+        player.health = player_stats['max_health']
+        player_stats['full_heal_next_level'] = False # Consume buff
+    else:
+        player.health = player_stats['max_health'] # Heal to new max
+    player.base_damage = player_stats['damage'] # Set base stats
+    player.base_speed = player_stats['speed']
+    player.damage = player_stats['damage']
+    player.speed = player_stats['speed']
+    player.max_special_cooldown = player_stats['special_cd']
+    player.max_dash_cooldown = player_stats['dash_cd']
+    player.max_teleport_cooldown = player_stats['teleport_cd']
+    player.crit_chance = player_stats['crit_chance']
+    player.fireball_damage = player_stats['fireball_damage']
+    player.stomp_damage = player_stats['stomp_damage']
+    player.ultimate_damage = player_stats['ultimate_damage']
+    player.ult_charge_rate = player_stats['ult_charge_rate']
+    player.ultimate_charge = player_stats['ultimate_charge'] # Carry over ult charge
+    player.max_ultimate_charge = player_stats['max_ultimate_charge']
+    player.max_air_dash = player_stats['max_air_dash']
+    player.air_dash_count = player.max_air_dash
+    player.has_ult_aura = player_stats['has_ult_aura']
+    player.took_damage_this_round = False # Reset for the new round
+    player.lifesteal = player_stats['lifesteal']
+    player.can_reflect = player_stats['reflect_projectiles']
+    player.level = player_stats['level']
+    player.xp = player_stats['xp']
+
+    # Apply level bonuses
+    # Agile: +4 HP, +0.5 DMG, +0.2 SPD
+    # Brawler: +5 HP, +1 DMG, +0.1 SPD
+    # Tank: +7 HP, +0.5 DMG, +0.05 SPD
+    char_level_bonus_hp = 0
+    char_level_bonus_damage = 0
+    char_level_bonus_speed = 0
+    if player.character_type_name == "Agile": char_level_bonus_hp, char_level_bonus_damage, char_level_bonus_speed = player.level * 4, player.level * 0.5, player.level * 0.2
+    elif player.character_type_name == "Brawler": char_level_bonus_hp, char_level_bonus_damage, char_level_bonus_speed = player.level * 5, player.level * 1, player.level * 0.1
+    elif player.character_type_name == "Tank": char_level_bonus_hp, char_level_bonus_damage, char_level_bonus_speed = player.level * 7, player.level * 0.5, player.level * 0.05
+
+    player.max_health += char_level_bonus_hp
+    player.health += char_level_bonus_hp # Heal for bonus HP
+    player.damage += char_level_bonus_damage
+    player.speed += char_level_bonus_speed
+    return player
+
+def create_enemy(current_level, difficulty):
+    """Builds the enemy for a level, scaled by difficulty (Hard mode may add a powerup)."""
+    stats = LEVEL_STATS.get(current_level, LEVEL_STATS[10]) # Get stats or default to max
+    base_health, base_speed_mult, base_damage, is_boss = stats
+
+    # --- Apply Difficulty Modifiers ---
+    if difficulty == "Easy":
+        enemy_health = base_health * 0.75
+        enemy_damage = base_damage * 0.8
+        enemy_speed = base_speed_mult * 0.9
+    elif difficulty == "Hard":
+        enemy_health = base_health * 1.3
+        enemy_damage = base_damage * 1.25
+        enemy_speed = base_speed_mult * 1.15
+    else: # Medium
+        enemy_health = base_health
+        enemy_damage = base_damage
+        enemy_speed = base_speed_mult
+
+    enemy = Stickman(SCREEN_WIDTH - 200, GROUND_Y, RED, is_player=False)
+    enemy.max_health = enemy_health
+    enemy.health = enemy_health
+    enemy.speed_multiplier = enemy_speed
+    enemy.base_damage = enemy_damage # Set base stats
+    enemy.base_speed = 7
+    enemy.damage = enemy_damage
+    enemy.speed = 7
+    enemy.stomp_damage = 10 * (enemy_damage / 5) # Scale stomp too
+    enemy.is_boss = is_boss
+
+    if is_boss:
+        enemy.scale = 1.2 # Make boss bigger
+        enemy.color = (150, 0, 0) # Darker red
+        enemy.max_ultimate_charge = 150 # Boss needs more to ult
+
+    # --- Apply Enemy Powerups (Hard Mode) ---
+    if difficulty == "Hard" and current_level > 1 and (current_level - 1) % 3 == 0:
+        choice = rng.choice(ai_powerups)
+        effect = choice['effect']
+        value = choice['value']
+
+        if effect == 'max_health':
+            enemy.max_health += value
+            enemy.health = enemy.max_health
+        elif effect == 'damage':
+            enemy.damage += value
+        elif effect == 'speed':
+            enemy.speed_multiplier += 0.1 # AI speed is a multiplier
+        elif effect == 'special_cd':
+            enemy.max_special_cooldown = max(30, enemy.max_special_cooldown + value)
+        elif effect == 'dash_cd':
+            enemy.max_dash_cooldown = max(30, enemy.max_dash_cooldown + value)
+        elif effect == 'teleport_cd':
+            enemy.max_teleport_cooldown = max(30, enemy.max_teleport_cooldown + value)
+        # Other powerups are fine to add
+
+        show_text(f"Enemy {choice['name']}!", enemy.x, enemy.y - 150, RED, font='level', lifespan=60)
+    return enemy
+
+def rebuild_platform_grid():
+    """Re-indexes `platforms` for Stickman landing checks and the AI. Call after changing the list."""
+    platform_grid.clear()
+    platform_tops.clear()
+    for plat in platforms:
+        platform_grid.insert(plat, plat, PLATFORM)
+        platform_tops.add(plat.top)
+
+def reset_world():
+    """Clears every effect list and puts the level's platforms back."""
+    global screen_shake
+
+    # Reset lists in place so anything holding a reference stays valid
+    projectile_pool.release_all(projectiles)
+    particles.clear()
+    text_pool.release_all(text_animations)
+    clones.clear()
+    platforms.clear()
+    screen_shake = 0
+
+    # Create platforms
+    platforms.append(pygame.Rect(SCREEN_WIDTH * 0.2 - 75, GROUND_Y - 120, 150, 30))
+    platforms.append(pygame.Rect(SCREEN_WIDTH * 0.5 - 100, GROUND_Y - 200, 200, 30))
+    platforms.append(pygame.Rect(SCREEN_WIDTH * 0.8 - 75, GROUND_Y - 120, 150, 30))
+    rebuild_platform_grid()
+
+def setup_level(player_stats, character_name, current_level, difficulty):
+    """Resets the world and spawns the fighters for a level."""
+    global player, enemy
+    reset_world()
+    player = create_player(player_stats, character_name)
+    enemy = create_enemy(current_level, difficulty)
+    return player, enemy
+
+def setup_versus(left_stats, left_character, right_stats, right_character):
+    """
+    Resets the world for a two-player match. Both fighters are built like the
+    player; the right one becomes `enemy` and is driven by step()'s enemy_keys.
+    """
+    global player, enemy
+    reset_world()
+    player = create_player(left_stats, left_character)
+    enemy = create_player(right_stats, right_character)
+    enemy.is_player = False # Right-hand side; it keeps player_rules, so both sides play by the same rules
+    enemy.x = enemy.prev_x = SCREEN_WIDTH - 200
+    enemy.direction = -1
+    if enemy.color == player.color:
+        enemy.color = RED # Tell a mirror match apart
+    return player, enemy
+
+# --- Simulation Step ---
+
+def step(keys, current_level, round_active=True, player_ai=False, enemy_keys=None):
+    """
+    Advances the match by one frame.
+    `keys` is anything indexable by pygame key constants (e.g. pygame.key.get_pressed()).
+    With player_ai=True the player is driven by update_ai instead and `keys` is ignored.
+    With enemy_keys the enemy is driven by those keys (netplay versus) instead of update_ai.
+    While the round-over animation plays (round_active=False) fighters keep
+    falling and animating but take no input and deal no damage.
+    """
+    global screen_shake
+    profiler.mark('other') # Whatever the caller did since its last mark
+    if screen_shake > 0:
+        screen_shake -= 1
+
+    # Remember where everything was so the renderer can interpolate
+    for s in (player, enemy, *clones):
+        s.prev_x, s.prev_y = s.x, s.y
+    for p in projectiles:
+        p.prev_x, p.prev_y = p.x, p.y
+
+    # --- Update ---
+    if round_active:
+        if player_ai:
+            player.update_ai(enemy, current_level)
+        else:
+            player.move(keys)
+            player.attack(keys, enemy.x) # Pass enemy_x for ult
+
+    player.update()
+
+    if round_active:
+        if enemy_keys is not None:
+            enemy.move(enemy_keys)
+            enemy.attack(enemy_keys, player.x)
+        else:
+            enemy.update_ai(player, current_level)
+
+    enemy.update()
+
+    # Update clones
+    for clone in clones:
+        clone.update_clone_ai(player)
+        clone.update()
+
+    profiler.mark('fighters')
+
+    # --- Handle Projectile Spawning ---
+    if round_active:
+        if player.is_attacking and player.attack_type == "fireball" and player.attack_frame == 5:
+            projectiles.append(projectile_pool.acquire(player.x, player.y - player.height * 0.7, player.direction, PURPLE, player.fireball_damage, True))
+
+        if enemy.is_attacking and enemy.attack_type == "fireball" and enemy.attack_frame == 5:
+            projectiles.append(projectile_pool.acquire(enemy.x, enemy.y - enemy.height * 0.7, enemy.direction, RED, enemy.fireball_damage, False))
+
+    # --- Update Effects ---
+    for p in projectiles[:]:
+        p.update()
+        if not (0 < p.x < SCREEN_WIDTH):
+            if p in projectiles:
+                remove_projectile(p)
+
+    # Particles and floating text aren't rolled back, so re-run steps mustn't age them again
+    if not resimulating:
+        particles.update()
+
+        for ta in text_animations[:]:
+            ta.update()
+            if ta.lifespan <= 0:
+                if ta in text_animations:
+                    text_animations.remove(ta)
+                    text_pool.release(ta)
+
+    # Remove dead clones
+    for c in clones[:]:
+        if not c.is_alive:
+            clones.remove(c)
+    profiler.mark('effects')
+
+    # --- Check Collisions ---
+    if round_active:
+        check_collisions()
+    profiler.mark('collisions')
+
+def fill_collision_grid():
+    """Indexes this frame's bodies, attack hitboxes and projectiles by team."""
+    collision_grid.clear()
+    collision_grid.insert(player, player.get_hitbox(), BODY, PLAYER_TEAM)
+    collision_grid.insert(enemy, enemy.get_hitbox(), BODY, ENEMY_TEAM)
+    if player.attack_hitbox:
+        collision_grid.insert(player, player.attack_hitbox, ATTACK, PLAYER_TEAM)
+    for attacker in [enemy] + clones:
+        if attacker.attack_hitbox:
+            collision_grid.insert(attacker, attacker.attack_hitbox, ATTACK, ENEMY_TEAM)
+    for p in projectiles:
+        collision_grid.insert(p, p.get_hitbox(), PROJECTILE, PLAYER_TEAM if p.is_player_projectile else ENEMY_TEAM)
+
+def check_collisions():
+    """Resolves melee, clone and projectile hits for the current frame."""
+    fill_collision_grid()
+
+    # Melee, each side on the other
+    if player.attack_hitbox and enemy in collision_grid.query(player.attack_hitbox, BODY, ENEMY_TEAM):
+        melee_hit(player, enemy)
+    if enemy.attack_hitbox and player in collision_grid.query(enemy.attack_hitbox, BODY, PLAYER_TEAM):
+        melee_hit(enemy, player)
+
+    # Clone attacks player
+    if clones:
+        attackers_on_player = collision_grid.query(player.body_rect, ATTACK, ENEMY_TEAM)
+        for clone in clones:
+            if clone.attack_hitbox and clone in attackers_on_player:
+                player.take_damage(clone.damage, clone, 'clone')
+                particles.emit(clone.attack_hitbox.centerx, clone.attack_hitbox.centery, PURPLE, 3)
+                clone.attack_hitbox = None
+                break # Only one clone can hit per frame
+
+    # --- Projectile Collisions ---
+    if projectiles:
+        check_projectile_collisions()
+
+    # Cap ultimate charge
+    player.ultimate_charge = min(player.ultimate_charge, player.max_ultimate_charge)
+    enemy.ultimate_charge = min(enemy.ultimate_charge, enemy.max_ultimate_charge)
+
+def check_projectile_collisions():
+    """Projectile clashes and projectile hits on either fighter. Uses the grid check_collisions() filled."""
+    # Projectile vs Projectile (Clash): each fireball cancels at most one from the other side
+    clashed = set()
+    for p1, p2 in collision_grid.colliding_pairs(PROJECTILE, PLAYER_TEAM, PROJECTILE, ENEMY_TEAM):
+        if p1 in clashed or p2 in clashed:
+            continue
+        # CLASH
+        particles.emit(p1.x, p1.y, ORANGE, 15)
+        play_sound('clash')
+        show_text("CLASH!", p1.x, p1.y, WHITE, lifespan=20)
+        clashed.add(p1)
+        clashed.add(p2)
+    if clashed:
+        projectiles[:] = [p for p in projectiles if p not in clashed]
+        for p in clashed:
+            projectile_pool.release(p)
+
+    # Projectile vs Stickman
+    hits_on_enemy = {p for p, _ in collision_grid.colliding_pairs(PROJECTILE, PLAYER_TEAM, BODY, ENEMY_TEAM)}
+    hits_on_player = {p for p, _ in collision_grid.colliding_pairs(PROJECTILE, ENEMY_TEAM, BODY, PLAYER_TEAM)}
+    for p in projectiles[:]:
+        if p.is_player_projectile and p in hits_on_enemy: # Player's fireball
+            projectile_hit(p, player, enemy)
+        elif not p.is_player_projectile and p in hits_on_player: # Enemy's fireball
+            projectile_hit(p, enemy, player)
+
+def melee_hit(attacker, target):
+    """
+    Resolves `attacker`'s landed melee hit on `target`. A fighter with
+    player_rules can crit, heals by its lifesteal and gains charge by attack
+    type; anyone else gets a flat +15 charge.
+    """
+    if attacker.player_rules:
+        # Check for crit
+        is_crit = rng.random() < attacker.crit_chance
+        crit_bonus_ult = 5 if is_crit else 0
+
+        # Check for attack type
+        if attacker.attack_type == "punch" or attacker.attack_type == "kick":
+            dmg = attacker.damage * (2 if is_crit else 1)
+            target.take_damage(dmg, attacker, attacker.attack_type)
+            attacker.ultimate_charge += (10 + attacker.ult_charge_rate + crit_bonus_ult)
+            attacker.health = min(attacker.max_health, attacker.health + (dmg * attacker.lifesteal)) # Lifesteal
+            if is_crit:
+                show_text("CRIT!", attacker.attack_hitbox.centerx, attacker.attack_hitbox.centery, YELLOW, font='level', lifespan=30)
+
+        elif attacker.attack_type == "air_kick" or attacker.attack_type == "ground_pound":
+            dmg = attacker.stomp_damage * (2 if is_crit else 1)
+            target.take_damage(dmg, attacker, attacker.attack_type)
+            attacker.ultimate_charge += (15 + attacker.ult_charge_rate + crit_bonus_ult)
+            attacker.health = min(attacker.max_health, attacker.health + (dmg * attacker.lifesteal)) # Lifesteal
+            if is_crit:
+                show_text("CRIT!", attacker.attack_hitbox.centerx, attacker.attack_hitbox.centery, YELLOW, font='level', lifespan=30)
+
+        elif attacker.attack_type == "ultimate_pound":
+            dmg = attacker.ultimate_damage
+            target.take_damage(dmg, attacker, attacker.attack_type) # Ult damage
+            attacker.ultimate_charge += 20 # Bonus for landing
+            attacker.health = min(attacker.max_health, attacker.health + (dmg * attacker.lifesteal)) # Lifesteal
+            # Knockback (Increased)
+            target.is_hit = True
+            target.hit_anim_timer = 45
+            target.vel_y = -25
+            target.vel_x = 25 * -attacker.direction
+    else:
+        dmg = attacker.damage
+        if attacker.attack_type == "air_kick" or attacker.attack_type == "ground_pound":
+            dmg = attacker.stomp_damage
+        elif attacker.attack_type == "shadow_punch":
+            dmg = attacker.damage * 0.75 # Ult hits are fast but weaker
+
+        target.take_damage(dmg, attacker, attacker.attack_type)
+        attacker.ultimate_charge = min(attacker.ultimate_charge + 15, attacker.max_ultimate_charge)
+
+    particles.emit(attacker.attack_hitbox.centerx, attacker.attack_hitbox.centery, YELLOW, 5)
+    attacker.attack_hitbox = None
+
+def projectile_hit(p, owner, target):
+    """
+    Resolves projectile `p` from `owner`'s side reaching `target`. A blocking
+    target with player_rules and a reflect power-up sends a frontal hit back
+    as its own; otherwise it takes the damage and the owner gains charge.
+    """
+    # --- Projectile Reflection Logic ---
+    if target.player_rules and target.is_blocking and target.can_reflect:
+        is_hit_from_front = (p.x < target.x and target.direction == -1) or \
+                            (p.x > target.x and target.direction == 1)
+        if is_hit_from_front:
+            p.is_player_projectile = target.is_player
+            p.direction *= -1
+            p.vel *= -1
+            play_sound('parry', volume=0.8)
+            show_text("Reflect!", target.x, target.y - 150, BLUE)
+            return
+    dmg = p.damage
+    target.take_damage(dmg, owner, p.kind)
+    if owner.player_rules:
+        owner.ultimate_charge += (15 + owner.ult_charge_rate)
+        owner.health = min(owner.max_health, owner.health + (dmg * owner.lifesteal)) # Lifesteal
+    else:
+        owner.ultimate_charge = min(owner.ultimate_charge + 15, owner.max_ultimate_charge)
+    particles.emit(p.x, p.y, p.color, 10)
+    if p in projectiles: remove_projectile(p)
+
+def check_round_over(time_remaining):
+    """
+    Checks whether the round just ended.
+    Returns (message, delay_frames), or ("", 0) while the fight goes on.
+    """
+    if not player.is_alive:
+        play_sound('lose')
+        return "You Lose!", 60 # 1 second death animation
+    elif not enemy.is_alive:
+        play_sound('win')
+        return "You Win!", 60 # 1 second death animation
+    elif time_remaining == 0:
+        # 1 frame delay to show message
+        if player.health > enemy.health:
+            play_sound('win')
+            return "You Win!", 1
+        elif enemy.health > player.health:
+            play_sound('lose')
+            return "You Lose!", 1
+        else:
+            return "Draw!", 1
+    return "", 0
+
+class Round:
+    """
+    One level's fight: the step counter, the round timer and the round-over delay.
+    The timer counts simulation steps, not wall-clock time, so a replay (or a
+    headless run) ends exactly where the original did.
+    """
+    def __init__(self, current_level, player_ai=False):
+        self.current_level = current_level
+        self.player_ai = player_ai
+        self.steps = 0
+        self.time_remaining = GAME_DURATION_SECONDS
+        self.game_over_timer = 0 # Frames left of the death/round-over animation
+        self.pending = "" # Result waiting for that animation to finish
+        self.result = "" # "You Win!", "You Lose!" or "Draw!" once the round is over
+
+    def step(self, keys, enemy_keys=None):
+        """Advances one simulation step. Returns the result once the round-over animation has played."""
+        self.time_remaining = max(0, GAME_DURATION_SECONDS - self.steps // FPS)
+        step(keys, self.current_level, round_active=(self.game_over_timer == 0), player_ai=self.player_ai,
+             enemy_keys=enemy_keys)
+        self.steps += 1
+
+        if self.game_over_timer == 0:
+            self.pending, self.game_over_timer = check_round_over(self.time_remaining)
+        if self.game_over_timer > 0:
+            self.game_over_timer -= 1
+            if self.game_over_timer == 0:
+                self.result = self.pending
+        return self.result
@@ -0,0 +1,82 @@
+"""
+Dirty-rectangle presentation for Stickman Fighter.
+
+The fight is still drawn in full every frame (mostly one background blit),
+but with software SDL the expensive part is pushing 1600x900 pixels to the
+window. DirtyRectPresenter collects the rects that can have changed since
+the last frame (fighters, projectiles, particles, floating text, changed HUD
+regions) and hands only those, plus last frame's, to
+pygame.display.update(). Last frame's rects are needed too: that is where
+the moved things have to be erased.
+
+It falls back to a full flip for frames marked with invalidate() (level
+start, screen shake and the frame after it) and whenever the dirty area is
+over max_fraction of the screen. Rects are in window pixels; draw_match
+maps those of a scaled render target (see stickman_view) before adding them.
+"""
+import pygame
+
+DIRTY_MAX_FRACTION = 0.5 # Above this much of the screen a full flip is cheaper than the rect list
+
+
+class DirtyRectPresenter:
+    """
+    Call add() for everything drawn that may differ from the previous frame
+    (in window pixels), then present() instead of pygame.display.flip().
+    While `enabled` is False, present() just flips.
+    """
+    def __init__(self, max_fraction=DIRTY_MAX_FRACTION, enabled=False):
+        self.max_fraction = max_fraction
+        self.enabled = enabled
+        self.current = [] # Rects touched this frame
+        self.previous = [] # ... and last frame, still on screen until overwritten
+        self.full_frames = 1 # Frames that must still be flipped in full
+        self.partial_count = 0
+        self.full_count = 0
+        self.last_fraction = 1.0 # Share of the screen the last present() pushed
+
+    def add(self, rect):
+        self.current.append(rect)
+
+    def add_all(self, rects):
+        self.current.extend(rects)
+
+    def invalidate(self, frames=1):
+        """Flips the next `frames` frames in full (the whole screen changed)."""
+        self.full_frames = max(self.full_frames, frames)
+
+    def present(self):
+        """Puts the frame on screen: the dirty rects if that's worth it, else a full flip."""
+        screen_rect = pygame.display.get_surface().get_rect()
+        screen_area = screen_rect.width * screen_rect.height
+        rects = []
+        area = 0
+        if self.enabled and self.full_frames == 0:
+            for rect in self.previous + self.current:
+                rect = screen_rect.clip(rect)
+                if rect.width and rect.height:
+                    rects.append(rect)
+                    area += rect.width * rect.height # Overlaps count twice; it only errs towards a flip
+        if self.enabled and self.full_frames == 0 and area <= screen_area * self.max_fraction:
+            pygame.display.update(rects)
+            self.partial_count += 1
+            self.last_fraction = area / screen_area
+        else:
+            pygame.display.flip()
+            self.full_count += 1
+            self.last_fraction = 1.0
+        self.full_frames = max(0, self.full_frames - 1)
+        self.previous = self.current
+        self.current = []
+
+    def reset_stats(self):
+        self.partial_count = 0
+        self.full_count = 0
+
+    def notes(self):
+        """One profiler overlay line: how many frames went out as rects, and how much the last one pushed."""
+        if not self.enabled:
+            return ["present      full flips (dirty rects off)"]
+        total = self.partial_count + self.full_count
+        share = self.partial_count / total if total else 0.0
+        return [f"present      dirty rects {share:6.1%} of frames, last {self.last_fraction:5.1%} of screen"]
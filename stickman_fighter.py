@@ -1,44 +1,85 @@
 import pygame
 import random
-import math
+import time
+
+import stickman_core as core
+from stickman_text import TextCache
+from stickman_sprites import AuraSprites, FireballSprites, StickmanSprites
+from stickman_hud import HUD
+from stickman_dirty import DirtyRectPresenter
+from stickman_view import RenderTarget, parse_resolution
+from stickman_save import SaveStore
+from stickman_replay import MatchRecorder, Replay
+from stickman_snapshot import RewindBuffer, snapshot, restore
+from stickman_netplay import LossyChannel, connect, parse_address
+from stickman_gc import GCScheduler
+from stickman_core import (
+    SCREEN_WIDTH, SCREEN_HEIGHT, FPS, GROUND_Y, SKY_COLOR, GROUND_COLOR, GAME_DURATION_SECONDS, MAX_LEVEL,
+    BLACK, WHITE, RED, GREEN, BLUE, GRAY, YELLOW, PURPLE, ORANGE,
+    LIGHT_GRAY, LIGHT_GREEN, LIGHT_RED, LIGHT_ORANGE,
+    CHARACTER_TYPES, XP_LEVELS, all_powerups, sounds, play_sound,
+)
 
-import os
-import json
 # --- Initialize Pygame & Mixer ---
 pygame.init()
 pygame.font.init()
 pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512) # For sounds
 
-# --- Game Constants ---
-SCREEN_WIDTH = 1600 # Made screen wider
-SCREEN_HEIGHT = 900 # Made screen taller
-FPS = 60
-GROUND_Y = 800 # Adjusted ground for new size
-SKY_COLOR = (20, 20, 40)
-GROUND_COLOR = (50, 50, 50)
-GAME_DURATION_SECONDS = 60 # 1 minute timer
-MAX_LEVEL = 10
-
-# --- Colors ---
-BLACK = (0, 0, 0)
-WHITE = (255, 255, 255)
-RED = (255, 0, 0)
-GREEN = (0, 255, 0)
-BLUE = (0, 0, 255)
-GRAY = (128, 128, 128)
-YELLOW = (255, 255, 0)
-PURPLE = (128, 0, 128)
-ORANGE = (255, 165, 0)
-LIGHT_GRAY = (170, 170, 170)
-LIGHT_GREEN = (144, 238, 144)
-LIGHT_RED = (240, 128, 128)
-LIGHT_ORANGE = (255, 200, 100)
-
 # --- Game Window ---
 screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 pygame.display.set_caption("Stickman Fighter")
+
+# Fights are drawn into view.surface at RENDER_SCALE of the window's size and
+# stretched onto it in one pass (see stickman_view); menus draw into `screen`.
+# 0.5 (800x450) is the preset for kiosks short on fill rate; --resolution WxH sets it too.
+RENDER_SCALE = 1.0
+view = RenderTarget(screen, RENDER_SCALE)
 clock = pygame.time.Clock()
 
+# --- Frame Pacing ---
+# The simulation always steps at FPS (see core.SIM_DT); drawing runs as fast
+# as this cap allows and interpolates between steps. 0 = uncapped.
+RENDER_FPS_CAP = 240
+MAX_FRAME_TIME = 0.25 # Longest real frame fed to the simulation; avoids a catch-up spiral after a stall
+SNAP_DISTANCE = 100 # Moves bigger than this in one step (teleports) aren't interpolated
+
+# --- Profiling ---
+# F3 toggles the frame-time overlay, F4 writes a cProfile capture of the next frames
+PROFILE_OVERLAY_KEY = pygame.K_F3
+PROFILE_CAPTURE_KEY = pygame.K_F4
+PROFILE_CAPTURE_FRAMES = 300
+core.profiler.enabled = True # Marks cost well under a microsecond; the overlay is what's toggled
+
+# --- Garbage Collection ---
+# Long-lived objects are frozen at level start and full collections wait for
+# the power-up / game over screens (see stickman_gc). Pause stats are on the F3 overlay.
+gc_scheduler = GCScheduler()
+gc_scheduler.install()
+
+# --- Fast-Forward ---
+# F6 toggles turbo: TURBO_STEPS simulation steps per displayed frame, no interpolation,
+# no particles or floating text. --turbo N starts in it; --autoplay lets the AI play.
+TURBO_KEY = pygame.K_F6
+TURBO_STEPS = 16
+
+# --- Practice Rewind ---
+# With --practice every step is snapshotted into a 10 second ring buffer and
+# F7 jumps back REWIND_SECONDS. Practice runs don't save progress.
+REWIND_KEY = pygame.K_F7
+REWIND_SECONDS = 3
+
+# --- Dirty Rects ---
+# With DIRTY_RECTS (or --dirty-rects) a fight frame pushes only the areas that
+# changed to the window instead of flipping the whole screen; screen shake and
+# busy frames still flip in full (see stickman_dirty). F8 toggles it.
+DIRTY_RECTS = False
+DIRTY_RECTS_KEY = pygame.K_F8
+
+# --- Replays ---
+# Every level is recorded (a couple of bytes per step) to stickman_replay.REPLAY_DIR.
+# Watch one with: python stickman_fighter.py --replay replays/<file>.stkr
+RECORD_REPLAYS = True
+
 # --- Fonts ---
 try:
     # Try to use a more "game-like" font
@@ -54,12 +95,22 @@ LEVEL_FONT = pygame.font.SysFont('Arial', 50)
 TIMER_FONT = pygame.font.SysFont('Arial', 40, bold=True)
 POWERUP_TITLE_FONT = pygame.font.SysFont('Arial', 60, bold=True)
 POWERUP_DESC_FONT = pygame.font.SysFont('Arial', 28)
+PROFILER_FONT = pygame.font.SysFont('consolas,couriernew,monospace', 15) # Fixed width so the columns line up
+
+# Font keys used by the core's TextAnimations
+FONTS = {'special': SPECIAL_FONT, 'level': LEVEL_FONT}
+
+# Every string the game draws goes through this cache instead of font.render
+text_cache = TextCache()
+
+# --- Save Data ---
+# Parsed once and cached; writes happen on a background thread
+save_store = SaveStore()
 
 # --- Sound Effects ---
 # Create a 'sounds' folder and place your .wav or .ogg files there.
-sounds = {}
 def load_sounds():
-    """Loads all sound effects into the sounds dictionary."""
+    """Loads all sound effects into the core's sounds dictionary."""
     sound_files = {
         'punch': 'sounds/punch.wav',
         'kick': 'sounds/kick.wav',
@@ -85,69 +136,6 @@ def load_sounds():
             # Create a dummy sound object so the game doesn't crash
             sounds[name] = pygame.mixer.Sound(pygame.mixer.Sound(buffer=b''))
 
-def play_sound(name, volume=0.7):
-    """Plays a sound from the loaded sounds dictionary."""
-    if name in sounds:
-        sounds[name].set_volume(volume)
-        sounds[name].play()
-
-# --- Global Lists (will be reset each level) ---
-projectiles = []
-particles = []
-text_animations = []
-screen_shake = 0
-platforms = []
-player = None
-enemy = None
-clones = [] # For boss fight
-
-# --- Character Definitions ---
-CHARACTER_TYPES = {
-    "Brawler": {
-        "color": BLUE,
-        "base_health": 120,
-        "base_damage": 12,
-        "base_speed": 6,
-        "special_move_type": "fireball", # Default for now, could be unique later
-        "ultimate_move_type": "meteor_slam",
-        "desc": "A balanced fighter with good health and damage. Gains +5 HP, +1 DMG, +0.1 SPD per level."
-    },
-    "Agile": {
-        "color": GREEN,
-        "base_health": 90,
-        "base_damage": 10,
-        "base_speed": 8,
-        "special_move_type": "fireball",
-        "ultimate_move_type": "meteor_slam",
-        "desc": "Fast and nimble, but with lower health. Gains +4 HP, +0.5 DMG, +0.2 SPD per level."
-    },
-    "Tank": {
-        "color": ORANGE,
-        "base_health": 150,
-        "base_damage": 10,
-        "base_speed": 5,
-        "special_move_type": "fireball",
-        "ultimate_move_type": "meteor_slam",
-        "desc": "High health, but slower movement. Gains +7 HP, +0.5 DMG, +0.05 SPD per level."
-    }
-}
-
-# XP Curve (example)
-XP_LEVELS = [
-    0,    # Level 0
-    100,  # Level 1
-    250,  # Level 2
-    450,  # Level 3
-    700,  # Level 4
-    1000, # Level 5
-    1350, # Level 6
-    1750, # Level 7
-    2200, # Level 8
-    2700, # Level 9
-    3250  # Level 10 (Max level for now)
-]
-
-
 # --- Starry Sky (Static) ---
 stars = []
 for _ in range(100):
@@ -155,1402 +143,274 @@ for _ in range(100):
     y = random.randint(0, GROUND_Y - 50) # Adjusted for new ground
     stars.append((x, y))
 
-# --- Power-Up Definitions ---
-all_powerups = [
-    {'name': 'Health Boost', 'effect': 'max_health', 'value': 25, 'desc': '+25 Max HP'},
-    {'name': 'Damage Up', 'effect': 'damage', 'value': 2, 'desc': '+2 Melee Damage'},
-    {'name': 'Speed Up', 'effect': 'speed', 'value': 0.5, 'desc': '+ Move Speed'},
-    {'name': 'Special Cooldown', 'effect': 'special_cd', 'value': -30, 'desc': 'Special Recharges Faster'},
-    {'name': 'Dash Cooldown', 'effect': 'dash_cd', 'value': -15, 'desc': 'Dash Recharges Faster'},
-    {'name': 'Teleport Cooldown', 'effect': 'teleport_cd', 'value': -20, 'desc': 'Teleport Recharges Faster'},
-    {'name': 'Full Heal', 'effect': 'full_heal', 'value': 0, 'desc': 'Restores all HP (for next level)'},
-    {'name': 'Critical Hit', 'effect': 'crit_chance', 'value': 0.1, 'desc': '+10% Crit Chance (2x Dmg)'},
-    {'name': 'Fireball Damage', 'effect': 'fireball_damage', 'value': 10, 'desc': '+10 Fireball Damage'},
-    {'name': 'Stomp Damage', 'effect': 'stomp_damage', 'value': 15, 'desc': '+15 Air Attack Damage'},
-    {'name': 'Ultimate Charge', 'effect': 'ult_charge_rate', 'value': 5, 'desc': '+5 Bonus Ult Charge on Hit'},
-    {'name': 'Air Dash', 'effect': 'max_air_dash', 'value': 1, 'desc': '+1 Max Air Dash'},
-    {'name': 'Ultimate Aura', 'effect': 'ult_aura', 'value': 1, 'desc': '+Dmg/Speed when Ult is full'},
-    {'name': 'Lifesteal', 'effect': 'lifesteal', 'value': 0.05, 'desc': 'Heal 5% of damage dealt'},
-    {'name': 'Reflect Projectiles', 'effect': 'reflect_projectiles', 'value': 1, 'desc': 'Blocking reflects fireballs'}
-]
-# Powerups the AI can receive
-ai_powerups = [p for p in all_powerups if p['effect'] not in ['full_heal', 'ult_aura', 'ult_charge_rate']]
-
-class Particle:
-    """
-    A simple particle for hit effects.
-    """
-    def __init__(self, x, y, color):
-        self.x = x
-        self.y = y
-        self.color = color
-        self.vel_x = random.uniform(-3, 3)
-        self.vel_y = random.uniform(-5, 2)
-        self.lifespan = 20 # Frames
-
-    def update(self):
-        self.x += self.vel_x
-        self.y += self.vel_y
-        self.vel_y += 0.4 # Gravity
-        self.lifespan -= 1
-
-    def draw(self, surface):
-        if self.lifespan > 0:
-            pygame.draw.rect(surface, self.color, (self.x, self.y, 4, 4))
-
-class TextAnimation:
-    """
-    Displays floating, fading text for special moves.
-    """
-    def __init__(self, text, x, y, color, font=SPECIAL_FONT, lifespan=40):
-        self.text = text
-        self.x = int(x)
-        self.y = int(y)
-        self.color = color
-        self.font = font
-        self.lifespan = lifespan
-        self.max_lifespan = lifespan
-
-    def update(self):
-        self.y -= 1 # Float up
-        self.lifespan -= 1
-
-    def draw(self, surface):
-        # Calculate alpha for fading
-        alpha = int(255 * (self.lifespan / self.max_lifespan))
-        if alpha < 0: alpha = 0
-        
-        text_surf = self.font.render(self.text, True, self.color)
-        text_surf.set_alpha(alpha)
-        text_rect = text_surf.get_rect(center=(self.x, self.y))
-        surface.blit(text_surf, text_rect)
-
-class Projectile:
-    """
-    A fireball special move.
+def interpolated_pos(obj, alpha):
+    """Blends obj's previous and current simulation positions for drawing."""
+    if abs(obj.x - obj.prev_x) > SNAP_DISTANCE or abs(obj.y - obj.prev_y) > SNAP_DISTANCE:
+        return obj.x, obj.y # Teleported: snap instead of streaking across the screen
+    return obj.prev_x + (obj.x - obj.prev_x) * alpha, obj.prev_y + (obj.y - obj.prev_y) * alpha
+
+def draw_stickman_preview(surface, stickman, x, y, scale=1.0, direction=1):
+    """Draws a simplified, static stickman for preview purposes."""
+    # Temporarily override some attributes for drawing
+    original_x, original_y = stickman.x, stickman.y
+    original_scale, original_direction = stickman.scale, stickman.direction
+    original_height, original_width = stickman.height, stickman.width
+
+    stickman.x, stickman.y = x, y
+    stickman.scale = scale
+    stickman.direction = direction
+    stickman.height = original_height * scale
+    stickman.width = original_width * scale
+
+    draw_color = stickman.color
+
+    head_pos = (int(stickman.x), int(stickman.y - stickman.height * 0.9))
+    body_start = head_pos
+    body_end = (int(stickman.x), int(stickman.y - stickman.height * 0.4))
+    
+    # Standing pose for legs
+    leg1_end = (int(stickman.x - stickman.width * 0.25 * stickman.direction), int(stickman.y))
+    leg2_end = (int(stickman.x + stickman.width * 0.25 * stickman.direction), int(stickman.y))
+    
+    # Standing pose for arms
+    arm1_start = (int(stickman.x), int(stickman.y - stickman.height * 0.7))
+    arm2_start = arm1_start
+    arm1_end = (int(stickman.x - stickman.width * 0.4 * stickman.direction), int(stickman.y - stickman.height * 0.5))
+    arm2_end = (int(stickman.x + stickman.width * 0.4 * stickman.direction), int(stickman.y - stickman.height * 0.5))
+
+    # Draw body parts
+    pygame.draw.circle(surface, draw_color, head_pos, int(stickman.height * 0.1 * stickman.scale)) # Head
+    pygame.draw.line(surface, draw_color, body_start, body_end, int(5 * stickman.scale)) # Body
+    pygame.draw.line(surface, draw_color, body_end, leg1_end, int(5 * stickman.scale)) # Leg 1
+    pygame.draw.line(surface, draw_color, body_end, leg2_end, int(5 * stickman.scale)) # Leg 2
+    pygame.draw.line(surface, draw_color, arm1_start, arm1_end, int(5 * stickman.scale)) # Arm 1
+    pygame.draw.line(surface, draw_color, arm2_start, arm2_end, int(5 * stickman.scale)) # Arm 2
+
+    # Draw player-specific accessories for preview (assuming it's always a player preview)
+    # Player headband
+    headband_y = head_pos[1]
+    pygame.draw.line(surface, WHITE, 
+                     (head_pos[0] - int(stickman.height * 0.1 * stickman.scale), headband_y), 
+                     (head_pos[0] + int(stickman.height * 0.1 * stickman.scale), headband_y), 4)
+    # Player cape (simplified)
+    cape_start = (int(stickman.x - (3 * stickman.direction)), int(stickman.y - stickman.height * 0.65))
+    pygame.draw.rect(surface, BLUE, (cape_start[0], cape_start[1], int(8 * stickman.scale), int(30 * stickman.scale)))
+    # Player gloves
+    glove_color = BLUE
+    pygame.draw.circle(surface, glove_color, arm1_end, int(8 * stickman.scale))
+    pygame.draw.circle(surface, glove_color, arm2_end, int(8 * stickman.scale))
+
+    # Restore original attributes
+    stickman.x, stickman.y = original_x, original_y
+    stickman.scale, stickman.direction = original_scale, original_direction
+    stickman.height, stickman.width = original_height, original_width
+
+def draw_stickman(surface, stickman, alpha=1.0):
     """
-    def __init__(self, x, y, direction, color, damage, is_player_projectile): # Added damage
-        self.x = int(x)
-        self.y = int(y)
-        self.direction = direction
-        self.color = color # This will be the "core" color
-        self.vel = 12 * direction
-        self.radius = 15 # Made it bigger
-        self.damage = damage # Use passed-in damage
-        self.is_player_projectile = is_player_projectile
-
-    def update(self):
-        self.x += self.vel
-
-    def draw(self, surface):
-        # Draw a "fiery" effect with multiple circles
-        # Outer glow (Red)
-        pygame.draw.circle(surface, RED, (self.x, self.y), self.radius)
-        # Middle (Orange)
-        pygame.draw.circle(surface, ORANGE, (self.x + random.randint(-2, 2), self.y + random.randint(-2, 2)), int(self.radius * 0.75))
-        # Core (Yellow)
-        pygame.draw.circle(surface, YELLOW, (self.x + random.randint(-1, 1), self.y + random.randint(-1, 1)), int(self.radius * 0.5))
-
-    def get_hitbox(self):
-        return pygame.Rect(self.x - self.radius, self.y - self.radius, self.radius * 2, self.radius * 2)
-
-class Stickman:
+    Draws the stickman on the screen, `alpha` of the way from its last step
+    to its current one. Returns the rect it covered.
     """
-    Represents both the Player and the Enemy.
-    Handles drawing, movement, attacking, and health.
-    """ 
-    def __init__(self, x, y, color, is_player, character_type_name=None):
-        self.x = x
-        self.y = y
-        self.color = color
-        self.is_clone = False # For boss clones
-        self.is_player = is_player
-        
-        self.width = 50
-        self.height = 100
-        
-        self.vel_x = 0
-        self.vel_y = 0
-        self.scale = 1.0 # For boss scaling
-        self.jump_power = 18
-        self.gravity = 0.9
-        self.on_ground = True
-        
-        # Stats that get modified by powerups
-        self.health = 100
-        self.max_health = 100
-        self.base_damage = 10 # Store base stats for auras
-        self.base_speed = 7
-        self.damage = 10
-        self.speed = 7
-        self.speed_multiplier = 1.0 # For AI
-        self.crit_chance = 0.0
-        self.fireball_damage = 30
-        self.stomp_damage = 15
-        self.ultimate_damage = 75 # Player ult damage
-        self.ult_charge_rate = 0 # Bonus ult charge
-        self.lifesteal = 0.0
-        self.can_reflect = False
-        self.has_ult_aura = False
-        
-        self.is_attacking = False
-        self.attack_type = "punch"
-        self.attack_frame = 0
-        self.attack_cooldown = 0
-        self.attack_hitbox = None
-        
-        self.combo_step = 0
-        self.combo_timer = 0
-        
-        self.special_cooldown = 0
-        self.max_special_cooldown = 180
-        
-        # New Ultimate stats
-        self.ultimate_charge = 0
-        self.max_ultimate_charge = 100
-        self.is_ulting = False
-        self.ult_step = 0 # 0: inactive, 1: rising/paused, 2: slamming
-        self.ult_timer = 0
-        self.ult_target_x = 0
-        self.ult_hit_count = 0 # For enemy ult
-        
-        self.dodge_cooldown = 0
-        
-        self.hit_duration = 0 # Red flash
-        self.is_alive = True
-        
-        self.is_dying = False 
-        self.death_anim_timer = 0
-        
-        self.is_blocking = False
-        self.parry_window = 0 # For parry mechanic
-        self.is_stunned = 0
-        
-        self.is_hit = False # New state for hit animation
-        self.hit_anim_timer = 0
-        
-        # --- Boss Specific ---
-        self.is_boss = False
-        self.shockwave_cooldown = 0
-        self.summon_cooldown = 0
-        
-        self.took_damage_this_round = False
-        # Dash state
-        self.dash_cooldown = 0
-        self.max_dash_cooldown = 60
-        self.dash_duration = 0
-        self.is_dashing = False
-        self.dash_invulnerability = 0
-        self.max_air_dash = 1 # New Air Dash
-        self.air_dash_count = 1
-        
-        # Teleport state
-        self.teleport_cooldown = 0
-        self.max_teleport_cooldown = 120
-        
-        self.walk_frame = 0
-        self.direction = 1 if is_player else -1
-
-        # --- Character Progression ---
-        self.character_type_name = character_type_name
-        self.level = 0
-        self.xp = 0
-
-    def draw_preview(self, surface, x, y, scale=1.0, direction=1):
-        """Draws a simplified, static stickman for preview purposes."""
-        # Temporarily override some attributes for drawing
-        original_x, original_y = self.x, self.y
-        original_scale, original_direction = self.scale, self.direction
-        original_height, original_width = self.height, self.width
-
-        self.x, self.y = x, y
-        self.scale = scale
-        self.direction = direction
-        self.height = original_height * scale
-        self.width = original_width * scale
-
-        draw_color = self.color
-
-        head_pos = (int(self.x), int(self.y - self.height * 0.9))
-        body_start = head_pos
-        body_end = (int(self.x), int(self.y - self.height * 0.4))
-        
-        # Standing pose for legs
-        leg1_end = (int(self.x - self.width * 0.25 * self.direction), int(self.y))
-        leg2_end = (int(self.x + self.width * 0.25 * self.direction), int(self.y))
-        
-        # Standing pose for arms
-        arm1_start = (int(self.x), int(self.y - self.height * 0.7))
-        arm2_start = arm1_start
-        arm1_end = (int(self.x - self.width * 0.4 * self.direction), int(self.y - self.height * 0.5))
-        arm2_end = (int(self.x + self.width * 0.4 * self.direction), int(self.y - self.height * 0.5))
-
-        # Draw body parts
-        pygame.draw.circle(surface, draw_color, head_pos, int(self.height * 0.1 * self.scale)) # Head
-        pygame.draw.line(surface, draw_color, body_start, body_end, int(5 * self.scale)) # Body
-        pygame.draw.line(surface, draw_color, body_end, leg1_end, int(5 * self.scale)) # Leg 1
-        pygame.draw.line(surface, draw_color, body_end, leg2_end, int(5 * self.scale)) # Leg 2
-        pygame.draw.line(surface, draw_color, arm1_start, arm1_end, int(5 * self.scale)) # Arm 1
-        pygame.draw.line(surface, draw_color, arm2_start, arm2_end, int(5 * self.scale)) # Arm 2
-
-        # Draw player-specific accessories for preview (assuming it's always a player preview)
-        # Player headband
-        headband_y = head_pos[1]
-        pygame.draw.line(surface, WHITE, 
-                         (head_pos[0] - int(self.height * 0.1 * self.scale), headband_y), 
-                         (head_pos[0] + int(self.height * 0.1 * self.scale), headband_y), 4)
-        # Player cape (simplified)
-        cape_start = (int(self.x - (3 * self.direction)), int(self.y - self.height * 0.65))
-        pygame.draw.rect(surface, BLUE, (cape_start[0], cape_start[1], int(8 * self.scale), int(30 * self.scale)))
-        # Player gloves
-        glove_color = BLUE
-        pygame.draw.circle(surface, glove_color, arm1_end, int(8 * self.scale))
-        pygame.draw.circle(surface, glove_color, arm2_end, int(8 * self.scale))
-
-        # Restore original attributes
-        self.x, self.y = original_x, original_y
-        self.scale, self.direction = original_scale, original_direction
-        self.height, self.width = original_height, original_width
-
-
-
-
+    if stickman.is_dying:
+        return draw_dying_stickman(surface, stickman, alpha)
+    elif not stickman.is_alive:
+        return draw_dead_stickman(surface, stickman, alpha)
 
-
-
-
-
-
-
-    def draw(self, surface):
-        """Draws the stickman on the screen."""
-        if self.is_dying:
-            self.draw_dying_animation(surface)
-            return
-        elif not self.is_alive:
-            self.draw_death(surface)
-            return
-            
-        # Change color if recently hit
-        draw_color = RED if self.hit_duration > 0 else self.color
-        if self.hit_duration > 0:
-            self.hit_duration -= 1
-            
-        if self.is_stunned > 0:
-            # Flash white when stunned
-            draw_color = WHITE if (self.is_stunned // 4) % 2 == 0 else self.color
-        
-        # Ultimate "charging" flash
-        if self.is_ulting and self.ult_step == 1:
-            draw_color = YELLOW if (self.ult_timer // 3) % 2 == 0 else self.color
-        
-        # Enemy ult "shadow" flash
-        if self.is_ulting and self.ult_step == 2 and not self.is_player:
-            draw_color = PURPLE if (self.ult_timer // 2) % 2 == 0 else BLACK
-            
-        # Clone appearance
-        if self.is_clone:
-            draw_color = (PURPLE[0], PURPLE[1], PURPLE[2], 150) # Semi-transparent purple
-            
-        head_pos = (int(self.x), int(self.y - self.height * 0.9))
-        body_start = head_pos
-        body_end = (int(self.x), int(self.y - self.height * 0.4))
-        
-        # Legs
-        leg1_end = (int(self.x - self.width * 0.25 * self.direction), int(self.y))
-        leg2_end = (int(self.x + self.width * 0.25 * self.direction), int(self.y))
-        
-        # Arms
-        arm1_start = (int(self.x), int(self.y - self.height * 0.7))
-        arm2_start = arm1_start
-        
-        # Default arm positions
-        arm1_end = (int(self.x - self.width * 0.4 * self.direction), int(self.y - self.height * 0.5))
-        arm2_end = (int(self.x + self.width * 0.4 * self.direction), int(self.y - self.height * 0.5))
-
-        # --- Animation Logic ---
-        if self.is_hit:
-            # --- New Hit Stun Pose ---
-            # Jerk body and head back
-            head_pos = (int(self.x - 5 * self.direction), int(self.y - self.height * 0.9))
-            body_end = (int(self.x - 3 * self.direction), int(self.y - self.height * 0.4))
-            # Pull arms and legs in
-            arm1_end = (int(self.x - self.width * 0.2 * self.direction), int(self.y - self.height * 0.6))
-            arm2_end = (int(self.x + self.width * 0.2 * self.direction), int(self.y - self.height * 0.6))
-            leg1_end = (int(self.x - self.width * 0.1 * self.direction), int(self.y - 10))
-            leg2_end = (int(self.x + self.width * 0.1 * self.direction), int(self.y - 10))
-        elif self.is_dashing:
-            # Dashing pose
-            body_end = (int(self.x + self.width * 0.3 * self.direction), int(self.y - self.height * 0.4))
-            arm1_end = (int(self.x - self.width * 0.2 * self.direction), int(self.y - self.height * 0.5))
-            arm2_end = (int(self.x + self.width * 0.5 * self.direction), int(self.y - self.height * 0.5))
-            leg1_end = (int(self.x - self.width * 0.1 * self.direction), int(self.y))
-            leg2_end = (int(self.x + self.width * 0.1 * self.direction), int(self.y))
-        elif self.is_blocking:
-            # Blocking Pose
-            body_end = (int(self.x), int(self.y - self.height * 0.4))
-            arm1_end = (int(self.x + self.width * 0.4 * self.direction), int(self.y - self.height * 0.8))
-            arm2_end = (int(self.x - self.width * 0.4 * self.direction), int(self.y - self.height * 0.8))
-            leg1_end = (int(self.x - self.width * 0.2 * self.direction), int(self.y))
-            leg2_end = (int(self.x + self.width * 0.2 * self.direction), int(self.y))
-            # Parry visual effect
-            if self.parry_window > 0:
-                pygame.draw.circle(surface, WHITE, (int(self.x + 20 * self.direction), int(self.y - 60)), 15, 3)
-
-        elif not self.on_ground:
-            # Jump pose (unless ulting)
-            if not (self.is_ulting and self.ult_step == 1): # Don't do jump pose if charging ult
-                leg1_end = (int(self.x - self.width * 0.1 * self.direction), int(self.y - self.height * 0.2))
-                leg2_end = (int(self.x + self.width * 0.1 * self.direction), int(self.y - self.height * 0.2))
-                arm1_end = (int(self.x - self.width * 0.3 * self.direction), int(self.y - self.height * 0.8))
-                arm2_end = (int(self.x + self.width * 0.3 * self.direction), int(self.y - self.height * 0.8))
-        elif self.vel_x != 0:
-            # Walk cycle
-            self.walk_frame += 0.5
-            leg_offset = math.sin(self.walk_frame) * self.width * 0.3
-            leg1_end = (int(self.x - leg_offset), int(self.y))
-            leg2_end = (int(self.x + leg_offset), int(self.y))
-        
-        # Attacking animation
-        if self.is_attacking:
-            if self.attack_type == "punch":
-                if self.direction == 1:
-                    arm2_end = (int(self.x + self.width * 0.8 * self.direction), int(self.y - self.height * 0.7))
-                else:
-                    arm1_end = (int(self.x + self.width * 0.8 * self.direction), int(self.y - self.height * 0.7))
-            elif self.attack_type == "kick":
-                if self.direction == 1:
-                    leg2_end = (int(self.x + self.width * 0.6 * self.direction), int(self.y - self.height * 0.2))
-                else:
-                    leg1_end = (int(self.x + self.width * 0.6 * self.direction), int(self.y - self.height * 0.2))
-            elif self.attack_type == "fireball":
-                arm1_end = (int(self.x + self.width * 0.6 * self.direction), int(self.y - self.height * 0.7))
-                arm2_end = (int(self.x + self.width * 0.6 * self.direction), int(self.y - self.height * 0.7))
-            elif self.attack_type == "air_kick":
-                leg1_end = (int(self.x + self.width * 0.4 * self.direction), int(self.y - self.height * 0.3))
-                leg2_end = (int(self.x - self.width * 0.1 * self.direction), int(self.y - self.height * 0.1))
-                arm1_end = (int(self.x - self.width * 0.3 * self.direction), int(self.y - self.height * 0.8))
-                arm2_end = (int(self.x + self.width * 0.3 * self.direction), int(self.y - self.height * 0.8))
-            elif self.attack_type == "ground_pound":
-                leg1_end = (int(self.x - self.width * 0.1 * self.direction), int(self.y - self.height * 0.2))
-                leg2_end = (int(self.x + self.width * 0.1 * self.direction), int(self.y - self.height * 0.2))
-                arm1_end = (int(self.x - self.width * 0.3 * self.direction), int(self.y - self.height * 0.3))
-                arm2_end = (int(self.x + self.width * 0.3 * self.direction), int(self.y - self.height * 0.3))
-            elif self.attack_type == "ultimate_pound":
-                # Pose for meteor slam
-                draw_color = ORANGE # Slam is fiery
-                leg1_end = (int(self.x - self.width * 0.2 * self.direction), int(self.y - self.height * 0.1))
-                leg2_end = (int(self.x + self.width * 0.2 * self.direction), int(self.y - self.height * 0.1))
-                arm1_end = (int(self.x - self.width * 0.4 * self.direction), int(self.y - self.height * 0.3))
-                arm2_end = (int(self.x + self.width * 0.4 * self.direction), int(self.y - self.height * 0.3))
-            elif self.attack_type == "shadow_punch":
-                # Rapid punch animation
-                if self.direction == 1:
-                    arm2_end = (int(self.x + self.width * 0.7 * self.direction), int(self.y - self.height * 0.7))
-                else:
-                    arm1_end = (int(self.x + self.width * 0.7 * self.direction), int(self.y - self.height * 0.7))
-        
-        # Ult charging pose
-        if self.is_ulting and self.ult_step == 1:
-            arm1_end = (int(self.x - self.width * 0.3 * self.direction), int(self.y - self.height * 0.8))
-            arm2_end = (int(self.x + self.width * 0.3 * self.direction), int(self.y - self.height * 0.8))
-            
-        # --- Draw Ultimate Aura ---
-        aura_color = None
-        if self.has_ult_aura and self.ultimate_charge == self.max_ultimate_charge and not self.is_ulting:
-            aura_color = YELLOW
-        elif self.is_ulting and self.ult_step == 2 and not self.is_player: # Shadow Barrage aura
-             aura_color = PURPLE
-            
-        if aura_color:
-            aura_radius = 20 + abs(math.sin(pygame.time.get_ticks() * 0.01) * 10) # Pulsing radius
-            aura_alpha = 100 + abs(math.sin(pygame.time.get_ticks() * 0.01) * 50) # Pulsing alpha
-            aura_surf = pygame.Surface((aura_radius * 2, aura_radius * 2), pygame.SRCALPHA)
-            pygame.draw.circle(aura_surf, (aura_color[0], aura_color[1], aura_color[2], aura_alpha), (aura_radius, aura_radius), aura_radius)
-            surface.blit(aura_surf, (self.x - aura_radius, self.y - self.height/2 - aura_radius/2))
-
-
-        # Draw body parts
-        pygame.draw.circle(surface, draw_color, head_pos, int(self.height * 0.1 * self.scale)) # Head
-        pygame.draw.line(surface, draw_color, body_start, body_end, int(5 * self.scale)) # Body
-        pygame.draw.line(surface, draw_color, body_end, leg1_end, int(5 * self.scale)) # Leg 1
-        pygame.draw.line(surface, draw_color, body_end, leg2_end, int(5 * self.scale)) # Leg 2
-        pygame.draw.line(surface, draw_color, arm1_start, arm1_end, int(5 * self.scale)) # Arm 1
-        pygame.draw.line(surface, draw_color, arm2_start, arm2_end, int(5 * self.scale)) # Arm 2
-        
-        # --- Stun Visual ---
-        if self.is_stunned > 0 and self.is_stunned % 10 < 5:
-            text_surf = SPECIAL_FONT.render("!!!", True, YELLOW)
-            text_rect = text_surf.get_rect(center=(self.x, self.y - self.height - 15))
-            surface.blit(text_surf, text_rect)
-
-        # --- Arm-end (Gloves / Hands) ---
-        arm1_hand_pos = (arm1_end[0], arm1_end[1])
-        arm2_hand_pos = (arm2_end[0], arm2_end[1])
-        
-        # --- "Skin" ---
-        ult_ready_color = YELLOW if (self.has_ult_aura and self.ultimate_charge == self.max_ultimate_charge) else None
-
-        if self.is_player:
-            # Player headband
-            headband_y = head_pos[1]
-            headband_color = ult_ready_color if ult_ready_color else WHITE
-            pygame.draw.line(surface, headband_color, 
-                             (head_pos[0] - int(self.height * 0.1 * self.scale), headband_y), 
-                             (head_pos[0] + int(self.height * 0.1 * self.scale), headband_y), 4)
-            # Player cape
-            cape_start = (int(self.x - (3 * self.direction)), int(self.y - self.height * 0.65))
-            pygame.draw.rect(surface, BLUE, (cape_start[0], cape_start[1], 8, 30))
-            # Player gloves
-            glove_color = ult_ready_color if ult_ready_color else BLUE
-            pygame.draw.circle(surface, glove_color, arm1_hand_pos, 8)
-            pygame.draw.circle(surface, glove_color, arm2_hand_pos, 8)
-            
-        elif not self.is_clone: # Clones have no accessories
-            # Enemy "angry eyes"
-            eye_y = head_pos[1] - int(self.height * 0.03)
-            eye1_start = (head_pos[0] + (self.height * 0.02) * self.direction, eye_y)
-            eye1_end = (head_pos[0] + (self.height * 0.07) * self.direction, eye_y + int(self.height * 0.02))
-            eye2_start = (head_pos[0] - (self.height * 0.07) * self.direction, eye_y + int(self.height * 0.02))
-            eye2_end = (head_pos[0] - (self.height * 0.02) * self.direction, eye_y)
-            pygame.draw.line(surface, BLACK, eye1_start, eye1_end, 3)
-            pygame.draw.line(surface, BLACK, eye2_start, eye2_end, 3)
-            
-            # Enemy "horns"
-            head_center_x = head_pos[0]
-            head_top_y = head_pos[1] - int(self.height * 0.1)
-            horn1_base = (head_center_x + (5 * self.direction), head_top_y)
-            horn1_tip = (head_center_x + (8 * self.direction), head_top_y - 10)
-            horn2_base = (head_center_x - (5 * self.direction), head_top_y)
-            horn2_tip = (head_center_x - (8 * self.direction), head_top_y - 10)
-            pygame.draw.line(surface, RED, horn1_base, horn1_tip, 4)
-            pygame.draw.line(surface, RED, horn2_base, horn2_tip, 4)
-            
-            # Enemy Belt
-            belt_y = int(self.y - self.height * 0.4)
-            pygame.draw.rect(surface, RED, (self.x - 10, belt_y - 3, 20, 6))
-            
-            # Enemy Shoulder Pads
-            shoulder_y = int(self.y - self.height * 0.7)
-            shoulder_x_off = int(self.width * 0.1) * self.direction
-            pygame.draw.rect(surface, RED, (self.x - shoulder_x_off - 5, shoulder_y - 5, 10, 10))
-            pygame.draw.rect(surface, RED, (self.x + shoulder_x_off - 5, shoulder_y - 5, 10, 10))
-            
-            # Enemy hands
-            pygame.draw.circle(surface, RED, arm1_hand_pos, 8)
-            pygame.draw.circle(surface, RED, arm2_hand_pos, 8)
-
-
-    def draw_dying_animation(self, surface):
-        """Draws the stickman collapsing."""
-        # progress is 0.0 at start of death, 1.0 at end
-        progress = (60 - self.death_anim_timer) / 60.0
-        progress = min(max(progress, 0.0), 1.0) # Clamp
-
-        draw_color = self.color
-        
-        # Head starts at y - 0.9*h and ends at y - 0.1*h (on the ground)
-        head_y_offset = -self.height * 0.9 + (self.height * 0.8 * progress)
-        head_pos = (int(self.x), int(self.y + head_y_offset))
-        
-        # Body starts at y - 0.4*h and ends at y - 0.2*h (collapsed)
-        body_y_offset = -self.height * 0.4 + (self.height * 0.2 * progress)
-        body_end = (int(self.x), int(self.y + body_y_offset))
-        body_start = (head_pos[0], head_pos[1] + int(self.height * 0.1)) # Connect to head
-        
-        # Legs stay at y
-        leg1_end = (int(self.x - self.width * 0.25 * self.direction), int(self.y))
-        leg2_end = (int(self.x + self.width * 0.25 * self.direction), int(self.y))
-        
-        # Arms collapse
-        arm_start_y_offset = -self.height * 0.7 + (self.height * 0.5 * progress)
-        arm1_start = (int(self.x), int(self.y + arm_start_y_offset))
-        arm2_start = arm1_start
-        
-        arm_end_y_offset = -self.height * 0.5 + (self.height * 0.3 * progress)
-        arm1_end = (int(self.x - self.width * 0.4 * self.direction), int(self.y + arm_end_y_offset))
-        arm2_end = (int(self.x + self.width * 0.4 * self.direction), int(self.y + arm_end_y_offset))
-
-        # Draw body parts
-        pygame.draw.circle(surface, draw_color, head_pos, int(self.height * 0.1)) # Head
-        pygame.draw.line(surface, draw_color, body_start, body_end, 5) # Body
-        pygame.draw.line(surface, draw_color, body_end, leg1_end, 5) # Leg 1
-        pygame.draw.line(surface, draw_color, body_end, leg2_end, 5) # Leg 2
-        pygame.draw.line(surface, draw_color, arm1_start, arm1_end, 5) # Arm 1
-        pygame.draw.line(surface, draw_color, arm2_start, arm2_end, 5) # Arm 2
-
-    def draw_death(self, surface):
-        """Draws a 'collapsed' stickman."""
-        head_x = int(self.x)
-        head_y = int(GROUND_Y - self.height * 0.1)
-        
-        # Draw collapsed parts on the ground
-        pygame.draw.circle(surface, self.color, (head_x, head_y), int(self.height * 0.1)) # Head
-        pygame.draw.line(surface, self.color, (head_x, head_y), (head_x, head_y - 20), 5) # Body
-        pygame.draw.line(surface, self.color, (head_x, head_y - 20), (head_x - 15, head_y), 5) # Leg 1
-        pygame.draw.line(surface, self.color, (head_x, head_y - 20), (head_x + 15, head_y), 5) # Leg 2
-        pygame.draw.line(surface, self.color, (head_x, head_y - 15), (head_x - 20, head_y - 15), 5) # Arm 1
-        pygame.draw.line(surface, self.color, (head_x, head_y - 15), (head_x + 20, head_y - 15), 5) # Arm 2
-
-    def move(self, keys):
-        """Handles player movement based on key presses."""
-        if not self.is_alive or self.is_dying or self.is_stunned > 0 or self.is_dashing or self.is_hit or self.is_ulting:
-            self.vel_x = 0
-            return
-            
-        # --- DASH LOGIC ---
-        if self.dash_cooldown > 0:
-            self.dash_cooldown -= 1
-        
-        if keys[pygame.K_LSHIFT] and self.dash_cooldown == 0:
-            if self.on_ground:
-                self.is_dashing = True
-                self.dash_duration = 10 # 1/6th of a second dash
-                self.dash_cooldown = self.max_dash_cooldown
-                self.dash_invulnerability = 10 # Invulnerable during dash
-                play_sound('dash')
-                particles.extend([Particle(self.x, self.y - 50, WHITE) for _ in range(10)]) # Dash effect
-                return
-            elif self.air_dash_count > 0: # --- NEW AIR DASH ---
-                self.air_dash_count -= 1
-                self.is_dashing = True
-                self.dash_duration = 10
-                self.dash_cooldown = self.max_dash_cooldown
-                self.dash_invulnerability = 10
-                self.vel_y = 0 # Stop falling
-                play_sound('dash')
-                particles.extend([Particle(self.x, self.y - 50, WHITE) for _ in range(10)]) # Dash effect
-                return
-            
-        # --- TELEPORT LOGIC ---
-        if self.teleport_cooldown > 0:
-            self.teleport_cooldown -= 1
-        
-        if keys[pygame.K_t] and self.teleport_cooldown == 0 and self.on_ground:
-            self.teleport_cooldown = self.max_teleport_cooldown
-            play_sound('teleport')
-            # Poof effect at old location
-            for _ in range(20):
-                particles.append(Particle(self.x, self.y - 50, PURPLE))
-            
-            self.x += 250 * self.direction # Teleport distance
-            
-            # Poof effect at new location
-            for _ in range(20):
-                particles.append(Particle(self.x, self.y - 50, PURPLE))
-            return
-
-        # --- BLOCKING & MOVEMENT ---
-        self.is_blocking = False # Default to not blocking
-        if keys[pygame.K_s] and self.on_ground:
-            self.is_blocking = True
-            self.parry_window = 10 # Parry is active for 10 frames
-
-        # --- NORMAL MOVEMENT ---
-        self.vel_x = 0
-        if keys[pygame.K_a]:
-            self.vel_x = -self.speed # Use speed stat
-            self.direction = -1
-        if keys[pygame.K_d]:
-            self.vel_x = self.speed # Use speed stat
-            self.direction = 1
-        
-        # Reduce speed if blocking
-        if self.is_blocking:
-            self.vel_x *= 0.5 # Half speed
-            
-        # Jump
-        if keys[pygame.K_w] and self.on_ground and not self.is_blocking: # Can't jump while blocking
-            self.vel_y = -self.jump_power
-            self.on_ground = False
-            play_sound('jump', volume=0.5)
-
-    def attack(self, keys, enemy_x): # Pass enemy_x for ult
-        """Handles player attacks."""
-        # --- ULTIMATE ATTACK ---
-        if self.is_player and keys[pygame.K_u] and self.ultimate_charge == self.max_ultimate_charge and not self.is_ulting:
-            self.is_ulting = True
-            self.ult_step = 1
-            self.ult_timer = 20 # Pause duration in air
-            self.ultimate_charge = 0
-            self.dash_invulnerability = 120 # Invulnerable for 2 seconds
-            self.ult_target_x = enemy_x
-            self.x = self.ult_target_x
-            self.y = 100 # Teleport high
-            self.vel_x = 0
-            self.vel_y = 0
-            self.is_attacking = False
-            self.is_blocking = False
-            text_animations.append(TextAnimation("METEOR SLAM!", self.x, self.y + 50, ORANGE, font=LEVEL_FONT, lifespan=60))
-            play_sound('stomp', volume=1.0)
-            return
-
-        if self.attack_cooldown == 0 and self.is_alive and not self.is_dying and not self.is_blocking and self.is_stunned == 0 and not self.is_hit and not self.is_ulting:
-            # --- GROUND POUND ---
-            if not self.on_ground and keys[pygame.K_s]:
-                self.is_attacking = True
-                self.attack_type = "ground_pound"
-                self.attack_frame = 30 # Active until hits ground
-                self.attack_cooldown = 30
-                self.vel_y = 25 # Rocket downwards
-                self.vel_x = 0 # Stop horizontal movement
-            # Air Kick
-            elif not self.on_ground and keys[pygame.K_k]:
-                self.is_attacking = True
-                self.attack_type = "air_kick"
-                self.attack_frame = 20 # Duration of attack
-                self.attack_cooldown = 40 # Cooldown
-                self.vel_y = 15 # Go down fast
-                self.vel_x = 3 * self.direction
-            # Ground attacks
-            elif self.on_ground and keys[pygame.K_j]: # Punch
-                self.is_attacking = True
-                self.attack_type = "punch"
-                self.attack_frame = 15 # Duration of attack
-                self.attack_cooldown = 30 # Cooldown
-                play_sound('punch')
-                
-                # Combo logic
-                if self.combo_step == 0:
-                    self.combo_step = 1
-                    self.combo_timer = 30 # 0.5 seconds to press next key
-            elif self.on_ground and keys[pygame.K_k]: # Kick
-                self.is_attacking = True
-                self.attack_type = "kick"
-                self.attack_frame = 20 # Duration of attack
-                self.attack_cooldown = 40 # Cooldown
-                play_sound('kick')
-                
-                # Combo logic
-                if self.combo_step == 1 and self.combo_timer > 0:
-                    # COMBO SUCCESS!
-                    self.special_cooldown = 0 # Instantly fill special
-                    self.combo_step = 0
-                    self.combo_timer = 0
-                    text_animations.append(TextAnimation("COMBO!", self.x, self.y - 150, YELLOW))
-                else:
-                    # Reset combo if kick is pressed out of sequence
-                    self.combo_step = 0
-                    self.combo_timer = 0
-                    
-            elif self.on_ground and keys[pygame.K_l] and self.special_cooldown == 0: # Fireball
-                self.is_attacking = True
-                self.attack_type = "fireball"
-                self.attack_frame = 10 # Short casting animation
-                self.attack_cooldown = 20
-                self.special_cooldown = self.max_special_cooldown
-                # Spawn projectile in main loop
-                play_sound('fireball')
-                text_animations.append(TextAnimation("FIREBALL!", self.x + (50 * self.direction), self.y - 150, PURPLE))
-            
-            # Reset combo if any other key is pressed
-            if not keys[pygame.K_j] and not keys[pygame.K_k]:
-                if self.combo_step == 1 and not self.is_attacking:
-                    self.combo_step = 0 # Allows non-attack keys to not break combo
-                    
-    def update_ai(self, player, current_level):
-        """Controls the enemy AI."""
-        if not self.is_alive or self.is_dying or self.is_stunned > 0 or self.is_dashing or self.is_hit or self.is_ulting:
-            self.vel_x = 0
-            return
-            
-        # --- BOSS AI ---
-        if self.is_boss:
-            self.update_boss_ai(player)
-            return
-        
-        # --- AI ULTIMATE ---
-        if self.ultimate_charge == self.max_ultimate_charge and self.on_ground:
-            self.is_ulting = True
-            self.ult_step = 1 # Teleport step
-            self.ultimate_charge = 0
-            self.dash_invulnerability = 60 # Invulnerable for 1 sec
-            self.is_attacking = False # Stop other attacks
-            self.is_blocking = False
-            text_animations.append(TextAnimation("SHADOW BARRAGE!", self.x, self.y - 150, PURPLE, font=LEVEL_FONT, lifespan=60))
-            play_sound('teleport', volume=1.0)
-        
-        if self.dash_cooldown > 0:
-            self.dash_cooldown -= 1
-        
-        if self.teleport_cooldown > 0:
-            self.teleport_cooldown -= 1
-            
-        if self.dodge_cooldown > 0:
-            self.dodge_cooldown -= 1
-            
-        # Stop moving if blocking
-        if self.is_blocking:
-            self.vel_x = 0
-            # AI will auto-stop blocking
-            if self.attack_cooldown > 0: # Cooldown is used to time the block
-                self.attack_cooldown -= 1
-            else:
-                self.is_blocking = False
-            return
-            
-        # --- AI Dodge Logic ---
-        if self.dodge_cooldown == 0 and self.on_ground:
-            # 1. Dodge Projectiles
-            for p in projectiles:
-                if p.is_player_projectile: # Player's projectile
-                    proj_dist = self.x - p.x
-                    if 0 < proj_dist < 300 and abs(self.y - p.y) < 50:
-                        if random.random() < 0.9: # 90% dodge chance
-                            self.vel_y = -self.jump_power * 0.8 # Smaller dodge jump
-                            play_sound('jump', volume=0.4)
-                            self.on_ground = False
-                            self.dodge_cooldown = 60
-                            break
-            # 2. Dodge/Block Melee
-            distance = abs(player.x - self.x)
-            if (player.is_attacking or (player.is_ulting and player.ult_step == 2)) and distance < 120 and self.dodge_cooldown == 0: # Also dodge meteor
-                roll = random.random()
-                if roll < 0.4: # 40% chance to block
-                    self.is_blocking = True
-                    self.vel_x = 0
-                    self.parry_window = 10 # AI can parry too
-                    self.attack_cooldown = 30 # How long to hold block
-                    self.dodge_cooldown = 40
-                elif roll < 0.8: # 40% chance to dodge
-                    # New: 50/50 chance to dash or jump back
-                    if random.random() < 0.5:
-                        self.vel_x = -7 * self.direction # Dash back
-                        self.dodge_cooldown = 40
-                    elif self.dash_cooldown == 0: # AI Dash
-                        self.is_dashing = True
-                        self.dash_duration = 10 
-                        self.dash_cooldown = self.max_dash_cooldown
-                        play_sound('dash')
-                        self.dash_invulnerability = 10
-                        self.vel_x = 25 * -self.direction # Dash away
-                # 20% chance to do nothing and get hit
-        
-        # If dodging, don't do other logic
-        if self.dodge_cooldown > 0:
-            return
-            
-        # Face the player
-        if player.x < self.x:
-            self.direction = -1
-            self.vel_x = -self.speed * self.speed_multiplier
-        else:
-            self.direction = 1
-            self.vel_x = self.speed * self.speed_multiplier
-            
-        # Stop moving if too close or too far
-        distance = abs(player.x - self.x)
-        
-        # --- AI Platform Logic ---
-        player_on_platform = any(player.y == plat.top for plat in platforms)
-        ai_on_platform = any(self.y == plat.top for plat in platforms)
-        
-        if player_on_platform and not ai_on_platform and self.on_ground:
-            # Find closest platform to player
-            closest_plat = min(platforms, key=lambda plat: abs(plat.centerx - player.x))
-            if abs(self.x - closest_plat.centerx) < 50:
-                if random.random() < 0.05:
-                    self.vel_y = -self.jump_power
-                    play_sound('jump', volume=0.4)
-                    self.on_ground = False
-            else:
-                # Move towards that platform
-                if closest_plat.centerx < self.x:
-                    self.vel_x = -self.speed * self.speed_multiplier
-                else:
-                    self.vel_x = self.speed * self.speed_multiplier
-
-        elif not player_on_platform and ai_on_platform and distance > 100:
-            # If player is not on platform, just walk off
-            pass
-        
-        # --- AI Air Kick / Ground Pound ---
-        if not self.on_ground and self.y < player.y - 50 and abs(self.x - player.x) < 100 and self.attack_cooldown == 0:
-            roll = random.random()
-            if roll < 0.05: # 5% chance for Air Kick
-                self.is_attacking = True
-                self.attack_type = "air_kick"
-                self.attack_frame = 20
-                self.attack_cooldown = 40
-                self.vel_y = 15
-            elif roll < 0.10: # 5% chance for Ground Pound
-                self.is_attacking = True
-                self.attack_type = "ground_pound"
-                self.attack_frame = 30
-                self.attack_cooldown = 30
-                self.vel_y = 25
-                self.vel_x = 0
-        
-        # --- AI Teleport ---
-        if self.teleport_cooldown == 0 and self.on_ground and distance > 400 and random.random() < 0.02:
-            self.teleport_cooldown = self.max_teleport_cooldown
-            play_sound('teleport')
-            for _ in range(20): particles.append(Particle(self.x, self.y - 50, PURPLE))
-            self.x += 250 * self.direction # Teleport towards player
-            for _ in range(20): particles.append(Particle(self.x, self.y - 50, PURPLE))
-        
-        # AI Special Move Logic
-        if self.special_cooldown == 0 and player.is_alive and distance > 200 and distance < 500 and self.on_ground:
-            self.is_attacking = True
-            self.attack_type = "fireball"
-            self.attack_frame = 10
-            self.attack_cooldown = 20
-            self.special_cooldown = self.max_special_cooldown # AI has same cooldown
-            play_sound('fireball')
-            text_animations.append(TextAnimation("FIREBALL!", self.x + (50 * self.direction), self.y - 150, RED))
-        
-        # AI Melee Logic
-        elif distance < 80 and self.on_ground:
-            self.vel_x = 0
-            # AI attack logic
-            if self.attack_cooldown == 0 and player.is_alive:
-                self.is_attacking = True
-                self.attack_type = "punch" if random.random() < 0.7 else "kick"
-                self.attack_frame = 15 if self.attack_type == "punch" else 20
-                play_sound('punch' if self.attack_type == "punch" else 'kick')
-                self.attack_cooldown = 50 # Slower attack rate for AI
-        elif distance > 400 and distance < 600: # Stay in this "mid-range"
-            self.vel_x = 0
-        elif distance >= 600: # Only move if very far
-            self.vel_x = 0
-        
-    def update_boss_ai(self, player):
-        """Unique AI for the final boss."""
-        # Cooldowns
-        if self.shockwave_cooldown > 0: self.shockwave_cooldown -= 1
-        if self.summon_cooldown > 0: self.summon_cooldown -= 1
-        
-        # --- Boss Unique Attacks ---
-        distance = abs(player.x - self.x)
-        
-        # 1. Summon Clones (when health is at 75% and 25%)
-        if (self.health < self.max_health * 0.75 and self.summon_cooldown == 0) or \
-           (self.health < self.max_health * 0.25 and self.summon_cooldown == 120): # Can summon twice
-            self.summon_cooldown = 600 # 10 second cooldown
-            self.is_attacking = True
-            self.attack_type = "kick" # Just a visual pose
-            self.attack_frame = 30
-            text_animations.append(TextAnimation("ARISE!", self.x, self.y - 150, PURPLE, font=LEVEL_FONT))
-            play_sound('teleport')
-            
-            # Summon two clones
-            clone1 = Stickman(self.x - 100, self.y, self.color, is_player=False)
-            clone1.is_clone = True
-            clone1.health = 1
-            clone1.max_health = 1
-            clone1.damage = 10
-            clone1.speed = 5
-            
-            clone2 = Stickman(self.x + 100, self.y, self.color, is_player=False)
-            clone2.is_clone = True
-            clone2.health = 1
-            clone2.max_health = 1
-            clone2.damage = 10
-            clone2.speed = 5
-            
-            clones.append(clone1)
-            clones.append(clone2)
-            return # Pause other actions while summoning
-
-        # 2. Ground Shockwave
-        if self.shockwave_cooldown == 0 and distance > 300 and self.on_ground:
-            self.shockwave_cooldown = 240 # 4 second cooldown
-            self.is_attacking = True
-            self.attack_type = "ground_pound"
-            self.attack_frame = 30
-            self.vel_y = 25 # Do the pound animation
-            self.vel_x = 0
-            # The shockwave projectile will be spawned in `update()` when it lands
-            return
-
-        # Use the normal AI for movement and basic attacks
-        self.update_ai(player, 10) # Pass level 10 to use the base AI logic
-
-    def update_clone_ai(self, player):
-        """Extremely simple AI for boss clones."""
-        if not self.is_alive or self.is_stunned > 0 or self.is_hit:
-            self.vel_x = 0
-            return
-        
-        # Always face and move towards the player
-        if player.x < self.x:
-            self.direction = -1
-            self.vel_x = -self.speed
-        else:
-            self.direction = 1
-            self.vel_x = self.speed
-        
-        # Simple attack
-        if abs(player.x - self.x) < 60 and self.attack_cooldown == 0:
-            self.is_attacking = True
-            self.attack_type = "punch"
-            self.attack_frame = 15
-            self.attack_cooldown = 60
-            play_sound('punch', volume=0.3)
-
-    def update(self):
-        """Updates the stickman's state each frame."""
-        global player, enemy, clones # Add this line to access the global player/enemy
-        
-        # Handle stun
-        if self.is_stunned > 0:
-            self.is_stunned -= 1
-            self.vel_x = 0
-            self.is_attacking = False
-            # Stun visual
-            return
-            
-        # Handle hit stun
-        if self.is_hit:
-            self.hit_anim_timer -= 1
-            self.vel_x = -2 * self.direction # Knockback
-            if self.hit_anim_timer <= 0:
-                self.is_hit = False
-            return # Stop other logic
-            
-        # --- AURA BUFFS (Player only) ---
-        if self.is_player:
-            if self.has_ult_aura and self.ultimate_charge == self.max_ultimate_charge:
-                self.damage = self.base_damage + 2
-                self.speed = self.base_speed + 0.5
-            else:
-                self.damage = self.base_damage
-                self.speed = self.base_speed
-        
-        # --- DASH UPDATE ---
-        if self.dash_invulnerability > 0:
-            self.dash_invulnerability -= 1
-
-        if self.is_dashing:
-            self.dash_duration -= 1
-            self.vel_x = 25 * self.direction # Maintain dash speed
-            self.vel_y = 0 # No gravity during dash
-            if self.dash_duration % 2 == 0: # Leave a trail
-                particles.append(Particle(self.x, self.y - 30, GRAY))
-            if self.dash_duration <= 0:
-                self.is_dashing = False
-                self.vel_x = 0
-        # --- END DASH UPDATE ---
-        
-        # --- ULTIMATE UPDATE ---
-        if self.is_ulting:
-            self.dash_invulnerability = 10 # Stay invulnerable
-            
-            if self.is_player:
-                # --- Player Ult: Meteor Slam ---
-                if self.ult_step == 1: # Paused in air
-                    self.vel_x = 0
-                    self.vel_y = 0
-                    self.x = self.ult_target_x
-                    self.y = 100
-                    self.ult_timer -= 1
-                    # Spawn charging particles
-                    if self.ult_timer % 5 == 0:
-                        particles.append(Particle(self.x + random.randint(-20, 20), self.y, YELLOW))
-                    if self.ult_timer <= 0:
-                        self.ult_step = 2
-                elif self.ult_step == 2: # Slamming down
-                    self.is_attacking = True
-                    self.attack_type = "ultimate_pound"
-                    self.attack_frame = 2 # Keep it active
-                    self.vel_y = 40 # Rocket down
-                    self.vel_x = 0
-            
-            else:
-                # --- Enemy Ult: Shadow Barrage ---
-                if self.ult_step == 1: # Teleporting
-                    # Find player
-                    enemy = [s for s in [player, enemy] if not s.is_player][0]
-                    player = [s for s in [player, enemy] if s.is_player][0]
-                    # Teleport behind player
-                    self.x = player.x - (player.direction * 60)
-                    self.y = player.y
-                    self.direction = player.direction
-                    self.vel_x = 0
-                    self.vel_y = 0
-                    self.ult_step = 2
-                    self.ult_timer = 40 # Duration of the barrage
-                    self.ult_hit_count = 5 # 5 hits
-                
-                elif self.ult_step == 2: # Barraging
-                    self.vel_x = 0
-                    self.vel_y = 0
-                    self.ult_timer -= 1
-                    # At specific frames, do an attack
-                    if self.ult_timer % 8 == 0 and self.ult_hit_count > 0:
-                        self.is_attacking = True
-                        self.attack_type = "shadow_punch"
-                        self.attack_frame = 5
-                        play_sound('punch', volume=0.5)
-                        self.ult_hit_count -= 1
-                        # Create purple particles for shadow effect
-                        for _ in range(5):
-                            particles.append(Particle(self.x, self.y - 50, PURPLE))
-                    
-                    if self.ult_timer <= 0:
-                        self.is_ulting = False
-                        self.ult_step = 0
-                        self.is_attacking = False
-        # --- END ULTIMATE UPDATE ---
-            
-        # Handle dying animation first
-        if self.is_dying:
-            self.death_anim_timer -= 1
-            # Keep applying gravity
-            self.vel_y += self.gravity
-            self.y += self.vel_y
-            # Ground collision
-            if self.y > GROUND_Y:
-                self.y = GROUND_Y
-                self.vel_y = 0
-            
-            if self.death_anim_timer <= 0:
-                self.is_dying = False # Switch from "dying" to "dead"
-            return # Don't do any other logic
-            
-        # If dead and not dying, do nothing
-        if not self.is_alive:
-            return
-            
-        # Update combo timer
-        if self.combo_timer > 0:
-            self.combo_timer -= 1
-        if self.dodge_cooldown > 0:
-            self.dodge_cooldown -= 1
-        
-        # Update parry window
-        if self.parry_window > 0:
-            self.parry_window -= 1
-            
-        # Apply gravity (only if not dashing or ulting)
-        if not self.is_dashing and not self.is_ulting:
-            self.vel_y += self.gravity
-        
-        # Don't apply gravity if ground pounding
-        if self.is_attacking and self.attack_type == "ground_pound":
-            self.vel_y = 25
+    x, y = interpolated_pos(stickman, alpha)
         
-        if not (self.is_ulting and (self.ult_step == 1 or (not self.is_player and self.ult_step == 2))): # Don't apply y vel if charging or shadow barraging
-            self.y += self.vel_y
+    # Change color if recently hit
+    draw_color = RED if stickman.hit_duration > 0 else stickman.color
         
-        # Apply horizontal movement
-        # vel_x is set by move() or by is_dashing block
-        if not (self.is_ulting): # Don't apply x vel if ulting
-            self.x += self.vel_x
-        
-        # --- Platform Collision ---
-        on_platform = False
-        if self.vel_y > 0 and not self.is_dashing: # Only check if falling, not dashing
-            stick_rect = pygame.Rect(self.x - self.width * 0.25, self.y - self.height, self.width * 0.5, self.height)
-            
-            for plat in platforms:
-                if stick_rect.colliderect(plat):
-                    # Check if the stickman's *bottom* from last frame was *above* the platform's *top*
-                    last_stick_rect = pygame.Rect(self.x - self.vel_x - self.width * 0.25, self.y - self.vel_y - self.height, self.width * 0.5, self.height)
-                    if last_stick_rect.bottom <= plat.top:
-                        self.y = plat.top # Set feet to platform top
-                        self.vel_y = 0
-                        self.on_ground = True
-                        on_platform = True
-                        self.air_dash_count = self.max_air_dash # Reset air dash
-                        break
-        
-        # Ground collision
-        if not on_platform and self.y > GROUND_Y:
-            self.y = GROUND_Y
-            self.vel_y = 0
-            self.on_ground = True
-            self.air_dash_count = self.max_air_dash # Reset air dash
-            
-        # Screen boundaries
-        if self.x < self.width / 2:
-            self.x = self.width / 2
-        if self.x > SCREEN_WIDTH - self.width / 2:
-            self.x = SCREEN_WIDTH - self.width / 2
-            
-        # Update attack cooldown
-        if self.attack_cooldown > 0:
-            self.attack_cooldown -= 1
-            
-        # Update special cooldown
-        if self.special_cooldown > 0:
-            self.special_cooldown -= 1
-            
-        # Update attack animation
-        self.attack_hitbox = None
-        if self.is_attacking:
-            self.attack_frame -= 1
-            
-            # Define attack hitbox
-            if self.attack_type == "punch":
-                hitbox_x = self.x + (self.width * 0.5 * self.direction)
-                hitbox_y = self.y - self.height * 0.7
-                self.attack_hitbox = pygame.Rect(hitbox_x, hitbox_y, self.width * 0.6, self.height * 0.2)
-            elif self.attack_type == "kick":
-                hitbox_x = self.x + (self.width * 0.3 * self.direction)
-                hitbox_y = self.y - self.height * 0.2
-                self.attack_hitbox = pygame.Rect(hitbox_x, hitbox_y, self.width * 0.7, self.height * 0.2)
-            elif self.attack_type == "air_kick":
-                self.vel_y = 15 # Keep moving down
-                hitbox_y = self.y - self.height * 0.3
-                self.attack_hitbox = pygame.Rect(self.x - self.width * 0.2, hitbox_y, self.width * 0.4, self.height * 0.3)
-            elif self.attack_type == "ground_pound":
-                self.vel_y = 25 # Keep moving down fast
-                # Hitbox is a small area around the feet
-                self.attack_hitbox = pygame.Rect(self.x - 30, self.y - 20, 60, 40)
-            elif self.attack_type == "ultimate_pound":
-                self.vel_y = 40 # Keep moving down fast
-                # Hitbox is a LARGE area around the feet
-                self.attack_hitbox = pygame.Rect(self.x - 80, self.y - 40, 160, 60)
-            elif self.attack_type == "shadow_punch":
-                hitbox_x = self.x + (self.width * 0.5 * self.direction)
-                hitbox_y = self.y - self.height * 0.7
-                self.attack_hitbox = pygame.Rect(hitbox_x, hitbox_y, self.width * 0.6, self.height * 0.2)
-            # No hitbox for fireball, it creates a projectile
-            
-            # End attack
-            if self.attack_frame <= 0 and not self.is_ulting: # Don't end ult attack prematurely
-                self.is_attacking = False
-                self.attack_hitbox = None
-            
-            # End air kick / ground pound / ult on landing
-            if (self.attack_type == "air_kick" or self.attack_type == "ground_pound" or self.attack_type == "ultimate_pound") and self.on_ground:
-                self.is_attacking = False
-                self.attack_hitbox = None
-                
-                # Add a shockwave effect
-                if self.attack_type == "ground_pound" or self.attack_type == "ultimate_pound":
-                    pound_size = 15 if self.attack_type == "ground_pound" else 40
-                    screen_shake = 10 if self.attack_type == "ground_pound" else 20
-                    pound_text = "STOMP!" if self.attack_type == "ground_pound" else "METEOR!"
-                    play_sound('stomp')
-                    text_animations.append(TextAnimation(pound_text, self.x, self.y - 50, ORANGE))
-                    
-                    # Boss shockwave attack
-                    if self.is_boss and self.attack_type == "ground_pound":
-                        # Spawn a shockwave projectile
-                        shockwave = Projectile(self.x, GROUND_Y - 20, 1, RED, self.damage, False)
-                        projectiles.append(shockwave)
-                    
-                    for _ in range(pound_size):
-                        p = Particle(self.x, self.y, ORANGE)
-                        p.vel_x = random.uniform(-5, 5)
-                        p.vel_y = random.uniform(-3, 0) # Only go up/out
-                        particles.append(p)
-                
-                # Reset ult state AFTER landing
-                if self.attack_type == "ultimate_pound":
-                    self.is_ulting = False
-                    self.ult_step = 0
-                
-    def get_hitbox(self):
-        """Returns the main body hitbox."""
-        if not self.is_alive or self.is_dying or self.is_dashing or self.is_hit:
-            return pygame.Rect(0, 0, 0, 0)
-        return pygame.Rect(self.x - self.width * 0.25, self.y - self.height, self.width * 0.5, self.height)
-
-    def take_damage(self, damage, attacker):
-        """Reduces health when hit. Attacker is the other stickman object."""
-        global screen_shake
-        if (self.is_alive and not self.is_dying) and self.dash_invulnerability == 0:
-            
-            # Check for Block
-            if self.is_blocking:
-                # Check if the hit is from the front
-                is_hit_from_front = (attacker.x < self.x and self.direction == -1) or \
-                                    (attacker.x > self.x and self.direction == 1)
-                
-                if is_hit_from_front:
-                    # --- PARRY LOGIC ---
-                    if self.parry_window > 0:
-                        attacker.is_stunned = 60 # Stun attacker for 1 second
-                        attacker.is_attacking = False # Cancel their attack
-                        text_animations.append(TextAnimation("PARRY!", self.x, self.y - 150, YELLOW, font=LEVEL_FONT, lifespan=40))
-                        for _ in range(15):
-                            particles.append(Particle(self.x + 30 * self.direction, self.y - 60, YELLOW))
-                        play_sound('parry')
-                        screen_shake = 15
-                        return # Successful parry
-
-                    # --- REGULAR BLOCK ---
-                    else:
-                        self.health -= damage * 0.2 # Blocked, take 20% damage
-                        self.hit_duration = 5
-                        text_animations.append(TextAnimation("Blocked", self.x, self.y - 150, GRAY))
-                        play_sound('block')
-                        # Spawn block sparks
-                        for _ in range(3):
-                            particles.append(Particle(self.x + 20 * self.direction, self.y - 50, WHITE))
-                        return # Successfully blocked
-                else:
-                    # Hit from behind while blocking! Fall through to normal hit.
-                    pass
-                
-            # Normal hit (or hit from behind)
-            self.health -= damage
-            self.took_damage_this_round = True
-            play_sound('hit')
-            self.hit_duration = 10 # Frames to flash red
-            self.is_hit = True # Trigger hit animation
-            self.hit_anim_timer = 15 # 0.25 seconds
-            self.is_attacking = False # Cancel current attack
-            text_animations.append(TextAnimation("Hit!", self.x, self.y - 150, RED)) # Added Hit text
-            screen_shake = max(screen_shake, 5) # Add a small shake on hit
-            if self.health <= 0:
-                # If a clone is hit, it just dies
-                if self.is_clone:
-                    self.health = 0
-                    self.is_alive = False
-                    # No death animation for clones, they just disappear
-                    for _ in range(10):
-                        particles.append(Particle(self.x, self.y - 50, PURPLE))
-                    text_animations.append(TextAnimation("Faded", self.x, self.y - 150, PURPLE, font=SPECIAL_FONT, lifespan=40))
-                    # No further logic for clones
-                    return
-
-                # Normal death logic for player/enemy
-                self.health = 0
-                self.is_alive = False
-                self.is_dying = True
-                self.death_anim_timer = 60 # 1 second animation
-                self.vel_x = 0 # Stop moving
-                # Added Dead text
-                text_animations.append(TextAnimation("Dead", self.x, self.y - 150, RED, font=LEVEL_FONT, lifespan=60))
-
-def draw_background(surface, shake_offset=(0,0)):
-    """Draws the sky, stars, and ground."""
-    global platforms
-    # Create a temporary surface to draw on, then blit it with the offset
-    temp_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-    temp_surface.fill(SKY_COLOR)
+    if stickman.is_stunned > 0:
+        # Flash white when stunned
+        draw_color = WHITE if (stickman.is_stunned // 4) % 2 == 0 else stickman.color
+    
+    # Ultimate "charging" flash
+    if stickman.is_ulting and stickman.ult_step == 1:
+        draw_color = YELLOW if (stickman.ult_timer // 3) % 2 == 0 else stickman.color
+    
+    # Enemy ult "shadow" flash
+    if stickman.is_ulting and stickman.ult_step == 2 and not stickman.player_rules:
+        draw_color = PURPLE if (stickman.ult_timer // 2) % 2 == 0 else BLACK
+        
+    # Clone appearance
+    if stickman.is_clone:
+        draw_color = CLONE_COLOR
+        
+    # Meteor slam is fiery whatever else is going on
+    if stickman.is_attacking and stickman.attack_type == "ultimate_pound":
+        draw_color = ORANGE
+
+    # Parry visual effect
+    parry_rect = None
+    if stickman.is_blocking and not (stickman.is_hit or stickman.is_dashing) and stickman.parry_window > 0:
+        parry_rect = pygame.draw.circle(surface, WHITE, view.point(x + 20 * stickman.direction, y - 60), view.length(15),
+                                        view.length(3))
+
+    # --- Draw Ultimate Aura ---
+    aura_color = None
+    if stickman.has_ult_aura and stickman.ultimate_charge == stickman.max_ultimate_charge and not stickman.is_ulting:
+        aura_color = YELLOW
+    elif stickman.is_ulting and stickman.ult_step == 2 and not stickman.player_rules: # Shadow Barrage aura
+         aura_color = PURPLE
+        
+    aura_rect = None
+    if aura_color:
+        aura_rect = aura_sprites.draw(surface, x, y - stickman.height / 2, aura_color, pygame.time.get_ticks())
+
+    # Body, limbs and skin: one blit of the cached pose (see stickman_sprites)
+    area = stickman_sprites.draw(surface, stickman, x, y, draw_color)
+
+    # --- Stun Visual ---
+    if stickman.is_stunned > 0 and stickman.is_stunned % 10 < 5:
+        text_surf = text_cache.render(SPECIAL_FONT, "!!!", True, YELLOW, view.scale)
+        text_rect = text_surf.get_rect(center=view.point(x, y - stickman.height - 15))
+        area.union_ip(surface.blit(text_surf, text_rect))
+    for extra in (parry_rect, aura_rect):
+        if extra:
+            area.union_ip(extra)
+    return area
+
+def draw_dying_stickman(surface, stickman, alpha=1.0):
+    """Draws the stickman collapsing."""
+    x, y = interpolated_pos(stickman, alpha)
+    # progress is 0.0 at start of death, 1.0 at end
+    progress = (60 - stickman.death_anim_timer) / 60.0
+    progress = min(max(progress, 0.0), 1.0) # Clamp
+
+    draw_color = stickman.color
+    
+    # Head starts at y - 0.9*h and ends at y - 0.1*h (on the ground)
+    head_y_offset = -stickman.height * 0.9 + (stickman.height * 0.8 * progress)
+    head_pos = (int(x), int(y + head_y_offset))
+    
+    # Body starts at y - 0.4*h and ends at y - 0.2*h (collapsed)
+    body_y_offset = -stickman.height * 0.4 + (stickman.height * 0.2 * progress)
+    body_end = (int(x), int(y + body_y_offset))
+    body_start = (head_pos[0], head_pos[1] + int(stickman.height * 0.1)) # Connect to head
+    
+    # Legs stay at y
+    leg1_end = (int(x - stickman.width * 0.25 * stickman.direction), int(y))
+    leg2_end = (int(x + stickman.width * 0.25 * stickman.direction), int(y))
+    
+    # Arms collapse
+    arm_start_y_offset = -stickman.height * 0.7 + (stickman.height * 0.5 * progress)
+    arm1_start = (int(x), int(y + arm_start_y_offset))
+    arm2_start = arm1_start
+    
+    arm_end_y_offset = -stickman.height * 0.5 + (stickman.height * 0.3 * progress)
+    arm1_end = (int(x - stickman.width * 0.4 * stickman.direction), int(y + arm_end_y_offset))
+    arm2_end = (int(x + stickman.width * 0.4 * stickman.direction), int(y + arm_end_y_offset))
+
+    # Draw body parts, at the render scale
+    head_pos, body_start, body_end, leg1_end, leg2_end, arm1_start, arm1_end, arm2_end = (
+        view.point(*p) for p in (head_pos, body_start, body_end, leg1_end, leg2_end, arm1_start, arm1_end, arm2_end))
+    arm2_start = arm1_start
+    line_width = view.length(5)
+    area = pygame.draw.circle(surface, draw_color, head_pos, view.length(stickman.height * 0.1)) # Head
+    area.unionall_ip([
+        pygame.draw.line(surface, draw_color, body_start, body_end, line_width), # Body
+        pygame.draw.line(surface, draw_color, body_end, leg1_end, line_width), # Leg 1
+        pygame.draw.line(surface, draw_color, body_end, leg2_end, line_width), # Leg 2
+        pygame.draw.line(surface, draw_color, arm1_start, arm1_end, line_width), # Arm 1
+        pygame.draw.line(surface, draw_color, arm2_start, arm2_end, line_width), # Arm 2
+    ])
+    return area
+
+def draw_dead_stickman(surface, stickman, alpha=1.0):
+    """Draws a 'collapsed' stickman."""
+    x, _ = interpolated_pos(stickman, alpha)
+    head_x = int(x)
+    head_y = int(GROUND_Y - stickman.height * 0.1)
+    
+    # Draw collapsed parts on the ground, at the render scale
+    p = view.point
+    line_width = view.length(5)
+    area = pygame.draw.circle(surface, stickman.color, p(head_x, head_y), view.length(stickman.height * 0.1)) # Head
+    area.unionall_ip([
+        pygame.draw.line(surface, stickman.color, p(head_x, head_y), p(head_x, head_y - 20), line_width), # Body
+        pygame.draw.line(surface, stickman.color, p(head_x, head_y - 20), p(head_x - 15, head_y), line_width), # Leg 1
+        pygame.draw.line(surface, stickman.color, p(head_x, head_y - 20), p(head_x + 15, head_y), line_width), # Leg 2
+        pygame.draw.line(surface, stickman.color, p(head_x, head_y - 15), p(head_x - 20, head_y - 15), line_width), # Arm 1
+        pygame.draw.line(surface, stickman.color, p(head_x, head_y - 15), p(head_x + 20, head_y - 15), line_width), # Arm 2
+    ])
+    return area
+
+def draw_text_animation(surface, text_anim):
+    """Draws floating text, faded by its remaining lifespan. Returns the rect it covered."""
+    # Calculate alpha for fading
+    alpha = int(255 * (text_anim.lifespan / text_anim.max_lifespan))
+    if alpha < 0: alpha = 0
+    
+    # Reuse the cached glyphs and just fade them, instead of re-rasterising every frame
+    text_surf = text_cache.render(FONTS[text_anim.font], text_anim.text, True, text_anim.color, view.scale)
+    text_rect = text_surf.get_rect(center=view.point(text_anim.x, text_anim.y))
+    return text_cache.blit_faded(surface, text_surf, text_rect, alpha)
+
+def draw_projectile(surface, projectile, alpha=1.0):
+    """Draws a fireball (or boss shockwave) from the pre-rendered frames. Returns the rect it covered."""
+    x, y = interpolated_pos(projectile, alpha)
+    return fireball_sprites.draw(surface, x, y, projectile.radius)
+
+# Fireball frames, prepared at level start so the first cast doesn't rasterise
+fireball_sprites = FireballSprites()
+# Stickman poses, rasterised the first time each is drawn (boss clones: at level start)
+stickman_sprites = StickmanSprites()
+CLONE_COLOR = (PURPLE[0], PURPLE[1], PURPLE[2], 150) # Semi-transparent purple
+# Ultimate aura pulse frames, in every colour draw_stickman uses, prepared at level start too
+aura_sprites = AuraSprites()
+AURA_COLORS = (YELLOW, PURPLE)
+
+# Fighter pods and round timer; only what changed is redrawn (see stickman_hud)
+hud = HUD(text_cache, HEALTH_FONT, SPECIAL_FONT, TIMER_FONT)
+
+# Puts fight frames on screen; draw_match() tells it what changed
+presenter = DirtyRectPresenter(enabled=DIRTY_RECTS)
+
+def set_render_scale(scale):
+    """Switches fights to a render target at `scale` and rebuilds everything drawn at that size."""
+    view.set_scale(scale)
+    hud.set_scale(scale)
+    stickman_sprites.set_render_scale(scale)
+    fireball_sprites.set_render_scale(scale)
+    aura_sprites.set_render_scale(scale)
+
+set_render_scale(RENDER_SCALE) # The target already is at it; this sizes the HUD and sprite caches
+
+# Sky, stars, platforms and ground pre-rendered once per level by build_background()
+background_layer = None
+
+def build_background():
+    """Renders the static scene for the current level's platforms into background_layer."""
+    global background_layer
+    layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert() # Match the display format for fast blits
+    layer.fill(SKY_COLOR)
 
     for x, y in stars:
-        pygame.draw.rect(temp_surface, WHITE, (x, y, 2, 2))
-    surface.blit(temp_surface, shake_offset)
+        pygame.draw.rect(layer, WHITE, (x, y, 2, 2))
 
     # Draw all platforms
-    for plat in platforms:
-        pygame.draw.rect(surface, GRAY, plat)
+    for plat in core.platforms:
+        pygame.draw.rect(layer, GRAY, plat)
     # Draw ground
-    pygame.draw.rect(surface, GROUND_COLOR, (0, GROUND_Y, SCREEN_WIDTH, SCREEN_HEIGHT - GROUND_Y))
-
-def draw_health_bars(player, enemy):
-    """Draws health bars for both fighters."""
-    
-    # --- Helper Function for UI Pod ---
-    def draw_player_pod(x, y, player_obj, is_enemy):
-        # Container
-        pod_width = 400
-        pod_height = 130
-        pod_rect = pygame.Rect(x, y, pod_width, pod_height)
-        
-        # Semi-transparent background
-        s = pygame.Surface((pod_width, pod_height), pygame.SRCALPHA)
-        s.fill((GRAY[0], GRAY[1], GRAY[2], 80))
-        screen.blit(s, (x, y))
-        pygame.draw.rect(screen, WHITE, pod_rect, 2) # Frame
-        
-        # --- Head Icon ---
-        head_x = x + 35 if not is_enemy else x + pod_width - 35
-        head_pos = (head_x, y + 40)
-        pygame.draw.circle(screen, player_obj.color, head_pos, 20)
-        # Skin
-        if player_obj.is_player:
-            pygame.draw.line(screen, WHITE, (head_pos[0] - 12, head_pos[1]), (head_pos[0] + 12, head_pos[1]), 5)
-        else:
-            pygame.draw.line(screen, BLACK, (head_pos[0] - 7, head_pos[1] + 2), (head_pos[0] - 2, head_pos[1] - 2), 3) # Left eye
-            pygame.draw.line(screen, BLACK, (head_pos[0] + 2, head_pos[1] - 2), (head_pos[0] + 7, head_pos[1] + 2), 3) # Right eye
-
-        # --- Health Bar ---
-        bar_width = 300
-        bar_height = 25
-        bar_x = x + 80 if not is_enemy else x + 20
-        bar_y = y + 20
-        
-        health_text = HEALTH_FONT.render(f"HP: {int(player_obj.health)}/{int(player_obj.max_health)}", True, WHITE)
-        text_rect = health_text.get_rect(left = bar_x, centery = bar_y + bar_height/2) if not is_enemy \
-                    else health_text.get_rect(right = bar_x + bar_width, centery = bar_y + bar_height/2)
-        
-        pygame.draw.rect(screen, BLACK, (bar_x, bar_y, bar_width, bar_height))
-        
-        health_fill = (player_obj.health / player_obj.max_health) * bar_width
-        health_rect = pygame.Rect(bar_x, bar_y, health_fill, bar_height) if not is_enemy \
-                      else pygame.Rect(bar_x + (bar_width - health_fill), bar_y, health_fill, bar_height)
-        # Gradient Fill
-        if health_fill > 0:
-            health_color_top = GREEN
-            health_color_bottom = (0, 150, 0)
-            pygame.draw.rect(screen, health_color_top, (health_rect.left, health_rect.top, health_rect.width, health_rect.height/2))
-            pygame.draw.rect(screen, health_color_bottom, (health_rect.left, health_rect.centery, health_rect.width, health_rect.height/2))
-            
-        pygame.draw.rect(screen, WHITE, (bar_x, bar_y, bar_width, bar_height), 2)
-        screen.blit(health_text, text_rect)
-
-        # --- Special & Ult Bars ---
-        sub_bar_width = 280
-        sub_bar_height = 15
-        sub_bar_x = x + 80 if not is_enemy else x + 40
-        
-        # Special Bar
-        special_y = y + 70
-        special_charge = (player_obj.max_special_cooldown - player_obj.special_cooldown) / player_obj.max_special_cooldown
-        special_text = SPECIAL_FONT.render('SPECIAL', True, GRAY if special_charge < 1.0 else YELLOW)
-        
-        pygame.draw.rect(screen, BLACK, (sub_bar_x, special_y, sub_bar_width, sub_bar_height))
-        special_fill = sub_bar_width * special_charge
-        special_rect = pygame.Rect(sub_bar_x, special_y, special_fill, sub_bar_height) if not is_enemy \
-                       else pygame.Rect(sub_bar_x + (sub_bar_width - special_fill), special_y, special_fill, sub_bar_height)
-        pygame.draw.rect(screen, PURPLE, special_rect)
-        pygame.draw.rect(screen, WHITE, (sub_bar_x, special_y, sub_bar_width, sub_bar_height), 1)
-        
-        text_rect_spec = special_text.get_rect(right=sub_bar_x - 10, centery=special_y + sub_bar_height/2) if not is_enemy \
-                         else special_text.get_rect(left=sub_bar_x + sub_bar_width + 10, centery=special_y + sub_bar_height/2)
-        screen.blit(special_text, text_rect_spec)
-        
-        # Ultimate Bar
-        ult_y = y + 95
-        ult_charge = player_obj.ultimate_charge / player_obj.max_ultimate_charge
-        ult_text = SPECIAL_FONT.render('ULTIMATE', True, GRAY if ult_charge < 1.0 else ORANGE)
-        
-        pygame.draw.rect(screen, BLACK, (sub_bar_x, ult_y, sub_bar_width, sub_bar_height))
-        ult_fill = sub_bar_width * ult_charge
-        ult_rect = pygame.Rect(sub_bar_x, ult_y, ult_fill, sub_bar_height) if not is_enemy \
-                   else pygame.Rect(sub_bar_x + (sub_bar_width - ult_fill), ult_y, ult_fill, sub_bar_height)
-        pygame.draw.rect(screen, YELLOW, ult_rect)
-        pygame.draw.rect(screen, WHITE, (sub_bar_x, ult_y, sub_bar_width, sub_bar_height), 1)
-        
-        text_rect_ult = ult_text.get_rect(right=sub_bar_x - 10, centery=ult_y + sub_bar_height/2) if not is_enemy \
-                        else ult_text.get_rect(left=sub_bar_x + sub_bar_width + 10, centery=ult_y + sub_bar_height/2)
-        screen.blit(ult_text, text_rect_ult)
-        
-    # Draw Player Pod (Left)
-    draw_player_pod(15, 15, player, is_enemy=False)
-    # Draw Enemy Pod (Right)
-    draw_player_pod(SCREEN_WIDTH - 415, 15, enemy, is_enemy=True)
+    pygame.draw.rect(layer, GROUND_COLOR, (0, GROUND_Y, SCREEN_WIDTH, SCREEN_HEIGHT - GROUND_Y))
+    if view.scale != 1.0:
+        layer = pygame.transform.smoothscale(layer, view.surface.get_size())
+    background_layer = layer
 
+def draw_background(surface, shake_offset=(0,0)):
+    """Draws the sky, stars, platforms and ground from the cached layer (at the render scale)."""
+    if shake_offset != (0, 0):
+        surface.fill(SKY_COLOR) # Cover the strip the shifted layer leaves uncovered
+    surface.blit(background_layer, view.point(*shake_offset))
 
-def draw_level_start(level):
+def draw_level_start(level, wait_ms=1500):
     """Displays the current level number before the round starts."""
     screen.fill(GRAY)
-    level_text = LEVEL_FONT.render(f'Level {level}', True, WHITE)
+    level_text = text_cache.render(LEVEL_FONT, f'Level {level}', True, WHITE)
     text_rect = level_text.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2))
     screen.blit(level_text, text_rect)
     pygame.display.flip()
-    pygame.time.wait(1500) # Pause for 1.5 seconds
-
-def draw_timer(time_left):
-    """Draws the round timer at the top center."""
-    # Simple frame for the timer
-    timer_text = TIMER_FONT.render(f"{time_left}", True, WHITE)
-    text_rect = timer_text.get_rect(center=(SCREEN_WIDTH / 2, 40))
-    frame_rect = text_rect.inflate(20, 10)
-    
-    s = pygame.Surface(frame_rect.size, pygame.SRCALPHA)
-    s.fill((GRAY[0], GRAY[1], GRAY[2], 80))
-    screen.blit(s, frame_rect.topleft)
-    pygame.draw.rect(screen, WHITE, frame_rect, 2)
-    
-    screen.blit(timer_text, text_rect)
+    pygame.time.wait(wait_ms) # Pause for 1.5 seconds by default
 
 def draw_game_over_screen(message):
     """Displays the game over message."""
@@ -1565,11 +425,11 @@ def draw_game_over_screen(message):
     elif "Beat The Game" in message:
         color = YELLOW
         
-    message_text = GAME_OVER_FONT.render(message, True, color)
+    message_text = text_cache.render(GAME_OVER_FONT, message, True, color)
     text_rect = message_text.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 - 50))
     screen.blit(message_text, text_rect)
     
-    restart_text = HEALTH_FONT.render("Press 'R' to Restart", True, WHITE)
+    restart_text = text_cache.render(HEALTH_FONT, "Press 'R' to Restart", True, WHITE)
     restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 + 50))
     screen.blit(restart_text, restart_rect)
     
@@ -1579,11 +439,11 @@ def draw_powerup_screen(selected_powerups, mouse_pos):
     """Draws the power-up selection screen."""
     screen.fill(BLACK)
     
-    title_text = POWERUP_TITLE_FONT.render("Choose a Power-Up!", True, YELLOW)
+    title_text = text_cache.render(POWERUP_TITLE_FONT, "Choose a Power-Up!", True, YELLOW)
     title_rect = title_text.get_rect(center=(SCREEN_WIDTH / 2, 100))
     screen.blit(title_text, title_rect)
     
-    key_text = HEALTH_FONT.render("Press (1), (2), or (3) to choose", True, WHITE)
+    key_text = text_cache.render(HEALTH_FONT, "Press (1), (2), or (3) to choose", True, WHITE)
     key_rect = key_text.get_rect(center=(SCREEN_WIDTH / 2, 160))
     screen.blit(key_text, key_rect)
     
@@ -1603,42 +463,77 @@ def draw_powerup_screen(selected_powerups, mouse_pos):
             pygame.draw.rect(screen, GRAY, box_rect, 5)
         
         # Key number
-        key_num_text = LEVEL_FONT.render(f"({i+1})", True, WHITE)
+        key_num_text = text_cache.render(LEVEL_FONT, f"({i+1})", True, WHITE)
         key_num_rect = key_num_text.get_rect(center=(box_rect.centerx, box_rect.top + 40))
         screen.blit(key_num_text, key_num_rect)
         
         # Power-up name
-        name_text = SPECIAL_FONT.render(powerup['name'], True, GREEN)
+        name_text = text_cache.render(SPECIAL_FONT, powerup['name'], True, GREEN)
         name_rect = name_text.get_rect(center=(box_rect.centerx, box_rect.centery - 20))
         screen.blit(name_text, name_rect)
         
         # Power-up description
-        desc_text = POWERUP_DESC_FONT.render(powerup['desc'], True, WHITE)
+        desc_text = text_cache.render(POWERUP_DESC_FONT, powerup['desc'], True, WHITE)
         desc_rect = desc_text.get_rect(center=(box_rect.centerx, box_rect.centery + 30))
         screen.blit(desc_text, desc_rect)
 
-def run_game(difficulty, selected_character_name, loaded_save_data=None):
-    """Main game loop."""
-    global projectiles, particles, text_animations, platforms, player, enemy, clones # Make player/enemy global for AI Ult
-
-    # 1. Get base character info
-    char_info = CHARACTER_TYPES[selected_character_name]
-
-    # 2. Initialize player_stats with base character stats and default progression/powerup values
-    player_stats = {
-        'character_type': selected_character_name,
-        'level': 0,
-        'xp': 0,
-        'current_level': 1, # Tracks game level progression (1-10)
-        'max_health': char_info['base_health'],
-        'damage': char_info['base_damage'],
-        'speed': char_info['base_speed'],
-        'color': char_info['color'],
-        'special_cd': 180, 'dash_cd': 60, 'teleport_cd': 120, 'crit_chance': 0.0,
-        'fireball_damage': 30, 'stomp_damage': 15, 'ultimate_damage': 75, 'ult_charge_rate': 0,
-        'ultimate_charge': 0, 'max_ultimate_charge': 100, 'full_heal_next_level': False,
-        'max_air_dash': 1, 'has_ult_aura': False, 'lifesteal': 0.0, 'reflect_projectiles': False
-    }
+def pool_notes():
+    """One profiler overlay line per effect pool: live / capacity, high-water mark, misses."""
+    notes = []
+    for name, st in core.pool_stats().items():
+        line = f"{name:<12} {st['in_use']:>5}/{st['capacity']:<5} peak {st['high_water']}"
+        if st['dropped'] or st['overflowed']:
+            line += f"  miss {st['dropped'] + st['overflowed']}"
+        notes.append(line)
+    return notes
+
+def draw_match(player, enemy, time_remaining, alpha):
+    """
+    Draws one frame of a fight into view.surface: background, fighters,
+    effects and HUD (not the profiler overlay), stretches it onto the
+    window, and tells the presenter which window areas changed.
+    """
+    surface = view.surface
+    dirty = [] # Rects on the render target
+    shake_offset = (0, 0)
+    if core.screen_shake > 0: # The core counts the shake down each step
+        shake_offset = (core.cosmetic_rng.randint(-10, 10), core.cosmetic_rng.randint(-10, 10))
+        presenter.invalidate(2) # The whole scene moves, and moves back the frame after the shake
+
+    # Draw background first with shake
+    draw_background(surface, shake_offset)
+    core.profiler.mark('background')
+
+    # Draw everything else (no shake)
+    if player: dirty.append(draw_stickman(surface, player, alpha))
+    if enemy: dirty.append(draw_stickman(surface, enemy, alpha))
+    for clone in core.clones: dirty.append(draw_stickman(surface, clone, alpha))
+    core.profiler.mark('draw_fighters')
+    for p in core.projectiles: dirty.append(draw_projectile(surface, p, alpha))
+    core.particles.draw(surface, view.scale)
+    if presenter.enabled:
+        dirty.extend(core.particles.dirty_rects(scale=view.scale))
+    for ta in core.text_animations: dirty.append(draw_text_animation(surface, ta))
+    core.profiler.mark('draw_effects')
+    if player and enemy: dirty.extend(hud.draw_pods(surface, player, enemy))
+    dirty.extend(hud.draw_timer(surface, time_remaining))
+    core.profiler.mark('hud')
+    view.resolve()
+    core.profiler.mark('resolve')
+    presenter.add_all(view.to_window(rect) for rect in dirty)
+
+def run_game(difficulty, selected_character_name, loaded_save_data=None, replay=None, turbo_steps=1, autoplay=False,
+             practice=False):
+    """
+    Main game loop.
+    With a stickman_replay.Replay, plays that recording's level back instead
+    (its own stats, level and seed; the arguments are ignored) and returns.
+    turbo_steps > 1 starts in fast-forward. With autoplay the AI plays the
+    player, picks power-ups and the run returns at game over without saving.
+    In practice mode REWIND_KEY rewinds the fight; nothing is saved either.
+    """
+    # Initialize player_stats with base character stats and default progression/powerup values
+    player_stats = core.new_player_stats(selected_character_name)
     
     # Load progress for the specific character if available
     if loaded_save_data and selected_character_name in loaded_save_data: # This is correct
@@ -1652,24 +547,44 @@ def run_game(difficulty, selected_character_name, loaded_save_data=None):
     enemy = None
     selected_powerups = []
     
-    round_start_time = 0
-    time_remaining = 0
-    
-    game_over_timer = 0
-    game_over_pending = ""
+    match_round = None # core.Round for the level being fought
+    core.set_cosmetics(turbo_steps <= 1)
+    recorder = None # Records the current level to REPLAY_DIR
+    rewind_buffer = RewindBuffer() if practice and not replay else None
+    save_progress = not (autoplay or practice)
+    sim_accumulator = 0.0 # Real time not yet consumed by fixed simulation steps
     
     mouse_pos = (0, 0) # For powerup screen hover
 
     # This loop handles level progression
     while True:
+        core.profiler.begin_frame()
         
         # --- Event Handling (Global) ---
         mouse_pos = pygame.mouse.get_pos() # Get mouse pos every frame
         
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                if recorder:
+                    recorder.save_to_dir() # Keep the unfinished fight too; it may be the bug report
                 pygame.quit()
                 return # Exit the function entirely
+
+            if event.type == pygame.KEYDOWN:
+                if event.key == PROFILE_OVERLAY_KEY:
+                    core.profiler.show_overlay = not core.profiler.show_overlay
+                elif event.key == PROFILE_CAPTURE_KEY:
+                    core.profiler.capture(PROFILE_CAPTURE_FRAMES, time.strftime("profile-%Y%m%d-%H%M%S.prof"))
+                elif event.key == DIRTY_RECTS_KEY:
+                    presenter.enabled = not presenter.enabled
+                    presenter.reset_stats()
+                elif event.key == TURBO_KEY:
+                    turbo_steps = 1 if turbo_steps > 1 else TURBO_STEPS
+                    core.set_cosmetics(turbo_steps <= 1) # Nobody sees them at this speed
+                elif event.key == REWIND_KEY and rewind_buffer is not None and game_state == 'PLAYING':
+                    restore(rewind_buffer.rewind(REWIND_SECONDS * FPS), match_round)
+                    if recorder:
+                        recorder.truncate(match_round.steps) # The recording continues from the restored step
             
             # State-specific event handling
             if game_state == 'GAME_OVER' or game_state == 'GAME_WON':
@@ -1687,23 +602,7 @@ def run_game(difficulty, selected_character_name, loaded_save_data=None):
                     if chosen_index != -1:
                         # Apply power-up
                         play_sound('powerup')
-                        choice = selected_powerups[chosen_index]
-                        effect = choice['effect']
-                        value = choice['value']
-                        
-                        if effect == 'full_heal':
-                            player_stats['full_heal_next_level'] = True
-                        elif effect == 'ult_aura':
-                            player_stats['has_ult_aura'] = True
-                        elif effect == 'lifesteal':
-                            player_stats['lifesteal'] += value
-                        elif effect == 'reflect_projectiles':
-                            player_stats['reflect_projectiles'] = True
-                        else:
-                            player_stats[effect] += value
-                            # Ensure cooldowns don't go below a minimum
-                            if 'cd' in effect and player_stats[effect] < 30:
-                                player_stats[effect] = 30
+                        core.apply_powerup(player_stats, selected_powerups[chosen_index])
                         
                         current_level += 1
                         game_state = 'START_LEVEL'
@@ -1724,22 +623,7 @@ def run_game(difficulty, selected_character_name, loaded_save_data=None):
                     if chosen_index != -1:
                         # Apply power-up (same as above)
                         play_sound('powerup')
-                        choice = selected_powerups[chosen_index]
-                        effect = choice['effect']
-                        value = choice['value']
-                        
-                        if effect == 'full_heal':
-                            player_stats['full_heal_next_level'] = True
-                        elif effect == 'ult_aura':
-                            player_stats['has_ult_aura'] = True
-                        elif effect == 'lifesteal':
-                            player_stats['lifesteal'] += value
-                        elif effect == 'reflect_projectiles':
-                            player_stats['reflect_projectiles'] = True
-                        else:
-                            player_stats[effect] += value
-                            if 'cd' in effect and player_stats[effect] < 30:
-                                player_stats[effect] = 30
+                        core.apply_powerup(player_stats, selected_powerups[chosen_index])
                         
                         current_level += 1
                         game_state = 'START_LEVEL'
@@ -1748,470 +632,189 @@ def run_game(difficulty, selected_character_name, loaded_save_data=None):
 
         if game_state == 'START_LEVEL':
             # --- Setup Level ---
-            draw_level_start(current_level)
-            
-            # Reset lists
-            projectiles = []
-            particles = []
-            text_animations = []
-            clones = []
-            platforms = []
-            
-            # Create platforms
-            platforms.append(pygame.Rect(SCREEN_WIDTH * 0.2 - 75, GROUND_Y - 120, 150, 30))
-            platforms.append(pygame.Rect(SCREEN_WIDTH * 0.5 - 100, GROUND_Y - 200, 200, 30))
-            platforms.append(pygame.Rect(SCREEN_WIDTH * 0.8 - 75, GROUND_Y - 120, 150, 30))
-            
-            # Create Player
-            player = Stickman(200, GROUND_Y, player_stats['color'], is_player=True, character_type_name=selected_character_name)
-            # Apply all stats from player_stats
-            player.max_health = player_stats['max_health']
-            if player_stats['full_heal_next_level']:
-                player.health = player_stats['max_health']
-                player_stats['full_heal_next_level'] = False # Consume buff
+            intro_ms = 0 if turbo_steps > 1 else 1500
+            if replay:
+                draw_level_start(replay.level, intro_ms)
+                match_round = replay.start()
+                player, enemy = core.player, core.enemy
             else:
-                player.health = player_stats['max_health'] # Heal to new max
-            player.base_damage = player_stats['damage'] # Set base stats
-            player.base_speed = player_stats['speed']
-            player.damage = player_stats['damage']
-            player.speed = player_stats['speed']
-            player.max_special_cooldown = player_stats['special_cd']
-            player.max_dash_cooldown = player_stats['dash_cd']
-            player.max_teleport_cooldown = player_stats['teleport_cd']
-            player.crit_chance = player_stats['crit_chance']
-            player.fireball_damage = player_stats['fireball_damage']
-            player.stomp_damage = player_stats['stomp_damage']
-            player.ultimate_damage = player_stats['ultimate_damage']
-            player.ult_charge_rate = player_stats['ult_charge_rate']
-            player.ultimate_charge = player_stats['ultimate_charge'] # Carry over ult charge
-            player.max_ultimate_charge = player_stats['max_ultimate_charge']
-            player.max_air_dash = player_stats['max_air_dash']
-            player.air_dash_count = player.max_air_dash
-            player.has_ult_aura = player_stats['has_ult_aura']
-            player.took_damage_this_round = False # Reset for the new round
-            player.lifesteal = player_stats['lifesteal']
-            player.can_reflect = player_stats['reflect_projectiles']
-            player.level = player_stats['level']
-            player.xp = player_stats['xp']
-
-            # Apply level bonuses
-            # Agile: +4 HP, +0.5 DMG, +0.2 SPD
-            # Brawler: +5 HP, +1 DMG, +0.1 SPD
-            # Tank: +7 HP, +0.5 DMG, +0.05 SPD
-            char_level_bonus_hp = 0
-            char_level_bonus_damage = 0
-            char_level_bonus_speed = 0
-            if player.character_type_name == "Agile": char_level_bonus_hp, char_level_bonus_damage, char_level_bonus_speed = player.level * 4, player.level * 0.5, player.level * 0.2
-            elif player.character_type_name == "Brawler": char_level_bonus_hp, char_level_bonus_damage, char_level_bonus_speed = player.level * 5, player.level * 1, player.level * 0.1
-            elif player.character_type_name == "Tank": char_level_bonus_hp, char_level_bonus_damage, char_level_bonus_speed = player.level * 7, player.level * 0.5, player.level * 0.05
-
-            player.max_health += char_level_bonus_hp
-            player.health += char_level_bonus_hp # Heal for bonus HP
-            player.damage += char_level_bonus_damage
-            player.speed += char_level_bonus_speed
-
-            
-            # Create Enemy
-            level_stats = {
-                1: (100, 1.0, 5, False), 2: (120, 1.0, 7, False), 3: (140, 1.1, 9, False),
-                4: (160, 1.1, 11, False), 5: (200, 1.2, 13, False), 6: (220, 1.2, 15, False),
-                7: (250, 1.3, 16, False), 8: (280, 1.3, 17, False), 9: (320, 1.4, 18, False),
-                10: (600, 1.2, 25, True) # Boss level
-            }
-            stats = level_stats.get(current_level, level_stats[10]) # Get stats or default to max
-            base_health, base_speed_mult, base_damage, is_boss = stats
-            
-            # --- Apply Difficulty Modifiers ---
-            if difficulty == "Easy":
-                enemy_health = base_health * 0.75
-                enemy_damage = base_damage * 0.8
-                enemy_speed = base_speed_mult * 0.9
-            elif difficulty == "Hard":
-                enemy_health = base_health * 1.3
-                enemy_damage = base_damage * 1.25
-                enemy_speed = base_speed_mult * 1.15
-            else: # Medium
-                enemy_health = base_health
-                enemy_damage = base_damage
-                enemy_speed = base_speed_mult
-            
-            enemy = Stickman(SCREEN_WIDTH - 200, GROUND_Y, RED, is_player=False)
-            enemy.max_health = enemy_health
-            enemy.health = enemy_health
-            enemy.speed_multiplier = enemy_speed
-            enemy.base_damage = enemy_damage # Set base stats
-            enemy.base_speed = 7
-            enemy.damage = enemy_damage
-            enemy.speed = 7
-            enemy.stomp_damage = 10 * (enemy_damage / 5) # Scale stomp too
-            enemy.is_boss = is_boss
-            
-            if is_boss:
-                enemy.scale = 1.2 # Make boss bigger
-                enemy.color = (150, 0, 0) # Darker red
-                enemy.max_ultimate_charge = 150 # Boss needs more to ult
-            
-            # --- Apply Enemy Powerups (Hard Mode) ---
-            if difficulty == "Hard" and current_level > 1 and (current_level - 1) % 3 == 0:
-                choice = random.choice(ai_powerups)
-                effect = choice['effect']
-                value = choice['value']
-                
-                if effect == 'max_health':
-                    enemy.max_health += value
-                    enemy.health = enemy.max_health
-                elif effect == 'damage':
-                    enemy.damage += value
-                elif effect == 'speed':
-                    enemy.speed_multiplier += 0.1 # AI speed is a multiplier
-                elif effect == 'special_cd':
-                    enemy.max_special_cooldown = max(30, enemy.max_special_cooldown + value)
-                elif effect == 'dash_cd':
-                    enemy.max_dash_cooldown = max(30, enemy.max_dash_cooldown + value)
-                elif effect == 'teleport_cd':
-                    enemy.max_teleport_cooldown = max(30, enemy.max_teleport_cooldown + value)
-                # Other powerups are fine to add
-                
-                text_animations.append(TextAnimation(f"Enemy {choice['name']}!", enemy.x, enemy.y - 150, RED, font=LEVEL_FONT, lifespan=60))
-
+                draw_level_start(current_level, intro_ms)
+                seed = random.getrandbits(63)
+                if RECORD_REPLAYS:
+                    recorder = MatchRecorder(seed, selected_character_name, current_level, difficulty, player_stats, player_ai=autoplay)
+                core.seed_match(seed)
+                player, enemy = core.setup_level(player_stats, selected_character_name, current_level, difficulty)
+                match_round = core.Round(current_level, player_ai=autoplay)
+            if rewind_buffer is not None:
+                rewind_buffer.clear()
+                rewind_buffer.push(snapshot(match_round))
+            build_background()
+            fireball_sprites.prepare(core.PROJECTILE_RADIUS)
+            for color in AURA_COLORS:
+                aura_sprites.prepare(color)
+            if enemy.is_boss:
+                stickman_sprites.prepare_clones(CLONE_COLOR)
+            else:
+                stickman_sprites.drop_clones()
+            gc_scheduler.freeze() # Fonts, sounds, the background and the new level are all in place now
+            gc_scheduler.begin_combat()
+            core.profiler.reset() # Don't mix the level intro's pause into the new fight's numbers
+            core.reset_pool_stats()
+            presenter.invalidate() # The level intro is still on screen
+            presenter.reset_stats()
 
             # Reset timers
-            round_start_time = pygame.time.get_ticks()
-            time_remaining = GAME_DURATION_SECONDS
-            game_over_timer = 0
-            game_over_pending = ""
+            clock.tick() # Don't count the level intro as simulation time
+            sim_accumulator = 0.0
             
             game_state = 'PLAYING'
             
         elif game_state == 'PLAYING':
-            clock.tick(FPS)
-            global screen_shake
-            # --- Main Update Loop ---
-            
-            # --- Timer Update ---
-            elapsed_time = (pygame.time.get_ticks() - round_start_time) // 1000
-            time_remaining = max(0, GAME_DURATION_SECONDS - elapsed_time)
-            
+            # Fixed-timestep simulation: real time goes into the accumulator and is
+            # consumed in whole SIM_DT steps. A slow frame runs several steps (the game
+            # keeps its speed), a fast display just draws more often in between.
+            # In turbo, each displayed frame runs a fixed number of steps instead and
+            # only the last one is drawn.
+            frame_time = min(clock.tick(RENDER_FPS_CAP) / 1000.0, MAX_FRAME_TIME)
+            work_start = time.perf_counter()
+            if turbo_steps > 1:
+                steps_due = turbo_steps
+                sim_accumulator = 0.0
+            else:
+                sim_accumulator += frame_time
+                steps_due = int(sim_accumulator / core.SIM_DT)
+                sim_accumulator -= steps_due * core.SIM_DT
+            core.profiler.mark('wait')
+
             # --- Get Key Presses ---
-            keys = pygame.key.get_pressed()
-            
-            # --- Update ---
-            if game_over_timer == 0:
-                player.move(keys)
-                player.attack(keys, enemy.x) # Pass enemy_x for ult
-            
-            player.update()
-            
-            if game_over_timer == 0:
-                enemy.update_ai(player, current_level)
-            
-            enemy.update()
-            
-            # Update clones
-            for clone in clones:
-                clone.update_clone_ai(player)
-                clone.update()
-            
-            # --- Handle Projectile Spawning ---
-            if game_over_timer == 0:
-                if player.is_attacking and player.attack_type == "fireball" and player.attack_frame == 5:
-                    projectiles.append(Projectile(player.x, player.y - player.height * 0.7, player.direction, PURPLE, player.fireball_damage, True))
-                
-                if enemy.is_attacking and enemy.attack_type == "fireball" and enemy.attack_frame == 5:
-                    projectiles.append(Projectile(enemy.x, enemy.y - enemy.height * 0.7, enemy.direction, RED, enemy.fireball_damage, False))
-
-            # --- Update Effects ---
-            for p in projectiles[:]:
-                p.update()
-                if not (0 < p.x < SCREEN_WIDTH):
-                    if p in projectiles:
-                        projectiles.remove(p)
-            
-            for p in particles[:]:
-                p.update()
-                if p.lifespan <= 0:
-                    if p in particles:
-                        particles.remove(p)
-            
-            for ta in text_animations[:]:
-                ta.update()
-                if ta.lifespan <= 0:
-                    if ta in text_animations:
-                        text_animations.remove(ta)
-            
-            # Remove dead clones
-            for c in clones[:]:
-                if not c.is_alive:
-                    clones.remove(c)
-
-            # --- Check Collisions ---
-            if game_over_timer == 0:
-                player_hitbox = player.get_hitbox()
-                enemy_hitbox = enemy.get_hitbox()
-
-                # Player melee attacks enemy
-                if player.attack_hitbox and enemy_hitbox.colliderect(player.attack_hitbox):
-                    # Check for crit
-                    is_crit = random.random() < player.crit_chance
-                    crit_bonus_ult = 5 if is_crit else 0
-                    
-                    # Check for attack type
-                    if player.attack_type == "punch" or player.attack_type == "kick":
-                        dmg = player.damage * (2 if is_crit else 1)
-                        enemy.take_damage(dmg, player)
-                        player.ultimate_charge += (10 + player.ult_charge_rate + crit_bonus_ult)
-                        player.health = min(player.max_health, player.health + (dmg * player.lifesteal)) # Lifesteal
-                        if is_crit:
-                            text_animations.append(TextAnimation("CRIT!", player.attack_hitbox.centerx, player.attack_hitbox.centery, YELLOW, font=LEVEL_FONT, lifespan=30))
-                    
-                    elif player.attack_type == "air_kick" or player.attack_type == "ground_pound":
-                        dmg = player.stomp_damage * (2 if is_crit else 1)
-                        enemy.take_damage(dmg, player)
-                        player.ultimate_charge += (15 + player.ult_charge_rate + crit_bonus_ult)
-                        player.health = min(player.max_health, player.health + (dmg * player.lifesteal)) # Lifesteal
-                        if is_crit:
-                            text_animations.append(TextAnimation("CRIT!", player.attack_hitbox.centerx, player.attack_hitbox.centery, YELLOW, font=LEVEL_FONT, lifespan=30))
-                    
-                    elif player.attack_type == "ultimate_pound":
-                        dmg = player.ultimate_damage
-                        enemy.take_damage(dmg, player) # Ult damage
-                        player.ultimate_charge += 20 # Bonus for landing
-                        player.health = min(player.max_health, player.health + (dmg * player.lifesteal)) # Lifesteal
-                        # Knockback (Increased)
-                        enemy.is_hit = True
-                        enemy.hit_anim_timer = 45
-                        enemy.vel_y = -25
-                        enemy.vel_x = 25 * -player.direction
-                    
-                    for _ in range(5):
-                        particles.append(Particle(player.attack_hitbox.centerx, player.attack_hitbox.centery, YELLOW))
-                    player.attack_hitbox = None 
-                    
-                # Enemy melee attacks player
-                if enemy.attack_hitbox and player_hitbox.colliderect(enemy.attack_hitbox):
-                    dmg = enemy.damage
-                    if enemy.attack_type == "air_kick" or enemy.attack_type == "ground_pound":
-                        dmg = enemy.stomp_damage
-                    elif enemy.attack_type == "shadow_punch":
-                        dmg = enemy.damage * 0.75 # Ult hits are fast but weaker
-                    
-                    player.take_damage(dmg, enemy)
-                    enemy.ultimate_charge = min(enemy.ultimate_charge + 15, enemy.max_ultimate_charge)
-                    
-                    for _ in range(5):
-                        particles.append(Particle(enemy.attack_hitbox.centerx, enemy.attack_hitbox.centery, YELLOW))
-                    enemy.attack_hitbox = None
-                    
-                # Clone attacks player
-                for clone in clones:
-                    if clone.attack_hitbox and player_hitbox.colliderect(clone.attack_hitbox):
-                        player.take_damage(clone.damage, clone)
-                        for _ in range(3): particles.append(Particle(clone.attack_hitbox.centerx, clone.attack_hitbox.centery, PURPLE))
-                        clone.attack_hitbox = None
-                        break # Only one clone can hit per frame
-                
-                # --- Projectile Collisions ---
-                
-                # Projectile vs Projectile (Clash)
-                for p1 in projectiles[:]:
-                    for p2 in projectiles[:]:
-                        if p1 == p2:
-                            continue
-                        if p1.is_player_projectile != p2.is_player_projectile:
-                            if p1.get_hitbox().colliderect(p2.get_hitbox()):
-                                # CLASH
-                                for _ in range(15):
-                                    particles.append(Particle(p1.x, p1.y, ORANGE))
-                                play_sound('clash')
-                                text_animations.append(TextAnimation("CLASH!", p1.x, p1.y, WHITE, lifespan=20))
-                                if p1 in projectiles:
-                                    projectiles.remove(p1)
-                                if p2 in projectiles:
-                                    projectiles.remove(p2)
-                                break # Move to next p1
-                
-                # Projectile vs Stickman
-                for p in projectiles[:]:
-                    proj_hitbox = p.get_hitbox()
-                    if p.is_player_projectile and enemy_hitbox.colliderect(proj_hitbox): # Player's fireball
-                        dmg = p.damage
-                        enemy.take_damage(dmg, player)
-                        player.ultimate_charge += (15 + player.ult_charge_rate)
-                        player.health = min(player.max_health, player.health + (dmg * player.lifesteal)) # Lifesteal
-                        for _ in range(10): particles.append(Particle(p.x, p.y, p.color))
-                        if p in projectiles: projectiles.remove(p)
-                    elif not p.is_player_projectile and player_hitbox.colliderect(proj_hitbox): # Enemy's fireball
-                        # --- Projectile Reflection Logic ---
-                        if player.is_blocking and player.can_reflect:
-                            is_hit_from_front = (p.x < player.x and player.direction == -1) or \
-                                                (p.x > player.x and player.direction == 1)
-                            if is_hit_from_front:
-                                p.is_player_projectile = True
-                                p.direction *= -1
-                                p.vel *= -1
-                                play_sound('parry', volume=0.8)
-                                text_animations.append(TextAnimation("Reflect!", player.x, player.y - 150, BLUE))
-                                continue # Skip to next projectile
-                        player.take_damage(p.damage, enemy)
-                        enemy.ultimate_charge = min(enemy.ultimate_charge + 15, enemy.max_ultimate_charge)
-                        for _ in range(10): particles.append(Particle(p.x, p.y, p.color))
-                        if p in projectiles: projectiles.remove(p)
-                
-                # Cap ultimate charge
-                player.ultimate_charge = min(player.ultimate_charge, player.max_ultimate_charge)
-                enemy.ultimate_charge = min(enemy.ultimate_charge, enemy.max_ultimate_charge)
-
-            # --- Check for Game Over Conditions ---
-            if game_over_timer == 0:
-                if not player.is_alive:
-                    game_over_timer = 60 # 1 second death animation
-                    play_sound('lose')
-                    game_over_pending = "You Lose!"
-                elif not enemy.is_alive:
-                    game_over_timer = 60 # 1 second death animation
-                    play_sound('win')
-                    game_over_pending = "You Win!"
-                elif time_remaining == 0:
-                    game_over_timer = 1 # 1 frame delay to show message
-                    if player.health > enemy.health:
-                        game_over_pending = "You Win!"
-                        play_sound('win')
-                    elif enemy.health > player.health:
-                        game_over_pending = "You Lose!"
-                        play_sound('lose')
-                    else:
-                        game_over_pending = "Draw!"
-        
-            # --- Handle Game Over Animation Timer ---
-            if game_over_timer > 0:
-                game_over_timer -= 1
-                if game_over_timer == 0:
+            live_keys = pygame.key.get_pressed()
+            core.profiler.mark('input')
+
+            while steps_due > 0 and game_state == 'PLAYING':
+                steps_due -= 1
+
+                # --- Update ---
+                keys = replay.keys(match_round.steps) if replay else live_keys
+                if recorder:
+                    recorder.record(keys)
+                result = match_round.step(keys)
+                if recorder:
+                    recorder.record_state()
+                if rewind_buffer is not None:
+                    rewind_buffer.push(snapshot(match_round))
+
+                # --- Round Over (after the death/round-over animation) ---
+                if result:
+                    if recorder:
+                        recorder.save_to_dir(result=result)
+                        recorder = None
+                    if replay:
+                        gc_scheduler.end_combat()
+                        return # Watching a recording: no progress to save
                     # Transition to the correct end state
-                    if game_over_pending == "You Win!":
+                    if result == "You Win!":
                         # Save ult charge for next level
                         player_stats['ultimate_charge'] = player.ultimate_charge
                         player_stats['current_level'] = current_level + 1
-                        
+                    
                         # --- XP and Leveling ---
                         xp_gained = 50 + (current_level * 5) # Example XP gain
                         player_stats['xp'] += xp_gained
-                        text_animations.append(TextAnimation(f"+{xp_gained} XP!", player.x, player.y - 180, YELLOW, font=SPECIAL_FONT, lifespan=60))
+                        core.show_text(f"+{xp_gained} XP!", player.x, player.y - 180, YELLOW, font='special', lifespan=60)
 
                         # Check for level up
                         if player_stats['level'] < len(XP_LEVELS) - 1 and player_stats['xp'] >= XP_LEVELS[player_stats['level'] + 1]:
                             player_stats['level'] += 1
-                            text_animations.append(TextAnimation(f"LEVEL UP! {player_stats['level']}", player.x, player.y - 220, GREEN, font=LEVEL_FONT, lifespan=80))
+                            core.show_text(f"LEVEL UP! {player_stats['level']}", player.x, player.y - 220, GREEN, font='level', lifespan=80)
                             play_sound('powerup', volume=1.0) # Use powerup sound for level up
 
-                        # Load existing save data to update only the current character
-                        all_save_data = {}
-                        try:
-                            with open('savegame.json', 'w') as f:
-                                if os.path.exists('savegame.json'):
-                                    with open('savegame.json', 'r') as f_read:
-                                        all_save_data = json.load(f_read)
-                        except Exception as e:
-                            print(f"Error loading save data for update: {e}")
-
                         # --- Flawless Bonus ---
                         if not player.took_damage_this_round:
                             player_stats['max_health'] += 10
                             player_stats['damage'] += 5
-                            text_animations.append(TextAnimation("Flawless!", player.x, player.y - 150, YELLOW, font=LEVEL_FONT, lifespan=80))
+                            core.show_text("Flawless!", player.x, player.y - 150, YELLOW, font='level', lifespan=80)
                             play_sound('powerup', volume=1.0)
 
-                        all_save_data[selected_character_name] = player_stats # Update current character's stats
-                        try:
-                            with open('savegame.json', 'w') as f:
-                                json.dump(all_save_data, f, indent=4) # Pretty print JSON
-                        except Exception as e: print(f"Error saving game: {e}")
+                        if save_progress:
+                            save_store.set_character(selected_character_name, player_stats) # Update current character's stats
 
                         if current_level == MAX_LEVEL:
+                            # Beating the game clears this character's progress (once, not every frame)
+                            if save_progress:
+                                save_store.delete_character(selected_character_name)
                             game_state = 'GAME_WON'
                         else:
                             # Get 3 unique powerups
                             selected_powerups = []
                             available_powerups = all_powerups[:]
                             while len(selected_powerups) < 3 and available_powerups:
-                                choice = random.choice(available_powerups)
+                                choice = core.rng.choice(available_powerups) # Gameplay stream: the offer is part of the run
                                 selected_powerups.append(choice)
                                 available_powerups.remove(choice)
-                                
+                            
                             game_state = 'POWERUP'
-                    elif game_over_pending == "You Lose!" or game_over_pending == "Draw!":
+                    elif result == "You Lose!" or result == "Draw!":
                         # On loss, update XP and level, but don't advance current_level
                         player_stats['xp'] = player.xp
                         player_stats['level'] = player.level
 
-                        # Load existing save data to update only the current character
-                        all_save_data = {}
-                        try:
-                            if os.path.exists('savegame.json'):
-                                with open('savegame.json', 'r') as f:
-                                    all_save_data = json.load(f)
-                        except Exception as e:
-                            print(f"Error loading save data for update: {e}")
-
-                        all_save_data[selected_character_name] = player_stats # Update current character's stats
-                        try:
-                            with open('savegame.json', 'w') as f:
-                                json.dump(all_save_data, f, indent=4) # Pretty print JSON
-                        except Exception as e: print(f"Error saving game: {e}")
+                        if save_progress:
+                            save_store.set_character(selected_character_name, player_stats) # Update current character's stats
 
                         # No longer delete save file on loss, just update character progress
                         game_state = 'GAME_OVER'
 
+            if replay and match_round.steps >= len(replay):
+                gc_scheduler.end_combat()
+                return # Recording ended before the round did (the player quit)
+            core.profiler.mark('other')
+
             # --- Drawing ---
-            shake_offset = (0, 0)
-            if screen_shake > 0:
-                shake_offset = (random.randint(-10, 10), random.randint(-10, 10))
-                screen_shake -= 1
-
-            # Draw background first with shake
-            draw_background(screen, shake_offset)
-
-            # Draw everything else (no shake)
-            if player: player.draw(screen)
-            if enemy: enemy.draw(screen)
-            for clone in clones: clone.draw(screen)
-            for p in projectiles: p.draw(screen)
-            for p in particles: p.draw(screen)
-            for ta in text_animations: ta.draw(screen)
-            if player and enemy: draw_health_bars(player, enemy)
-            draw_timer(time_remaining)
-            pygame.display.flip()
+            # How far we are between the last two simulation steps (0..1)
+            alpha = 1.0 if turbo_steps > 1 else sim_accumulator / core.SIM_DT
+            draw_match(player, enemy, match_round.time_remaining, alpha)
+            if core.profiler.show_overlay:
+                presenter.add(core.profiler.draw(screen, text_cache, PROFILER_FONT,
+                                                 notes=pool_notes() + gc_scheduler.notes() + presenter.notes()))
+                core.profiler.mark('overlay')
+            presenter.present()
+            core.profiler.mark('flip')
+            # Spare time is what's left before the next simulation step is due, not before the next
+            # render frame: a late draw at RENDER_FPS_CAP only costs a frame of interpolation
+            step_budget_ms = 1000.0 / FPS if turbo_steps > 1 else (core.SIM_DT - sim_accumulator) * 1000.0
+            gc_scheduler.idle(step_budget_ms - (time.perf_counter() - work_start) * 1000.0)
+            core.profiler.mark('gc')
+            core.profiler.end_frame()
 
         elif game_state == 'POWERUP':
+            gc_scheduler.end_combat() # No-op after the first frame on this screen
             draw_powerup_screen(selected_powerups, mouse_pos)
             pygame.display.flip()
+            if autoplay:
+                core.apply_powerup(player_stats, core.rng.choice(selected_powerups))
+                current_level += 1
+                game_state = 'START_LEVEL'
             
         elif game_state == 'GAME_OVER':
+            gc_scheduler.end_combat()
             draw_game_over_screen("You Lose!")
             pygame.display.flip()
+            if autoplay:
+                print(f"Autoplay: lost on level {current_level}")
+                return
             
         elif game_state == 'GAME_WON':
+            gc_scheduler.end_combat()
             draw_game_over_screen("You Beat The Game!")
             pygame.display.flip()
-            # Delete this character's save data on win
-            all_save_data = {}
-            try:
-                if os.path.exists('savegame.json'):
-                    with open('savegame.json', 'r') as f:
-                        all_save_data = json.load(f)
-            except Exception as e:
-                print(f"Error loading save data for update: {e}")
-
-            if selected_character_name in all_save_data:
-                del all_save_data[selected_character_name] # Remove this character's progress
-            try:
-                with open('savegame.json', 'w') as f:
-                    json.dump(all_save_data, f, indent=4)
-            except Exception as e: print(f"Error deleting save file: {e}")
+            if autoplay:
+                print("Autoplay: beat the game")
+                return
 
 def draw_main_menu(start_button, continue_button, mouse_pos, has_save):
     """Draws the main title screen and start button."""
     screen.fill(SKY_COLOR)
-    title_text = GAME_OVER_FONT.render("Stickman Fighter", True, YELLOW)
+    title_text = text_cache.render(GAME_OVER_FONT, "Stickman Fighter", True, YELLOW)
     title_rect = title_text.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 - 200)) # Moved title up
     screen.blit(title_text, title_rect)
     
@@ -2221,7 +824,7 @@ def draw_main_menu(start_button, continue_button, mouse_pos, has_save):
         if continue_button.collidepoint(mouse_pos): cont_color = (100, 100, 255)
         pygame.draw.rect(screen, cont_color, continue_button, border_radius=10)
         pygame.draw.rect(screen, WHITE, continue_button, 4, border_radius=10)
-        cont_text = LEVEL_FONT.render("Continue", True, WHITE)
+        cont_text = text_cache.render(LEVEL_FONT, "Continue", True, WHITE)
         screen.blit(cont_text, cont_text.get_rect(center=continue_button.center))
     
     # --- Draw Start Button ---
@@ -2231,7 +834,7 @@ def draw_main_menu(start_button, continue_button, mouse_pos, has_save):
         
     pygame.draw.rect(screen, button_color, start_button, border_radius=10)
     pygame.draw.rect(screen, WHITE, start_button, 4, border_radius=10) # Border
-    start_text = LEVEL_FONT.render("START", True, BLACK)
+    start_text = text_cache.render(LEVEL_FONT, "START", True, BLACK)
     start_rect = start_text.get_rect(center=start_button.center)
     screen.blit(start_text, start_rect)
     
@@ -2239,7 +842,7 @@ def draw_main_menu(start_button, continue_button, mouse_pos, has_save):
     instructions_y_start = start_button.bottom + 70
     
     # Section Titles
-    controls_title = LEVEL_FONT.render("Controls", True, WHITE)
+    controls_title = text_cache.render(LEVEL_FONT, "Controls", True, WHITE)
     controls_title_rect = controls_title.get_rect(center=(SCREEN_WIDTH / 2, instructions_y_start))
     screen.blit(controls_title, controls_title_rect)
     
@@ -2252,48 +855,48 @@ def draw_main_menu(start_button, continue_button, mouse_pos, has_save):
     line_height = 40
     
     # Column 1: Movement
-    move_title = HEALTH_FONT.render("--- Movement ---", True, WHITE)
+    move_title = text_cache.render(HEALTH_FONT, "--- Movement ---", True, WHITE)
     screen.blit(move_title, move_title.get_rect(center=(col1_x, col_y_start)))
     
-    move_w = HEALTH_FONT.render("W = Jump", True, WHITE)
+    move_w = text_cache.render(HEALTH_FONT, "W = Jump", True, WHITE)
     screen.blit(move_w, move_w.get_rect(center=(col1_x, col_y_start + line_height * 1)))
-    move_a = HEALTH_FONT.render("A = Move Left", True, WHITE)
+    move_a = text_cache.render(HEALTH_FONT, "A = Move Left", True, WHITE)
     screen.blit(move_a, move_a.get_rect(center=(col1_x, col_y_start + line_height * 2)))
-    move_d = HEALTH_FONT.render("D = Move Right", True, WHITE)
+    move_d = text_cache.render(HEALTH_FONT, "D = Move Right", True, WHITE)
     screen.blit(move_d, move_d.get_rect(center=(col1_x, col_y_start + line_height * 3)))
-    move_s = HEALTH_FONT.render("S (Air) = Ground Pound", True, WHITE)
+    move_s = text_cache.render(HEALTH_FONT, "S (Air) = Ground Pound", True, WHITE)
     screen.blit(move_s, move_s.get_rect(center=(col1_x, col_y_start + line_height * 4)))
 
     # Column 2: Combat
-    combat_title = HEALTH_FONT.render("--- Combat ---", True, WHITE)
+    combat_title = text_cache.render(HEALTH_FONT, "--- Combat ---", True, WHITE)
     screen.blit(combat_title, combat_title.get_rect(center=(col2_x, col_y_start)))
     
-    combat_j = HEALTH_FONT.render("J = Punch", True, WHITE)
+    combat_j = text_cache.render(HEALTH_FONT, "J = Punch", True, WHITE)
     screen.blit(combat_j, combat_j.get_rect(center=(col2_x, col_y_start + line_height * 1)))
-    combat_k = HEALTH_FONT.render("K = Kick", True, WHITE)
+    combat_k = text_cache.render(HEALTH_FONT, "K = Kick", True, WHITE)
     screen.blit(combat_k, combat_k.get_rect(center=(col2_x, col_y_start + line_height * 2)))
-    combat_s = HEALTH_FONT.render("S (Ground) = Block", True, WHITE)
+    combat_s = text_cache.render(HEALTH_FONT, "S (Ground) = Block", True, WHITE)
     screen.blit(combat_s, combat_s.get_rect(center=(col2_x, col_y_start + line_height * 3)))
-    combat_k_air = HEALTH_FONT.render("K (Air) = Air Kick", True, WHITE)
+    combat_k_air = text_cache.render(HEALTH_FONT, "K (Air) = Air Kick", True, WHITE)
     screen.blit(combat_k_air, combat_k_air.get_rect(center=(col2_x, col_y_start + line_height * 4)))
     
     # Column 3: Skills
-    skills_title = HEALTH_FONT.render("--- Skills ---", True, WHITE)
+    skills_title = text_cache.render(HEALTH_FONT, "--- Skills ---", True, WHITE)
     screen.blit(skills_title, skills_title.get_rect(center=(col3_x, col_y_start)))
     
-    skill_l = HEALTH_FONT.render("L = Fireball (Special)", True, WHITE)
+    skill_l = text_cache.render(HEALTH_FONT, "L = Fireball (Special)", True, WHITE)
     screen.blit(skill_l, skill_l.get_rect(center=(col3_x, col_y_start + line_height * 1)))
-    skill_dash = HEALTH_FONT.render("L-Shift = Dash / Air Dash", True, WHITE)
+    skill_dash = text_cache.render(HEALTH_FONT, "L-Shift = Dash / Air Dash", True, WHITE)
     screen.blit(skill_dash, skill_dash.get_rect(center=(col3_x, col_y_start + line_height * 2)))
-    skill_t = HEALTH_FONT.render("T = Teleport", True, WHITE)
+    skill_t = text_cache.render(HEALTH_FONT, "T = Teleport", True, WHITE)
     screen.blit(skill_t, skill_t.get_rect(center=(col3_x, col_y_start + line_height * 3)))
-    skill_u = HEALTH_FONT.render("U = Meteor Slam (Ultimate)", True, WHITE)
+    skill_u = text_cache.render(HEALTH_FONT, "U = Meteor Slam (Ultimate)", True, WHITE)
     screen.blit(skill_u, skill_u.get_rect(center=(col3_x, col_y_start + line_height * 4)))
 
 def draw_difficulty_select(easy_rect, medium_rect, hard_rect, mouse_pos):
     """Draws the difficulty selection screen."""
     screen.fill(SKY_COLOR)
-    title_text = POWERUP_TITLE_FONT.render("Choose Difficulty", True, WHITE)
+    title_text = text_cache.render(POWERUP_TITLE_FONT, "Choose Difficulty", True, WHITE)
     title_rect = title_text.get_rect(center=(SCREEN_WIDTH / 2, 150))
     screen.blit(title_text, title_rect)
     
@@ -2303,7 +906,7 @@ def draw_difficulty_select(easy_rect, medium_rect, hard_rect, mouse_pos):
         easy_color = LIGHT_GREEN
     pygame.draw.rect(screen, easy_color, easy_rect, border_radius=10)
     pygame.draw.rect(screen, WHITE, easy_rect, 4, border_radius=10)
-    easy_text = LEVEL_FONT.render("Easy", True, BLACK)
+    easy_text = text_cache.render(LEVEL_FONT, "Easy", True, BLACK)
     screen.blit(easy_text, easy_text.get_rect(center=easy_rect.center))
     
     # Medium
@@ -2312,7 +915,7 @@ def draw_difficulty_select(easy_rect, medium_rect, hard_rect, mouse_pos):
         medium_color = LIGHT_ORANGE
     pygame.draw.rect(screen, medium_color, medium_rect, border_radius=10)
     pygame.draw.rect(screen, WHITE, medium_rect, 4, border_radius=10)
-    medium_text = LEVEL_FONT.render("Medium", True, BLACK)
+    medium_text = text_cache.render(LEVEL_FONT, "Medium", True, BLACK)
     screen.blit(medium_text, medium_text.get_rect(center=medium_rect.center))
     
     # Hard
@@ -2321,13 +924,13 @@ def draw_difficulty_select(easy_rect, medium_rect, hard_rect, mouse_pos):
         hard_color = LIGHT_RED
     pygame.draw.rect(screen, hard_color, hard_rect, border_radius=10)
     pygame.draw.rect(screen, WHITE, hard_rect, 4, border_radius=10)
-    hard_text = LEVEL_FONT.render("Hard", True, BLACK)
+    hard_text = text_cache.render(LEVEL_FONT, "Hard", True, BLACK)
     screen.blit(hard_text, hard_text.get_rect(center=hard_rect.center))
 
 def draw_character_select_screen(mouse_pos, all_save_data):
     """Draws the character selection screen."""
     screen.fill(SKY_COLOR)
-    title_text = POWERUP_TITLE_FONT.render("Choose Your Fighter", True, YELLOW)
+    title_text = text_cache.render(POWERUP_TITLE_FONT, "Choose Your Fighter", True, YELLOW)
     title_rect = title_text.get_rect(center=(SCREEN_WIDTH / 2, 100))
     screen.blit(title_text, title_rect)
 
@@ -2348,12 +951,12 @@ def draw_character_select_screen(mouse_pos, all_save_data):
             pygame.draw.rect(screen, GRAY, box_rect, 5)
         
         # Character Name
-        name_text = LEVEL_FONT.render(char_name, True, char_info['color'])
+        name_text = text_cache.render(LEVEL_FONT, char_name, True, char_info['color'])
         name_rect = name_text.get_rect(center=(box_rect.centerx, box_rect.top + 30))
         screen.blit(name_text, name_rect)
 
         # Character Description
-        desc_text = SPECIAL_FONT.render(char_info['desc'], True, WHITE)
+        desc_text = text_cache.render(SPECIAL_FONT, char_info['desc'], True, WHITE)
         desc_rect = desc_text.get_rect(center=(box_rect.centerx, box_rect.top + 70))
         screen.blit(desc_text, desc_rect)
 
@@ -2362,7 +965,7 @@ def draw_character_select_screen(mouse_pos, all_save_data):
         char_level = char_save_data.get('level', 0)
         char_xp = char_save_data.get('xp', 0)
 
-        level_text = HEALTH_FONT.render(f"Level: {char_level}", True, YELLOW)
+        level_text = text_cache.render(HEALTH_FONT, f"Level: {char_level}", True, YELLOW)
         level_rect = level_text.get_rect(center=(box_rect.centerx, box_rect.bottom - 80))
         screen.blit(level_text, level_rect)
 
@@ -2385,22 +988,97 @@ def draw_character_select_screen(mouse_pos, all_save_data):
         pygame.draw.rect(screen, BLUE, (xp_bar_x, xp_bar_y, xp_fill, xp_bar_height))
         pygame.draw.rect(screen, WHITE, (xp_bar_x, xp_bar_y, xp_bar_width, xp_bar_height), 1)
 
-        xp_text = SPECIAL_FONT.render(f"XP: {char_xp}/{next_level_xp}", True, WHITE)
+        xp_text = text_cache.render(SPECIAL_FONT, f"XP: {char_xp}/{next_level_xp}", True, WHITE)
         xp_text_rect = xp_text.get_rect(center=(box_rect.centerx, xp_bar_y + xp_bar_height / 2))
         screen.blit(xp_text, xp_text_rect)
 
         # Stats (simplified for display)
         stats_y = box_rect.bottom - 20
-        stats_text = SPECIAL_FONT.render(f"HP: {char_info['base_health'] + char_level * 5}  DMG: {char_info['base_damage'] + char_level * 1}  SPD: {char_info['base_speed'] + char_level * 0.1:.1f}", True, LIGHT_GRAY)
+        stats_text = text_cache.render(SPECIAL_FONT, f"HP: {char_info['base_health'] + char_level * 5}  DMG: {char_info['base_damage'] + char_level * 1}  SPD: {char_info['base_speed'] + char_level * 0.1:.1f}", True, LIGHT_GRAY)
         stats_rect = stats_text.get_rect(center=(box_rect.centerx, stats_y))
         screen.blit(stats_text, stats_rect)
 
-def main():
-    """Main application loop."""
+def run_versus(channel, is_host, character):
+    """
+    Connects to the other player on `channel` (a stickman_netplay.LossyChannel),
+    plays the versus match until it ends, then shows the result until R is pressed.
+    """
+    screen.fill(GRAY)
+    waiting_text = text_cache.render(LEVEL_FONT, "Waiting for the other player...", True, WHITE)
+    screen.blit(waiting_text, waiting_text.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2)))
+    pygame.display.flip()
+    session = connect(channel, is_host, character) # Blocks until the peer answers
+
+    core.set_cosmetics(True)
+    build_background()
+    fireball_sprites.prepare(core.PROJECTILE_RADIUS)
+    for color in AURA_COLORS:
+        aura_sprites.prepare(color)
+    gc_scheduler.freeze()
+    gc_scheduler.begin_combat()
+    core.profiler.reset()
+    core.reset_pool_stats()
+    presenter.invalidate()
+    presenter.reset_stats()
+    message = "Connection lost"
+    clock.tick()
+
+    while not session.finished():
+        core.profiler.begin_frame()
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                return
+            if event.type == pygame.KEYDOWN and event.key == PROFILE_OVERLAY_KEY:
+                core.profiler.show_overlay = not core.profiler.show_overlay
+            elif event.type == pygame.KEYDOWN and event.key == DIRTY_RECTS_KEY:
+                presenter.enabled = not presenter.enabled
+                presenter.reset_stats()
+        # One step per displayed frame: both sides must run at the same rate
+        clock.tick(FPS)
+        work_start = time.perf_counter()
+        core.profiler.mark('wait')
+        if session.disconnected():
+            break
+        session.advance(pygame.key.get_pressed())
+        core.profiler.mark('other')
+
+        draw_match(core.player, core.enemy, session.match_round.time_remaining, 1.0)
+        if core.profiler.show_overlay:
+            presenter.add(core.profiler.draw(screen, text_cache, PROFILER_FONT,
+                                             notes=pool_notes() + gc_scheduler.notes() + presenter.notes()))
+            core.profiler.mark('overlay')
+        presenter.present()
+        core.profiler.mark('flip')
+        gc_scheduler.idle(1000.0 / FPS - (time.perf_counter() - work_start) * 1000.0)
+        core.profiler.mark('gc')
+        core.profiler.end_frame()
+    else:
+        message = session.result_for_local()
+    gc_scheduler.end_combat()
+
+    draw_game_over_screen(message)
+    pygame.display.flip()
+    session.linger() # The peer may still need our last inputs
+    print(session.stats())
+    channel.close()
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                return
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_r:
+                return
+        clock.tick(FPS)
+
+def main(turbo_steps=1, practice=False):
+    """Main application loop. turbo_steps and practice are passed on to run_game."""
     app_state = 'MAIN_MENU' # MAIN_MENU, DIFFICULTY_SELECT, CHARACTER_SELECT
     
+    save_store.refresh()
+
     # --- Button Rects for Menus (Adjusted for 1600x900) ---
-    has_save_file = os.path.exists('savegame.json')
+    has_save_file = save_store.has_save()
     
     continue_button_rect = pygame.Rect(SCREEN_WIDTH / 2 - 150, SCREEN_HEIGHT / 2 - 120, 300, 80)
     start_button_y = SCREEN_HEIGHT / 2 - 20 if has_save_file else SCREEN_HEIGHT / 2 - 60
@@ -2412,7 +1090,6 @@ def main():
 
     selected_difficulty = None # To store difficulty choice before character selection
     selected_character_name = None # To store the chosen character
-    all_save_data = {} # To hold all character save data
 
     while True:
         # Load sounds once at the start
@@ -2424,16 +1101,9 @@ def main():
         
         # Check for save file to update menu
         # A save file exists if it's not empty or contains any character data
-        has_save_file = False
-        try:
-            if os.path.exists('savegame.json'):
-                with open('savegame.json', 'r') as f:
-                    all_save_data = json.load(f)
-                    if all_save_data: # Check if the dictionary is not empty
-                        has_save_file = True
-        except (json.JSONDecodeError, Exception) as e:
-            print(f"Error reading save file: {e}")
-            all_save_data = {} # Reset if corrupted
+        save_store.refresh()
+        all_save_data = save_store.data
+        has_save_file = save_store.has_save()
 
         start_button_y = SCREEN_HEIGHT / 2 - 20 if has_save_file else SCREEN_HEIGHT / 2 - 60
         start_button_rect.y = start_button_y
@@ -2483,7 +1153,9 @@ def main():
                                 play_sound('click')
                                 selected_character_name = char_name
                                 # Now run the game with selected character and difficulty
-                                run_game(selected_difficulty, selected_character_name, loaded_save_data=all_save_data)
+                                run_game(selected_difficulty, selected_character_name, loaded_save_data=all_save_data,
+                                         turbo_steps=turbo_steps, practice=practice)
+                                save_store.refresh(force=True) # Pick up anything changed on disk meanwhile
                                 # When game is over, return to main menu
                                 app_state = 'MAIN_MENU'
                                 break # Exit character selection loop
@@ -2500,4 +1172,38 @@ def main():
         pygame.display.flip()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Stickman Fighter")
+    parser.add_argument('--replay', metavar='PATH', help="Watch a recorded level instead of playing")
+    parser.add_argument('--turbo', type=int, default=1, metavar='N', help=f"Start in fast-forward, N steps per frame (F6 toggles {TURBO_STEPS})")
+    parser.add_argument('--autoplay', action='store_true',
+                        help="Skip the menus and let the AI play a fresh campaign, picking power-ups; nothing is saved")
+    parser.add_argument('--character', choices=list(CHARACTER_TYPES), default=list(CHARACTER_TYPES)[0], help="Character for --autoplay and --versus")
+    parser.add_argument('--difficulty', choices=("Easy", "Medium", "Hard"), default="Medium", help="Difficulty for --autoplay")
+    parser.add_argument('--practice', action='store_true', help="Enable rewinding with F7; progress is not saved")
+    parser.add_argument('--versus', choices=('host', 'guest'), help="Play a networked 1v1 (see stickman_netplay)")
+    parser.add_argument('--port', type=int, default=7000, help="Local UDP port for --versus")
+    parser.add_argument('--peer', type=parse_address, default=('127.0.0.1', 7001), help="The other player for --versus, host:port")
+    parser.add_argument('--net-delay', type=float, default=0.0, help="Injected one-way latency for --versus, ms")
+    parser.add_argument('--net-loss', type=float, default=0.0, help="Fraction of packets --versus drops on purpose")
+    parser.add_argument('--dirty-rects', action='store_true', help="Present fight frames as dirty rects (F8 toggles)")
+    parser.add_argument('--resolution', type=parse_resolution, metavar='WxH',
+                        help=f"Render at WxH (e.g. 800x450) and scale up to the window; default {SCREEN_WIDTH}x{SCREEN_HEIGHT}")
+    args = parser.parse_args()
+    if args.resolution:
+        set_render_scale(args.resolution)
+    if args.dirty_rects:
+        presenter.enabled = True
+    if args.versus:
+        load_sounds()
+        channel = LossyChannel(args.port, args.peer, args.net_delay, loss=args.net_loss)
+        run_versus(channel, args.versus == 'host', args.character)
+    elif args.replay:
+        load_sounds()
+        recording = Replay.load(args.replay)
+        run_game(recording.difficulty, recording.character, replay=recording, turbo_steps=args.turbo)
+    elif args.autoplay:
+        load_sounds()
+        run_game(args.difficulty, args.character, turbo_steps=args.turbo, autoplay=True, practice=args.practice)
+    else:
+        main(turbo_steps=args.turbo, practice=args.practice)
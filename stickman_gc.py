@@ -0,0 +1,132 @@
+"""
+Garbage collector scheduling for Stickman Fighter.
+
+CPython's cyclic collector runs whenever allocation counters cross their
+thresholds, which can land a full (generation 2) collection in the middle of
+a fight frame. GCScheduler moves that work to where nobody notices:
+
+- freeze() after level setup moves everything alive then (fonts, sounds,
+  CHARACTER_TYPES, the pre-rendered background, the pools) into the
+  permanent generation, so later collections don't walk it.
+- begin_combat() raises the generation 2 threshold so full collections never
+  start on their own while PLAYING. Young collections stay automatic; they
+  are cheap, and idle() runs them early in frames with time to spare.
+- end_combat() puts the thresholds back, unfreezes and does the deferred
+  full collection, on the power-up or game over screen. Every way out of a
+  fight must call it, or the raised threshold outlives the fight.
+
+Every collection (automatic or not) is timed through gc.callbacks; notes()
+formats the numbers for the profiler overlay, and end_combat() logs any
+combat pause of SPIKE_MS or more.
+"""
+import gc
+import time
+from collections import deque
+
+from stickman_profiler import percentile
+
+GC_WINDOW = 600 # Collections kept for the pause percentiles
+COMBAT_GEN2_THRESHOLD = 1 << 30 # Large enough that generation 2 never triggers by itself
+IDLE_YOUNG_MS = 1.5 # Spare frame time needed to run a young collection early
+IDLE_FULL_MS = 8.0 # ... and a full one (only if one is overdue)
+SPIKE_MS = 5.0 # Combat pauses this long are counted as spikes
+
+
+class GCScheduler:
+    """
+    Keeps the cyclic GC out of combat frames and records every pause.
+    install() hooks gc.callbacks; everything else is safe to call in any order.
+    """
+    def __init__(self, window=GC_WINDOW):
+        self.pauses = {generation: deque(maxlen=window) for generation in range(3)} # ms per collection
+        self.combat = False
+        self.combat_pauses = 0 # Collections that ran during combat, automatic or idle
+        self.combat_spikes = 0
+        self.longest_combat_ms = 0.0
+        self.saved_threshold = None
+        self.collection_start = None
+        self.installed = False
+
+    def install(self):
+        if not self.installed:
+            gc.callbacks.append(self._on_collection)
+            self.installed = True
+
+    def _on_collection(self, phase, info):
+        if phase == 'start':
+            self.collection_start = time.perf_counter()
+            return
+        if self.collection_start is None:
+            return
+        ms = (time.perf_counter() - self.collection_start) * 1000.0
+        self.collection_start = None
+        self.pauses[info['generation']].append(ms)
+        if self.combat:
+            self.combat_pauses += 1
+            self.combat_spikes += ms >= SPIKE_MS
+            self.longest_combat_ms = max(self.longest_combat_ms, ms)
+
+    def freeze(self):
+        """
+        Collects last level's garbage, then freezes everything alive. Call
+        right after level setup, before the fight starts.
+        """
+        gc.unfreeze() # Last level's frozen objects may be garbage by now
+        gc.collect()
+        gc.freeze()
+
+    def begin_combat(self):
+        """Stops automatic full collections until end_combat()."""
+        if self.combat:
+            return
+        self.saved_threshold = gc.get_threshold()
+        threshold0, threshold1, _ = self.saved_threshold
+        gc.set_threshold(threshold0, threshold1, COMBAT_GEN2_THRESHOLD)
+        self.combat = True
+        self.combat_pauses = 0
+        self.combat_spikes = 0
+        self.longest_combat_ms = 0.0
+
+    def end_combat(self):
+        """Restores the thresholds, thaws the level frozen by freeze() and runs the full collection combat put off."""
+        if not self.combat:
+            return
+        gc.set_threshold(*self.saved_threshold)
+        self.combat = False
+        gc.unfreeze() # The fight is over; whatever of it is garbage now can go in this collection
+        gc.collect()
+        if self.combat_spikes:
+            print(f"GC: {self.combat_spikes} collections of {SPIKE_MS:g} ms or more during the fight "
+                  f"(longest {self.longest_combat_ms:.1f} ms)")
+
+    def idle(self, spare_ms):
+        """
+        Spends a frame's leftover time on collection work that would
+        otherwise land in a later frame. Call after the frame is on screen.
+        """
+        if not self.combat:
+            return
+        threshold0, _, threshold2 = self.saved_threshold
+        counts = gc.get_count()
+        if spare_ms >= IDLE_FULL_MS and counts[2] >= threshold2:
+            gc.collect(2)
+        elif spare_ms >= IDLE_YOUNG_MS and counts[0] >= threshold0 // 2:
+            gc.collect(1)
+
+    def stats(self):
+        """{generation: (collections in window, p50 ms, p99 ms, max ms)}"""
+        result = {}
+        for generation, samples in self.pauses.items():
+            values = sorted(samples)
+            result[generation] = (len(values), percentile(values, 0.50), percentile(values, 0.99),
+                                  values[-1] if values else 0.0)
+        return result
+
+    def notes(self):
+        """Profiler overlay lines: pause percentiles per generation, then this fight's totals."""
+        lines = []
+        for generation, (count, p50, p99, longest) in self.stats().items():
+            lines.append(f"gc gen{generation} {count:>5}  p50 {p50:5.2f} p99 {p99:5.2f} max {longest:5.2f}")
+        lines.append(f"gc in combat {self.combat_pauses}, spikes {self.combat_spikes}, "
+                     f"longest {self.longest_combat_ms:.2f} ms, frozen {gc.get_freeze_count()}")
+        return lines
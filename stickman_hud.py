@@ -0,0 +1,211 @@
+"""
+Cached heads-up display for Stickman Fighter.
+
+The fighter pods and the round timer used to be rebuilt from draw calls
+every frame, allocating a translucent surface for each panel. HUD keeps
+them in layers instead:
+
+- chrome: each pod's translucent panel, frame and head icon, and the timer
+  panel, rendered once and reused until the fighter's look changes;
+- bars: health, special and ultimate are each a small opaque surface,
+  redrawn only when the filled width changes;
+- numbers and labels, which come from the shared TextCache.
+
+When nothing changed, a frame costs a few blits and no draw calls. Layouts
+are in gameplay coordinates; at a render scale below 1 (see stickman_view)
+every layer is built at that scale instead. The draw
+methods return the screen rects whose contents changed since the last call,
+for the dirty-rect presenter (stickman_dirty). Surfaces are converted for
+the display, so create the HUD after set_mode().
+"""
+import pygame
+
+from stickman_core import SCREEN_WIDTH, BLACK, WHITE, GRAY, GREEN, PURPLE, YELLOW, ORANGE
+
+POD_WIDTH = 400
+POD_HEIGHT = 130
+POD_MARGIN = 15 # From the top corners of the screen
+PANEL_COLOR = (GRAY[0], GRAY[1], GRAY[2], 80) # Translucent backing of the pods and the timer
+HEALTH_BAR_SIZE = (300, 25)
+SUB_BAR_SIZE = (280, 15) # Special and ultimate
+HEALTH_LOWER_COLOR = (0, 150, 0) # Bottom half of the health gradient
+TIMER_CENTER = (SCREEN_WIDTH / 2, 40)
+
+
+def scaled(pair, scale):
+    """A gameplay-space point or size in render target pixels."""
+    return round(pair[0] * scale), round(pair[1] * scale)
+
+
+class HudBar:
+    """
+    One fill bar on its own opaque surface; the enemy's bars fill from the right.
+    update() redraws it only when the filled area moves by a pixel.
+    """
+    def __init__(self, size, color, lower_color=None, border=1, from_right=False):
+        self.width, self.height = size
+        self.color = color
+        self.lower_color = lower_color # Two-tone fill: `color` on top, this below
+        self.border = border
+        self.from_right = from_right
+        self.surface = pygame.Surface(size).convert()
+        self.fill_rect = None
+
+    def update(self, fraction):
+        """Sets the filled fraction and returns the bar's surface."""
+        fill = self.width * fraction
+        rect = pygame.Rect(self.width - fill if self.from_right else 0, 0, fill, self.height)
+        if self.fill_rect is not None and rect == self.fill_rect:
+            return self.surface
+        self.fill_rect = rect
+        surf = self.surface
+        surf.fill(BLACK)
+        if fill > 0:
+            if self.lower_color is None:
+                pygame.draw.rect(surf, self.color, rect)
+            else:
+                pygame.draw.rect(surf, self.color, (rect.left, rect.top, rect.width, rect.height / 2))
+                pygame.draw.rect(surf, self.lower_color, (rect.left, rect.centery, rect.width, rect.height / 2))
+        pygame.draw.rect(surf, WHITE, (0, 0, self.width, self.height), self.border)
+        return surf
+
+
+class HudPod:
+    """A fighter's panel: head icon, health bar with HP numbers, special and ultimate bars."""
+    def __init__(self, x, y, is_enemy, scale=1.0):
+        self.pos = scaled((x, y), scale)
+        self.is_enemy = is_enemy
+        self.scale = scale
+        self.chrome = None
+        self.chrome_key = None
+        self.health_size = scaled(HEALTH_BAR_SIZE, scale)
+        self.sub_bar_size = scaled(SUB_BAR_SIZE, scale)
+        self.health_bar = HudBar(self.health_size, GREEN, HEALTH_LOWER_COLOR, border=max(1, round(2 * scale)),
+                                 from_right=is_enemy)
+        self.special_bar = HudBar(self.sub_bar_size, PURPLE, from_right=is_enemy)
+        self.ult_bar = HudBar(self.sub_bar_size, YELLOW, from_right=is_enemy)
+        self.health_pos = scaled((x + 20 if is_enemy else x + 80, y + 20), scale)
+        sub_bar_x = x + 40 if is_enemy else x + 80
+        self.special_pos = scaled((sub_bar_x, y + 70), scale)
+        self.ult_pos = scaled((sub_bar_x, y + 95), scale)
+        self.label_gap = round(10 * scale) # Between a sub bar and its label
+        self.state = None # What the last draw showed, to tell whether the pod changed
+        self.area = None # ... and the screen area it covered, labels included
+
+    def render_chrome(self, fighter):
+        """Panel, frame and head icon, baked into one translucent surface."""
+        surf = pygame.Surface((POD_WIDTH, POD_HEIGHT), pygame.SRCALPHA)
+        surf.fill(PANEL_COLOR)
+        pygame.draw.rect(surf, WHITE, surf.get_rect(), 2) # Frame
+        head = (POD_WIDTH - 35 if self.is_enemy else 35, 40)
+        pygame.draw.circle(surf, fighter.color, head, 20)
+        if fighter.is_player:
+            pygame.draw.line(surf, WHITE, (head[0] - 12, head[1]), (head[0] + 12, head[1]), 5)
+        else:
+            pygame.draw.line(surf, BLACK, (head[0] - 7, head[1] + 2), (head[0] - 2, head[1] - 2), 3) # Left eye
+            pygame.draw.line(surf, BLACK, (head[0] + 2, head[1] - 2), (head[0] + 7, head[1] + 2), 3) # Right eye
+        if self.scale != 1.0:
+            surf = pygame.transform.smoothscale(surf, scaled((POD_WIDTH, POD_HEIGHT), self.scale))
+        return surf.convert_alpha()
+
+    def draw(self, surface, fighter, text_cache, health_font, label_font):
+        """Draws the pod; returns the rect to refresh if it looks different from last time, else None."""
+        chrome_key = (tuple(fighter.color), fighter.is_player)
+        if chrome_key != self.chrome_key:
+            self.chrome = self.render_chrome(fighter)
+            self.chrome_key = chrome_key
+        area = surface.blit(self.chrome, self.pos)
+
+        # Health, with the numbers over the bar on the pod's outer side
+        bar_x, bar_y = self.health_pos
+        width, height = self.health_size
+        surface.blit(self.health_bar.update(fighter.health / fighter.max_health), self.health_pos)
+        health_text = text_cache.render(health_font, f"HP: {int(fighter.health)}/{int(fighter.max_health)}", True, WHITE,
+                                        self.scale)
+        if self.is_enemy:
+            text_rect = health_text.get_rect(right=bar_x + width, centery=bar_y + height / 2)
+        else:
+            text_rect = health_text.get_rect(left=bar_x, centery=bar_y + height / 2)
+        surface.blit(health_text, text_rect)
+
+        special_charge = (fighter.max_special_cooldown - fighter.special_cooldown) / fighter.max_special_cooldown
+        area.union_ip(self.draw_sub_bar(surface, self.special_bar, self.special_pos, special_charge, 'SPECIAL', YELLOW,
+                                        text_cache, label_font))
+        ult_charge = fighter.ultimate_charge / fighter.max_ultimate_charge
+        area.union_ip(self.draw_sub_bar(surface, self.ult_bar, self.ult_pos, ult_charge, 'ULTIMATE', ORANGE,
+                                        text_cache, label_font))
+
+        # Bars and text surfaces are cached, so unchanged objects mean an unchanged picture
+        state = (self.chrome, tuple(self.health_bar.fill_rect), health_text, tuple(self.special_bar.fill_rect),
+                 tuple(self.ult_bar.fill_rect), special_charge >= 1.0, ult_charge >= 1.0)
+        if state == self.state:
+            dirty = None
+        else:
+            dirty = area.union(self.area) if self.area else area # The labels move a little with their colour
+        self.state = state
+        self.area = area
+        return dirty
+
+    def draw_sub_bar(self, surface, bar, pos, charge, label, ready_color, text_cache, label_font):
+        """A special/ultimate bar and its label (grey until full) on the pod's inner side; returns the label's rect."""
+        surface.blit(bar.update(charge), pos)
+        label_surf = text_cache.render(label_font, label, True, GRAY if charge < 1.0 else ready_color, self.scale)
+        width, height = self.sub_bar_size
+        if self.is_enemy:
+            label_rect = label_surf.get_rect(left=pos[0] + width + self.label_gap, centery=pos[1] + height / 2)
+        else:
+            label_rect = label_surf.get_rect(right=pos[0] - self.label_gap, centery=pos[1] + height / 2)
+        return surface.blit(label_surf, label_rect)
+
+
+class HUD:
+    """Both fighter pods and the round timer, drawn from cached layers."""
+    def __init__(self, text_cache, health_font, label_font, timer_font, scale=1.0):
+        self.text_cache = text_cache
+        self.health_font = health_font
+        self.label_font = label_font
+        self.timer_font = timer_font
+        self.scale = None
+        self.set_scale(scale)
+
+    def set_scale(self, scale):
+        """(Re)builds every layer for a render target at `scale`."""
+        if scale == self.scale:
+            return
+        self.scale = scale
+        self.pods = (HudPod(POD_MARGIN, POD_MARGIN, is_enemy=False, scale=scale),
+                     HudPod(SCREEN_WIDTH - POD_WIDTH - POD_MARGIN, POD_MARGIN, is_enemy=True, scale=scale))
+        self.timer_center = scaled(TIMER_CENTER, scale)
+        self.timer_margin = scaled((20, 10), scale) # Panel around the digits
+        self.timer_panels = {} # Panel size -> surface; the size follows the digits' width
+        self.timer_shown = None # Seconds on the timer at the last draw
+        self.timer_rect = None
+
+    def draw_pods(self, surface, player, enemy):
+        """The player's pod top left, the enemy's top right. Returns the rects that changed."""
+        dirty = []
+        for pod, fighter in zip(self.pods, (player, enemy)):
+            rect = pod.draw(surface, fighter, self.text_cache, self.health_font, self.label_font)
+            if rect:
+                dirty.append(rect)
+        return dirty
+
+    def draw_timer(self, surface, time_left):
+        """The seconds left in a framed panel at the top centre. Returns the rects that changed."""
+        timer_text = self.text_cache.render(self.timer_font, f"{time_left}", True, WHITE, self.scale)
+        text_rect = timer_text.get_rect(center=self.timer_center)
+        frame_rect = text_rect.inflate(self.timer_margin)
+        panel = self.timer_panels.get(frame_rect.size)
+        if panel is None:
+            panel = pygame.Surface(frame_rect.size, pygame.SRCALPHA)
+            panel.fill(PANEL_COLOR)
+            pygame.draw.rect(panel, WHITE, panel.get_rect(), max(1, round(2 * self.scale)))
+            panel = self.timer_panels[frame_rect.size] = panel.convert_alpha()
+        surface.blit(panel, frame_rect)
+        surface.blit(timer_text, text_rect)
+        if time_left == self.timer_shown:
+            return []
+        dirty = [frame_rect.union(self.timer_rect) if self.timer_rect else frame_rect] # Fewer digits leave a narrower panel
+        self.timer_shown = time_left
+        self.timer_rect = frame_rect
+        return dirty
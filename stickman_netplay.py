@@ -0,0 +1,431 @@
+"""
+Rollback netplay for two-player versus over UDP.
+
+Both processes run the whole match. Each simulation step needs both
+players' inputs; the local one is known, the remote one usually isn't yet.
+Instead of waiting, the session predicts it (the remote player keeps holding
+whatever they held last) and steps on. When the real input arrives and
+differs from the prediction, the session restores the snapshot taken before
+that step (stickman_snapshot) and re-simulates up to the present with
+core.set_resimulating(True), so nothing is heard or shown twice. At most
+MAX_ROLLBACK steps are ever predicted; past that the session stalls until
+the peer catches up.
+
+Packets carry the sender's last INPUT_REDUNDANCY input masks (the same
+16-bit masks replays use), so a lost packet is covered by the next one. They
+also carry the stickman_statehash.state_hash() of the sender's latest
+confirmed steps, so a desync is caught at the exact step it happened instead
+of silently diverging. The host is always the left fighter
+(core.player) and picks the match seed.
+
+LossyChannel injects latency, jitter and packet loss on the sending side.
+Two headless bots on localhost exercise all of it:
+
+    python stickman_netplay.py --role host --port 7000 --peer 127.0.0.1:7001 --delay 60 --loss 0.1 &
+    python stickman_netplay.py --role guest --port 7001 --peer 127.0.0.1:7000 --delay 60 --loss 0.1
+
+stickman_fighter.py --versus plays the same session in a window.
+"""
+import argparse
+import heapq
+import random
+import socket
+import struct
+import sys
+import time
+
+import stickman_balance
+import stickman_core as core
+from stickman_core import CHARACTER_TYPES, FPS
+from stickman_replay import MaskKeys, keys_to_mask
+from stickman_snapshot import snapshot, restore
+from stickman_statehash import state_hash
+
+NET_MAGIC = b'STKN'
+NET_VERSION = 1
+MAX_ROLLBACK = 8 # Steps that may run ahead of the last confirmed remote input
+INPUT_DELAY = 2 # Local inputs are applied this many steps late, hiding that much latency
+INPUT_REDUNDANCY = 16 # Input masks (and confirmed state hashes) repeated in every packet
+HELLO_INTERVAL = 0.1 # Seconds between handshake packets
+CONNECT_TIMEOUT = 30.0
+DISCONNECT_TIMEOUT = 5.0 # Seconds of silence before the peer is considered gone
+LINGER_SECONDS = 1.0 # Keep sending the last inputs this long after the match ends
+VERSUS_LEVEL = 1 # Only used by update_ai, which versus never calls
+
+PACKET_HELLO = 0
+PACKET_INPUT = 1
+
+# magic, version, type
+_PREFIX = struct.Struct('<4sBB')
+# is host, heard from the peer, seed, character name
+_HELLO = struct.Struct('<??Q16s')
+# first frame of the masks, mask count, ack, frame advantage, first hashed frame, hash count;
+# then the masks (H) and the state hashes (I)
+_INPUT = struct.Struct('<iBibiB')
+
+
+def parse_address(text):
+    """'host:port' -> (host, port)."""
+    host, _, port = text.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+class LossyChannel:
+    """
+    A UDP socket that delays, jitters and drops outgoing packets. With the
+    defaults it is just a non-blocking socket. Call pump() often: delayed
+    packets only leave from there.
+    """
+    def __init__(self, port, peer, delay_ms=0.0, jitter_ms=0.0, loss=0.0, seed=None):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('', port))
+        self.sock.setblocking(False)
+        self.peer = peer
+        self.delay = delay_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.outbox = [] # heap of (due time, sequence, bytes)
+        self.sequence = 0
+        self.sent = 0
+        self.dropped = 0
+
+    def send(self, data):
+        if self.rng.random() < self.loss:
+            self.dropped += 1
+            return
+        due = time.perf_counter() + self.delay + self.rng.uniform(0, self.jitter)
+        heapq.heappush(self.outbox, (due, self.sequence, data))
+        self.sequence += 1
+        self.pump()
+
+    def pump(self):
+        now = time.perf_counter()
+        while self.outbox and self.outbox[0][0] <= now:
+            data = heapq.heappop(self.outbox)[2]
+            try:
+                self.sock.sendto(data, self.peer)
+                self.sent += 1
+            except OSError:
+                pass # Peer not up yet (ICMP unreachable); the next packet repeats everything
+
+    def receive(self):
+        """Every datagram waiting on the socket."""
+        packets = []
+        while True:
+            try:
+                data, _ = self.sock.recvfrom(2048)
+            except BlockingIOError:
+                return packets
+            except ConnectionError:
+                continue # ICMP "port unreachable" from a packet sent before the peer was up
+            packets.append(data)
+
+    def close(self):
+        self.sock.close()
+
+
+class RollbackSession:
+    """
+    One versus match between this process and the peer on `channel`.
+    Call advance(keys) once per displayed frame; it steps the match zero or
+    one times (zero when stalled, or when slowing down to let the peer
+    catch up) and returns how many steps it ran.
+    """
+    def __init__(self, channel, is_host, seed, host_character, guest_character,
+                 input_delay=INPUT_DELAY, max_rollback=MAX_ROLLBACK):
+        self.channel = channel
+        self.is_host = is_host
+        self.input_delay = input_delay
+        self.max_rollback = max_rollback
+
+        core.seed_match(seed)
+        core.setup_versus(core.new_player_stats(host_character), host_character,
+                          core.new_player_stats(guest_character), guest_character)
+        self.match_round = core.Round(VERSUS_LEVEL)
+
+        self.frame = 0 # Next step to simulate
+        self.local_inputs = {frame: 0 for frame in range(input_delay)} # frame -> mask
+        self.remote_inputs = {} # frame -> mask, as received
+        self.used_remote = {} # frame -> mask the simulation used (possibly predicted)
+        self.snapshots = {} # frame -> state before that step
+        self.confirmed = -1 # Remote inputs are known for every frame up to this one
+        self.remote_frame = -1 # Newest remote input frame received
+        self.remote_advantage = 0 # How far ahead the peer thinks it is
+        self.hashes = {} # frame -> state_hash() after that step
+        self.verified = -1 # Newest step whose hash matched the peer's
+        self.desync_frame = None # First step whose hash differed
+        self.ticks = 0 # advance() calls
+        self.last_heard = time.perf_counter()
+        # Stats
+        self.rollbacks = 0
+        self.resimulated = 0
+        self.max_depth = 0
+        self.stalls = 0
+        self.slowdowns = 0
+        self.max_resim_ms = 0.0
+
+    # --- Network ---
+
+    def _send_inputs(self):
+        newest = max(self.local_inputs)
+        first = max(0, newest - INPUT_REDUNDANCY + 1)
+        masks = [self.local_inputs[f] for f in range(first, newest + 1)]
+        advantage = max(-128, min(127, self.frame - self.remote_frame - 1))
+        final = self.final_frame()
+        hash_first = max(0, final - INPUT_REDUNDANCY + 1)
+        hashes = [self.hashes[f] for f in range(hash_first, final + 1)]
+        packet = (_PREFIX.pack(NET_MAGIC, NET_VERSION, PACKET_INPUT)
+                  + _INPUT.pack(first, len(masks), self.confirmed, advantage, hash_first, len(hashes))
+                  + struct.pack(f'<{len(masks)}H{len(hashes)}I', *masks, *hashes))
+        self.channel.send(packet)
+
+    def _receive(self):
+        """Stores new remote inputs; returns the earliest frame we predicted wrong, or None."""
+        mispredicted = None
+        for data in self.channel.receive():
+            if len(data) < _PREFIX.size + _INPUT.size:
+                continue
+            magic, version, kind = _PREFIX.unpack_from(data)
+            if magic != NET_MAGIC or version != NET_VERSION or kind != PACKET_INPUT:
+                continue # Late handshake packets end up here too
+            first, count, _ack, advantage, hash_first, hash_count = _INPUT.unpack_from(data, _PREFIX.size)
+            if len(data) != _PREFIX.size + _INPUT.size + count * 2 + hash_count * 4:
+                continue
+            values = struct.unpack_from(f'<{count}H{hash_count}I', data, _PREFIX.size + _INPUT.size)
+            masks, peer_hashes = values[:count], values[count:]
+            self.last_heard = time.perf_counter()
+            self.remote_advantage = advantage
+            for frame, mask in enumerate(masks, first):
+                if frame in self.remote_inputs or frame <= self.confirmed:
+                    continue
+                self.remote_inputs[frame] = mask
+                self.remote_frame = max(self.remote_frame, frame)
+                if frame in self.used_remote and self.used_remote[frame] != mask:
+                    if mispredicted is None or frame < mispredicted:
+                        mispredicted = frame
+            self._compare_hashes(hash_first, peer_hashes)
+        while self.confirmed + 1 in self.remote_inputs:
+            self.confirmed += 1
+        return mispredicted
+
+    def _compare_hashes(self, first, peer_hashes):
+        # Only steps that are final here too; a rollback may still change the others
+        final = self.final_frame()
+        for frame, peer_hash in enumerate(peer_hashes, first):
+            if frame <= self.verified or frame > final or frame not in self.hashes:
+                continue
+            if self.hashes[frame] != peer_hash:
+                if self.desync_frame is None or frame < self.desync_frame:
+                    self.desync_frame = frame
+            else:
+                self.verified = max(self.verified, frame)
+
+    # --- Simulation ---
+
+    def _predicted(self, frame):
+        """The remote mask for a step: the real one if it's here, else their last confirmed one."""
+        mask = self.remote_inputs.get(frame)
+        if mask is None:
+            mask = self.remote_inputs.get(self.confirmed, 0)
+        return mask
+
+    def _step(self, frame):
+        """Simulates `frame` from the current state, snapshotting first."""
+        self.snapshots[frame] = snapshot(self.match_round)
+        remote = self._predicted(frame)
+        self.used_remote[frame] = remote
+        local = MaskKeys(self.local_inputs[frame])
+        if self.is_host:
+            self.match_round.step(local, MaskKeys(remote))
+        else:
+            self.match_round.step(MaskKeys(remote), local)
+        self.hashes[frame] = state_hash()
+
+    def _rollback(self, frame):
+        """Re-simulates from `frame` up to the present with the inputs now known."""
+        start = time.perf_counter()
+        restore(self.snapshots[frame], self.match_round)
+        core.set_resimulating(True)
+        try:
+            for f in range(frame, self.frame):
+                self._step(f)
+        finally:
+            core.set_resimulating(False)
+        depth = self.frame - frame
+        self.rollbacks += 1
+        self.resimulated += depth
+        self.max_depth = max(self.max_depth, depth)
+        self.max_resim_ms = max(self.max_resim_ms, (time.perf_counter() - start) * 1000.0)
+
+    def _forget_old(self):
+        horizon = min(self.confirmed, self.frame - 1) - INPUT_REDUNDANCY
+        for table in (self.snapshots, self.used_remote, self.remote_inputs, self.local_inputs):
+            for frame in [f for f in table if f < horizon]:
+                del table[frame]
+        for frame in [f for f in self.hashes if f < horizon - 4 * INPUT_REDUNDANCY]:
+            del self.hashes[frame] # Kept longer: a lagging peer may still ask us to compare them
+
+    def advance(self, keys):
+        """Reads the network, rolls back if needed and runs this frame's step. Returns steps run (0 or 1)."""
+        self.ticks += 1
+        self.channel.pump()
+        mispredicted = self._receive()
+        if mispredicted is not None and mispredicted < self.frame:
+            self._rollback(mispredicted)
+        self._forget_old()
+
+        if self.match_round.result and self.finished():
+            self._send_inputs()
+            return 0
+        if self.frame - self.confirmed > self.max_rollback:
+            self.stalls += 1 # Too far ahead of what we know; wait for the peer
+            self._send_inputs()
+            return 0
+        # Both sides run at the same rate; if we're clearly ahead, idle a step so the peer catches up
+        local_advantage = self.frame - self.remote_frame - 1
+        if (local_advantage - self.remote_advantage) / 2 >= 1 and self.ticks % 10 == 0:
+            self.slowdowns += 1
+            self._send_inputs()
+            return 0
+        if self.match_round.result:
+            self._send_inputs()
+            return 0 # Predicted end of match; wait to see whether it's confirmed
+
+        self.local_inputs[self.frame + self.input_delay] = keys_to_mask(keys)
+        self._send_inputs()
+        self._step(self.frame)
+        self.frame += 1
+        return 1
+
+    def final_frame(self):
+        """Newest step that no rollback can change any more (every input up to it is known)."""
+        return min(self.confirmed, self.frame - 1)
+
+    def finished(self):
+        """True once the round's result rests only on confirmed inputs."""
+        return bool(self.match_round.result) and self.confirmed >= self.frame - 1
+
+    def disconnected(self):
+        return time.perf_counter() - self.last_heard > DISCONNECT_TIMEOUT
+
+    def result_for_local(self):
+        """The round result from this side's point of view."""
+        result = self.match_round.result
+        if self.is_host or result not in ("You Win!", "You Lose!"):
+            return result
+        return "You Lose!" if result == "You Win!" else "You Win!"
+
+    def linger(self, seconds=LINGER_SECONDS):
+        """Keeps repeating our last inputs for a moment, in case the peer lost the final packets."""
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            self._send_inputs()
+            self.channel.pump()
+            time.sleep(1.0 / FPS)
+        while self.channel.outbox: # Flush what latency injection is still holding
+            self.channel.pump()
+            time.sleep(0.005)
+
+    def stats(self):
+        desync = f"first desync at step {self.desync_frame}" if self.desync_frame is not None else "no desync"
+        return (f"frame {self.frame}, confirmed {self.confirmed}, rollbacks {self.rollbacks} "
+                f"({self.resimulated} steps re-simulated, deepest {self.max_depth}, slowest {self.max_resim_ms:.2f} ms), "
+                f"stalls {self.stalls}, slowdowns {self.slowdowns}, "
+                f"hashes matched through step {self.verified}, {desync}, "
+                f"packets {self.channel.sent} sent / {self.channel.dropped} dropped")
+
+
+def connect(channel, is_host, character, timeout=CONNECT_TIMEOUT):
+    """
+    Handshake: both sides repeat HELLO until each has heard the other. The
+    host's seed wins. Returns a ready RollbackSession.
+    """
+    seed = random.getrandbits(63) if is_host else 0
+    name = character.encode('utf-8')
+    peer_hello = None
+    deadline = time.perf_counter() + timeout
+    next_hello = 0.0
+    while True:
+        now = time.perf_counter()
+        if now > deadline:
+            raise TimeoutError("no answer from the other player")
+        if now >= next_hello:
+            channel.send(_PREFIX.pack(NET_MAGIC, NET_VERSION, PACKET_HELLO)
+                         + _HELLO.pack(is_host, peer_hello is not None, seed, name))
+            next_hello = now + HELLO_INTERVAL
+        channel.pump()
+        for data in channel.receive():
+            if len(data) < _PREFIX.size:
+                continue
+            magic, version, kind = _PREFIX.unpack_from(data)
+            if magic != NET_MAGIC:
+                continue
+            if version != NET_VERSION:
+                raise ConnectionError(f"the other player runs netplay version {version}, not {NET_VERSION}")
+            if kind == PACKET_INPUT and peer_hello is not None:
+                peer_heard_us = True # Our confirming HELLO was lost, but the peer has started
+            elif kind == PACKET_HELLO and len(data) == _PREFIX.size + _HELLO.size:
+                peer_is_host, peer_heard_us, peer_seed, peer_name = _HELLO.unpack_from(data, _PREFIX.size)
+                if peer_is_host == is_host:
+                    raise ConnectionError("both players chose the same role")
+                peer_hello = (peer_seed, peer_name.rstrip(b'\0').decode('utf-8'))
+            else:
+                continue
+            if peer_heard_us:
+                # One more so the peer knows we heard them too, then start
+                channel.send(_PREFIX.pack(NET_MAGIC, NET_VERSION, PACKET_HELLO) + _HELLO.pack(is_host, True, seed, name))
+                channel.pump()
+                peer_seed, peer_character = peer_hello
+                if is_host:
+                    return RollbackSession(channel, True, seed, character, peer_character)
+                return RollbackSession(channel, False, peer_seed, peer_character, character)
+        time.sleep(0.002)
+
+
+def bot_keys(session, rng):
+    """Headless stand-in for a human: the balance script's policy, with some random mashing."""
+    me, them = (core.player, core.enemy) if session.is_host else (core.enemy, core.player)
+    if rng.random() < 0.15:
+        return MaskKeys(rng.getrandbits(10))
+    return stickman_balance.scripted_keys(me, them)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Headless rollback netplay test: one side of a bot-vs-bot match.")
+    parser.add_argument('--role', choices=('host', 'guest'), required=True)
+    parser.add_argument('--port', type=int, required=True, help="Local UDP port")
+    parser.add_argument('--peer', type=parse_address, required=True, help="The other side, host:port")
+    parser.add_argument('--character', choices=list(CHARACTER_TYPES), default="Brawler")
+    parser.add_argument('--delay', type=float, default=0.0, help="Injected one-way latency, ms")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Extra random latency up to this, ms")
+    parser.add_argument('--loss', type=float, default=0.0, help="Fraction of outgoing packets dropped")
+    parser.add_argument('--seconds', type=float, default=0, help="Stop after this much game time (0 = whole round)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    channel = LossyChannel(args.port, args.peer, args.delay, args.jitter, args.loss)
+    core.set_cosmetics(False)
+    session = connect(channel, args.role == 'host', args.character)
+    print(f"Connected as {args.role}: {core.player.character_type_name} vs {core.enemy.character_type_name}")
+    rng = random.Random()
+    limit = int(args.seconds * FPS) or None
+    next_tick = time.perf_counter()
+    while not session.finished() and (limit is None or session.confirmed < limit):
+        if session.disconnected():
+            print("The other player stopped answering")
+            break
+        session.advance(bot_keys(session, rng))
+        next_tick += 1.0 / FPS
+        time.sleep(max(0.0, next_tick - time.perf_counter()))
+    session.linger()
+    print(session.stats())
+    final = session.final_frame()
+    print(f"Result: {session.result_for_local() or 'stopped'}; state hash after step {final}: {session.hashes[final]:08x}")
+    channel.close()
+    return 1 if session.desync_frame is not None else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""
+Struct-of-arrays particle engine for Stickman Fighter.
+
+All live particles sit in preallocated NumPy arrays: positions, velocities,
+lifespans and colours. Updating them is a handful of vectorised operations
+instead of a Python method call per particle, dead particles are removed by
+swap-compaction, and drawing writes every particle in one pass.
+"""
+import numpy as np
+import pygame
+import pygame.surfarray
+
+PARTICLE_GRAVITY = 0.4
+PARTICLE_LIFESPAN = 20 # Frames
+PARTICLE_SIZE = 4 # Pixels per side
+DIRTY_CELL = 64 # Grid size dirty_rects() groups particles by
+
+
+class ParticleSystem:
+    """
+    Fixed-capacity pool of hit-effect particles.
+    Live particles are always packed into the first `count` slots. Bursts that
+    would go past `capacity` are trimmed rather than growing the arrays
+    (`dropped` counts the particles lost that way; `high_water` is the most
+    ever live at once). While `enabled` is False, emit() does nothing.
+    """
+    def __init__(self, capacity=20000, seed=None):
+        self.capacity = capacity
+        self.count = 0
+        self.high_water = 0
+        self.dropped = 0
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vel_x = np.zeros(capacity, dtype=np.float32)
+        self.vel_y = np.zeros(capacity, dtype=np.float32)
+        self.lifespan = np.zeros(capacity, dtype=np.int16)
+        self.color = np.zeros((capacity, 3), dtype=np.uint8)
+        self.rng = np.random.default_rng(seed) # Own generator: particles never touch the gameplay RNG
+        self.enabled = True
+
+    def seed(self, seed):
+        """Restarts the velocity generator from `seed`."""
+        self.rng = np.random.default_rng(seed)
+
+    def emit(self, x, y, color, count=1, vel_x_range=(-3, 3), vel_y_range=(-5, 2)):
+        """Spawns `count` particles at (x, y) with velocities drawn from the given ranges."""
+        if not self.enabled:
+            return
+        room = self.capacity - self.count
+        if count > room:
+            self.dropped += count - room
+            count = room
+        if count <= 0:
+            return
+        start, end = self.count, self.count + count
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.vel_x[start:end] = self.rng.uniform(vel_x_range[0], vel_x_range[1], count)
+        self.vel_y[start:end] = self.rng.uniform(vel_y_range[0], vel_y_range[1], count)
+        self.lifespan[start:end] = PARTICLE_LIFESPAN
+        self.color[start:end] = color[:3]
+        self.count = end
+        if end > self.high_water:
+            self.high_water = end
+
+    def update(self):
+        """Integrates one frame (with gravity) and compacts out expired particles."""
+        n = self.count
+        if n == 0:
+            return
+        self.x[:n] += self.vel_x[:n]
+        self.y[:n] += self.vel_y[:n]
+        self.vel_y[:n] += PARTICLE_GRAVITY
+        self.lifespan[:n] -= 1
+
+        alive = self.lifespan[:n] > 0
+        new_count = int(np.count_nonzero(alive))
+        if new_count == n:
+            return
+        # Swap-remove: fill dead slots below new_count with the live ones above it
+        holes = np.flatnonzero(~alive[:new_count])
+        movers = np.flatnonzero(alive[new_count:]) + new_count
+        for arr in (self.x, self.y, self.vel_x, self.vel_y, self.lifespan, self.color):
+            arr[holes] = arr[movers]
+        self.count = new_count
+
+    def clear(self):
+        """Removes every particle."""
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def reset_stats(self):
+        """Restarts the high-water mark from the current count and zeroes `dropped`."""
+        self.high_water = self.count
+        self.dropped = 0
+
+    def stats(self):
+        """Occupancy in the same shape as stickman_pool.ObjectPool.stats()."""
+        return {
+            'in_use': self.count,
+            'capacity': self.capacity,
+            'high_water': self.high_water,
+            'dropped': self.dropped,
+            'overflowed': 0,
+        }
+
+    def dirty_rects(self, cell=DIRTY_CELL, scale=1.0):
+        """
+        Rects covering every live particle as draw() with the same `scale`
+        puts them: one per occupied cell of a `cell`-pixel grid, so a burst
+        costs a few rects rather than one each.
+        """
+        n = self.count
+        if n == 0:
+            return []
+        x, y = self._pixel_positions(n, scale)
+        cells = np.stack((x // cell, y // cell), axis=1)
+        size = cell + max(1, round(PARTICLE_SIZE * scale)) # A square can stick out of its cell
+        return [pygame.Rect(int(cx) * cell, int(cy) * cell, size, size) for cx, cy in np.unique(cells, axis=0)]
+
+    def _pixel_positions(self, n, scale):
+        """Integer pixel positions of the first `n` particles on a surface drawn at `scale`."""
+        if scale == 1.0:
+            return self.x[:n].astype(np.int32), self.y[:n].astype(np.int32)
+        return (self.x[:n] * scale).astype(np.int32), (self.y[:n] * scale).astype(np.int32)
+
+    def draw(self, surface, scale=1.0):
+        """
+        Draws every live particle as a small square in one batched pass.
+        Positions and size are multiplied by `scale` (a scaled render target).
+        """
+        n = self.count
+        if n == 0:
+            return
+        size = max(1, round(PARTICLE_SIZE * scale))
+        if surface.get_bytesize() == 4:
+            self._draw_pixels(surface, n, scale, size)
+        else:
+            self._draw_rects(surface, n, scale, size)
+
+    def _draw_pixels(self, surface, n, scale, size):
+        """Writes the squares straight into a 32-bit surface's pixels."""
+        width, height = surface.get_size()
+        r_shift, g_shift, b_shift, _ = surface.get_shifts()
+        alpha_mask = surface.get_masks()[3]
+        colors = self.color[:n].astype(np.uint32)
+        mapped = (colors[:, 0] << r_shift) | (colors[:, 1] << g_shift) | (colors[:, 2] << b_shift) | np.uint32(alpha_mask)
+
+        # One row per pixel of the square, one column per particle
+        offset_x, offset_y = np.meshgrid(np.arange(size), np.arange(size))
+        x, y = self._pixel_positions(n, scale)
+        px = (x[None, :] + offset_x.reshape(-1, 1)).ravel()
+        py = (y[None, :] + offset_y.reshape(-1, 1)).ravel()
+        values = np.broadcast_to(mapped, (size * size, n)).ravel()
+
+        on_screen = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+        pixels = pygame.surfarray.pixels2d(surface)
+        pixels[px[on_screen], py[on_screen]] = values[on_screen]
+        del pixels # Unlocks the surface
+
+    def _draw_rects(self, surface, n, scale, size):
+        """Fallback for surfaces pixels2d can't address (not 32-bit)."""
+        x, y = self._pixel_positions(n, scale)
+        for i in range(n):
+            pygame.draw.rect(surface, self.color[i], (int(x[i]), int(y[i]), size, size))
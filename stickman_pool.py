@@ -0,0 +1,84 @@
+"""
+Fixed-capacity object pools for short-lived effect objects.
+
+Projectiles and floating text live for 20-80 frames, and a busy exchange
+spawns them in bursts. ObjectPool builds `capacity` objects up front and
+hands them out again with reset(), so a fight allocates nothing for them and
+the garbage collector has nothing new to chase mid-round.
+
+Pooled classes use __slots__ and take the same arguments in reset() as in
+__init__. When a pool is empty, acquire() either returns None (cosmetic
+pools: the burst is simply trimmed) or, with overflow=True, builds a one-off
+object that is never taken back (pools whose objects change the match).
+
+    fireball = projectile_pool.acquire(x, y, direction, color, damage, True)
+    ...
+    projectile_pool.release(fireball)
+"""
+
+
+class ObjectPool:
+    """
+    `capacity` pre-built instances of `cls`.
+    `in_use` counts objects handed out and not yet released; `high_water` is
+    the most that were ever out at once (since the last reset_stats());
+    `dropped` and `overflowed` count acquires the pool couldn't serve.
+    """
+    def __init__(self, cls, capacity, *prototype_args, overflow=False):
+        self.cls = cls
+        self.capacity = capacity
+        self.overflow = overflow
+        self.free = [cls(*prototype_args) for _ in range(capacity)]
+        self.out = set() # ids of pooled objects handed out; only these go back on the free list
+        self.in_use = 0
+        self.high_water = 0
+        self.dropped = 0
+        self.overflowed = 0
+
+    def acquire(self, *args, **kwargs):
+        """A reset object, or None if the pool is exhausted (and overflow is off)."""
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args, **kwargs)
+            self.out.add(id(obj))
+            self.in_use += 1
+            if self.in_use > self.high_water:
+                self.high_water = self.in_use
+            return obj
+        if self.overflow:
+            self.overflowed += 1
+            return self.cls(*args, **kwargs)
+        self.dropped += 1
+        return None
+
+    def release(self, obj):
+        """
+        Hands `obj` back. Overflow objects are left to the garbage collector,
+        and releasing an object that is already back does nothing.
+        """
+        if id(obj) in self.out:
+            self.out.remove(id(obj))
+            self.free.append(obj)
+            self.in_use -= 1
+
+    def release_all(self, objects):
+        """Releases every object in `objects` and empties the list in place."""
+        for obj in objects:
+            self.release(obj)
+        objects.clear()
+
+    def reset_stats(self):
+        """Restarts the high-water mark from the current occupancy and zeroes the miss counters."""
+        self.high_water = self.in_use
+        self.dropped = 0
+        self.overflowed = 0
+
+    def stats(self):
+        """{'in_use', 'capacity', 'high_water', 'dropped', 'overflowed'}"""
+        return {
+            'in_use': self.in_use,
+            'capacity': self.capacity,
+            'high_water': self.high_water,
+            'dropped': self.dropped,
+            'overflowed': self.overflowed,
+        }
@@ -0,0 +1,211 @@
+"""
+Frame-time profiler for Stickman Fighter.
+
+FrameProfiler splits each PLAYING frame into named phases (input, fighter
+updates, collisions, drawing, display.flip, ...) with cheap perf_counter
+marks, keeps a rolling window of every phase, and reports p50/p95/p99 per
+phase. It can draw those numbers plus a frame-time graph as an overlay, and
+can run cProfile over the next N frames and dump the result to disk for
+snakeviz / pstats.
+
+The core calls mark() from step(), so the profiler itself never imports
+pygame at module level; only draw() needs it.
+"""
+import cProfile
+import time
+from collections import deque
+
+PROFILE_WINDOW = 240 # Frames kept per phase (4 seconds at 60 FPS)
+STATS_INTERVAL = 15 # Frames between percentile recomputes for the overlay
+GRAPH_HEIGHT = 80 # Pixels; the graph's top is GRAPH_SCALE_MS
+GRAPH_SCALE_MS = 50.0
+FRAME_BUDGET_MS = 1000.0 / 60 # One simulation step; drawn as a line on the graph
+
+# Phases in the order the overlay lists them; unknown names are appended after these
+PHASES = (
+    'wait',          # Event pump and the frame-cap sleep in clock.tick
+    'input',         # pygame.key.get_pressed
+    'fighters',      # Stickman.move/attack/update, update_ai, clone AI
+    'effects',       # Projectile, particle and text animation updates
+    'collisions',    # check_collisions
+    'other',         # Timer, round-over checks and everything unmarked
+    'background',    # draw_background
+    'draw_fighters', # draw_stickman for player, enemy and clones
+    'draw_effects',  # Projectiles, particles, floating text
+    'hud',           # Fighter pods and the round timer (stickman_hud)
+    'resolve',       # Stretching a scaled render target onto the window (stickman_view)
+    'overlay',       # This profiler's own overlay
+    'flip',          # pygame.display.flip
+    'gc',            # Collections stickman_gc runs in the frame's spare time
+)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list (0.0 if it's empty)."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+class FrameProfiler:
+    """
+    Per-phase frame timer.
+    Call begin_frame() at the top of a frame, mark(phase) after each phase
+    (the time since the previous mark is charged to it, and a phase marked
+    several times in one frame, e.g. once per simulation step, adds up), and
+    end_frame() once the frame is on screen. All times are milliseconds.
+    While `enabled` is False every call returns straight away.
+    """
+    def __init__(self, window=PROFILE_WINDOW, enabled=False):
+        self.window = window
+        self.enabled = enabled
+        self.show_overlay = False
+        self.history = {} # phase -> deque of per-frame ms
+        self.frame_times = deque(maxlen=window) # Whole frame, begin_frame to end_frame
+        self.current = {} # phase -> ms so far this frame
+        self.frame_start = None
+        self.last_mark = None
+        self.frames = 0
+        self.cached_stats = None
+        self.stats_age = 0
+        # cProfile capture state
+        self.capture_path = None
+        self.capture_frames_left = 0
+        self.capture_profile = None
+
+    def begin_frame(self):
+        """Starts timing a new frame; anything marked since the last end_frame() is dropped."""
+        if not self.enabled:
+            return
+        if self.capture_path is not None and self.capture_profile is None:
+            self.capture_profile = cProfile.Profile()
+            self.capture_profile.enable()
+        self.current.clear()
+        self.frame_start = self.last_mark = time.perf_counter()
+
+    def mark(self, phase):
+        """Charges the time since the previous mark (or begin_frame) to `phase`."""
+        if not self.enabled or self.last_mark is None:
+            return
+        now = time.perf_counter()
+        self.current[phase] = self.current.get(phase, 0.0) + (now - self.last_mark) * 1000.0
+        self.last_mark = now
+
+    def end_frame(self):
+        """Closes the frame and adds its phase times to the rolling windows."""
+        if not self.enabled or self.frame_start is None:
+            return
+        now = time.perf_counter()
+        self.frame_times.append((now - self.frame_start) * 1000.0)
+        for phase in self.history.keys() | self.current.keys():
+            samples = self.history.get(phase)
+            if samples is None:
+                samples = self.history[phase] = deque(maxlen=self.window)
+            samples.append(self.current.get(phase, 0.0)) # Unmarked this frame counts as 0
+        self.frame_start = self.last_mark = None
+        self.frames += 1
+        self.stats_age += 1
+
+        if self.capture_profile is not None:
+            self.capture_frames_left -= 1
+            if self.capture_frames_left <= 0:
+                self._finish_capture()
+
+    def phase_names(self):
+        """Every phase seen so far, known ones in PHASES order first."""
+        known = [p for p in PHASES if p in self.history]
+        return known + sorted(p for p in self.history if p not in PHASES)
+
+    def stats(self):
+        """{phase: (p50, p95, p99)} over the rolling window, plus 'frame' for whole frames."""
+        result = {}
+        for phase in self.phase_names():
+            values = sorted(self.history[phase])
+            result[phase] = (percentile(values, 0.50), percentile(values, 0.95), percentile(values, 0.99))
+        values = sorted(self.frame_times)
+        result['frame'] = (percentile(values, 0.50), percentile(values, 0.95), percentile(values, 0.99))
+        return result
+
+    def reset(self):
+        """Forgets every sample (e.g. at level start, so a new fight isn't averaged with the last)."""
+        self.history.clear()
+        self.frame_times.clear()
+        self.current.clear()
+        self.frame_start = self.last_mark = None
+        self.cached_stats = None
+
+    # --- cProfile capture ---
+
+    def capture(self, frame_count, path):
+        """Runs cProfile over the next `frame_count` frames and writes the stats to `path`."""
+        if self.capture_profile is not None:
+            return False # A capture is already running
+        self.enabled = True
+        self.capture_path = path
+        self.capture_frames_left = frame_count
+        return True
+
+    def capturing(self):
+        return self.capture_path is not None
+
+    def _finish_capture(self):
+        profile, path = self.capture_profile, self.capture_path
+        profile.disable()
+        self.capture_profile = None
+        self.capture_path = None
+        try:
+            profile.dump_stats(path)
+            print(f"Profile written to {path}")
+        except OSError as e:
+            print(f"Error writing profile: {e}")
+
+    # --- Overlay ---
+
+    def draw(self, surface, text_cache, font, x=10, y=160, notes=()):
+        """
+        Draws the per-phase table, any extra `notes` lines and the frame-time
+        graph at (x, y). Returns the panel's rect.
+        """
+        import pygame # Only the overlay needs it
+
+        if self.cached_stats is None or self.stats_age >= STATS_INTERVAL:
+            self.cached_stats = self.stats()
+            self.stats_age = 0
+        stats = self.cached_stats
+        line_height = font.get_linesize()
+        rows = ['frame'] + [p for p in stats if p != 'frame']
+        width = 360
+        height = line_height * (len(rows) + len(notes) + 1) + GRAPH_HEIGHT + 12
+
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        area = surface.blit(panel, (x, y)) # Grows to cover any text line longer than the panel
+
+        header = "phase          p50    p95    p99 ms"
+        if self.capturing():
+            header += "  [cProfile]"
+        area.union_ip(surface.blit(text_cache.render(font, header, True, (255, 255, 0)), (x + 6, y + 4)))
+        for i, phase in enumerate(rows):
+            p50, p95, p99 = stats[phase]
+            line = f"{phase:<13}{p50:6.2f} {p95:6.2f} {p99:6.2f}"
+            color = (255, 120, 120) if phase == 'frame' and p99 > FRAME_BUDGET_MS * 2 else (255, 255, 255)
+            area.union_ip(surface.blit(text_cache.render(font, line, True, color), (x + 6, y + 4 + line_height * (i + 1))))
+        for i, note in enumerate(notes):
+            area.union_ip(surface.blit(text_cache.render(font, note, True, (180, 220, 255)),
+                                       (x + 6, y + 4 + line_height * (len(rows) + i + 1))))
+
+        # Frame-time graph: one column per frame in the window, newest on the right
+        graph_top = y + height - GRAPH_HEIGHT - 6
+        graph_left = x + 6
+        graph_width = width - 12
+        bar_width = max(1, graph_width // self.window)
+        scale = GRAPH_HEIGHT / GRAPH_SCALE_MS
+        start = graph_left + graph_width - bar_width * len(self.frame_times)
+        for i, ms in enumerate(self.frame_times):
+            bar_height = min(GRAPH_HEIGHT, int(ms * scale))
+            color = (0, 220, 0) if ms <= FRAME_BUDGET_MS * 1.5 else (255, 200, 0) if ms <= FRAME_BUDGET_MS * 3 else (255, 0, 0)
+            pygame.draw.rect(surface, color, (start + i * bar_width, graph_top + GRAPH_HEIGHT - bar_height, bar_width, bar_height))
+        budget_y = graph_top + GRAPH_HEIGHT - int(FRAME_BUDGET_MS * scale)
+        pygame.draw.line(surface, (255, 255, 255), (graph_left, budget_y), (graph_left + graph_width, budget_y), 1)
+        return area
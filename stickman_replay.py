@@ -0,0 +1,236 @@
+"""
+Input recording and frame-exact replay for Stickman Fighter.
+
+A match is fully determined by the player's stats, the level, the
+difficulty, the simulation seed (core.seed_match) and the keys held on each
+simulation step. MatchRecorder stores exactly that: a small JSON header and
+one 16-bit key mask per step, zlib-compressed (a minute of play is usually
+well under a kilobyte). Replay loads the file back and hands out the masks as
+key objects core.step() accepts.
+
+Since version 2 every step also has its stickman_statehash.state_hash()
+(4 bytes a step, stored after the masks), so a re-run can name the exact
+step where it stopped matching. The header keeps the result and a digest of
+the final state too:
+
+    python stickman_replay.py replays/Brawler-L3-20261017-120000.stkr
+"""
+import argparse
+import array
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+
+import pygame # Key constants only
+
+import stickman_core as core
+from stickman_statehash import first_divergence, state_hash
+
+REPLAY_MAGIC = b'STKR'
+REPLAY_VERSION = 2 # 2 added per-step state hashes; version 1 files still load
+REPLAY_DIR = 'replays'
+REPLAY_KEEP = 20 # Newest recordings kept in REPLAY_DIR; older ones are deleted
+
+# Every key the simulation reads, one bit each (order is part of the file format)
+REPLAY_KEYS = (
+    pygame.K_a, pygame.K_d, pygame.K_w, pygame.K_s,
+    pygame.K_j, pygame.K_k, pygame.K_l, pygame.K_u,
+    pygame.K_t, pygame.K_LSHIFT,
+)
+KEY_BITS = {key: 1 << bit for bit, key in enumerate(REPLAY_KEYS)}
+
+_HEADER = struct.Struct('<4sBQI') # magic, version, seed, JSON metadata length
+
+
+def keys_to_mask(keys):
+    """Packs the held REPLAY_KEYS of a get_pressed()-style object into an int."""
+    mask = 0
+    for key, bit in KEY_BITS.items():
+        if keys[key]:
+            mask |= bit
+    return mask
+
+
+class MaskKeys:
+    """A recorded key mask, indexable like pygame.key.get_pressed()."""
+    __slots__ = ('mask',)
+
+    def __init__(self, mask):
+        self.mask = mask
+
+    def __getitem__(self, key):
+        return bool(self.mask & KEY_BITS.get(key, 0))
+
+
+def state_digest():
+    """CRC32 of the fighters' positions and health and the projectile count; equal digests = same end state."""
+    values = []
+    for s in (core.player, core.enemy):
+        values += [float(s.x), float(s.y), float(s.health)]
+    values.append(float(len(core.projectiles)))
+    return zlib.crc32(struct.pack(f'<{len(values)}d', *values))
+
+
+class MatchRecorder:
+    """
+    Records one level. Create it before core.setup_level() (it snapshots
+    player_stats, which setup_level may change), call record(keys) before
+    each simulation step and record_state() after it, and save() when the
+    round is over.
+    """
+    def __init__(self, seed, character, current_level, difficulty, player_stats, player_ai=False):
+        self.seed = seed
+        self.meta = {
+            'character': character,
+            'level': current_level,
+            'difficulty': difficulty,
+            'player_stats': dict(player_stats),
+            'player_ai': player_ai, # Autoplay: the keys are ignored, update_ai drives the player
+        }
+        self.masks = array.array('H')
+        self.hashes = array.array('I')
+
+    def record(self, keys):
+        self.masks.append(keys_to_mask(keys))
+
+    def record_state(self):
+        self.hashes.append(state_hash())
+
+    def truncate(self, steps):
+        """Forgets everything after the first `steps` steps (after a rewind)."""
+        del self.masks[steps:]
+        del self.hashes[steps:]
+
+    def save(self, path, result=""):
+        """Writes the recording, with the result and final-state digest of the live match."""
+        meta = dict(self.meta, result=result, digest=state_digest(), frames=len(self.masks))
+        meta_bytes = json.dumps(meta).encode('utf-8')
+        masks = array.array('H', self.masks)
+        hashes = array.array('I', self.hashes)
+        if sys.byteorder != 'little':
+            masks.byteswap()
+            hashes.byteswap()
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed, len(meta_bytes)))
+            f.write(meta_bytes)
+            f.write(zlib.compress(masks.tobytes() + hashes.tobytes(), 9))
+
+    def save_to_dir(self, directory=REPLAY_DIR, result="", keep=REPLAY_KEEP):
+        """Saves under a timestamped name in `directory` and prunes all but the newest `keep`."""
+        os.makedirs(directory, exist_ok=True)
+        name = f"{self.meta['character']}-L{self.meta['level']}-{time.strftime('%Y%m%d-%H%M%S')}.stkr"
+        path = os.path.join(directory, name)
+        self.save(path, result)
+        recordings = sorted((entry.path for entry in os.scandir(directory) if entry.name.endswith('.stkr')),
+                            key=os.path.getmtime)
+        for old in recordings[:-keep]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+        return path
+
+
+class Replay:
+    """A loaded recording: seed, metadata, one MaskKeys per step and (version 2) the state hashes."""
+    def __init__(self, seed, meta, masks, hashes=None):
+        self.seed = seed
+        self.meta = meta
+        self.masks = masks
+        self.hashes = hashes
+        self.character = meta['character']
+        self.level = meta['level']
+        self.difficulty = meta['difficulty']
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, seed, meta_len = _HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC:
+            raise ValueError(f"{path} is not a Stickman replay")
+        if not 1 <= version <= REPLAY_VERSION:
+            raise ValueError(f"{path} is replay version {version}, expected up to {REPLAY_VERSION}")
+        offset = _HEADER.size
+        meta = json.loads(data[offset:offset + meta_len].decode('utf-8'))
+        payload = zlib.decompress(data[offset + meta_len:])
+        masks = array.array('H')
+        hashes = None
+        if version == 1:
+            masks.frombytes(payload)
+        else:
+            split = meta['frames'] * masks.itemsize
+            masks.frombytes(payload[:split])
+            hashes = array.array('I')
+            hashes.frombytes(payload[split:])
+        if sys.byteorder != 'little':
+            masks.byteswap()
+            if hashes is not None:
+                hashes.byteswap()
+        return cls(seed, meta, masks, hashes)
+
+    def __len__(self):
+        return len(self.masks)
+
+    def keys(self, step_index):
+        """Keys held on a step; nothing is held past the end of the recording."""
+        return MaskKeys(self.masks[step_index] if step_index < len(self.masks) else 0)
+
+    def player_stats(self):
+        """A fresh copy of the recorded stats (setup_level may change it)."""
+        return dict(self.meta['player_stats'])
+
+    def start(self):
+        """Seeds the core and sets the level up as it was recorded; returns a new core.Round."""
+        core.seed_match(self.seed)
+        core.setup_level(self.player_stats(), self.character, self.level, self.difficulty)
+        return core.Round(self.level, player_ai=self.meta.get('player_ai', False))
+
+
+def run_headless(replay):
+    """
+    Replays every recorded step with no rendering.
+    Returns (result, digest, first step whose state hash differs or None, seconds taken).
+    """
+    start = time.perf_counter()
+    match_round = replay.start()
+    result = ""
+    hashes = array.array('I')
+    for step_index in range(len(replay)):
+        result = match_round.step(replay.keys(step_index)) or result
+        hashes.append(state_hash())
+    diverged = first_divergence(replay.hashes, hashes) if replay.hashes is not None else None
+    return result, state_digest(), diverged, time.perf_counter() - start
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Re-run recorded matches headless and check they reproduce "
+                                                 "the recorded result, final state digest and per-step hashes.")
+    parser.add_argument('paths', nargs='+', metavar='REPLAY', help="A .stkr file written by the game")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    core.set_cosmetics(False) # Nothing is drawn, and the recorded result doesn't depend on it
+    failures = 0
+    for path in args.paths:
+        try:
+            replay = Replay.load(path)
+        except (OSError, ValueError, KeyError, struct.error, zlib.error) as e:
+            print(f"{path}: can't load ({e})")
+            failures += 1
+            continue
+        result, digest, diverged, seconds = run_headless(replay)
+        ok = result == replay.meta.get('result') and digest == replay.meta.get('digest') and diverged is None
+        failures += not ok
+        verdict = 'reproduced' if ok else 'DIVERGED' if diverged is None else f'DIVERGED at step {diverged}'
+        print(f"{path}: {len(replay)} steps in {seconds * 1000:.1f} ms ({len(replay) / seconds if seconds else 0:.0f} steps/s), "
+              f"result {result or '-'}, {verdict}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Save file access for Stickman Fighter.
+
+savegame.json maps each character name to that character's saved stats.
+SaveStore keeps the parsed file in memory so the menus can ask about it
+every frame without touching the disk: it only re-reads the file when its
+stat signature (mtime, size, inode) changes, and only stats it a couple of
+times a second.
+
+Writes go through SaveWriter, a background thread, so a frame never waits
+on the disk. Each write lands in a temp file that is fsynced and then
+atomically renamed over the real one, so a crash mid-save leaves either the
+old file or the new one, never a truncated mix.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+
+SAVE_FILE = 'savegame.json'
+SAVE_CHECK_INTERVAL = 0.5 # Seconds between stat() calls while idling in the menus
+
+
+def _file_signature(path):
+    """(mtime_ns, size, inode) of path, or None if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class SaveWriter:
+    """
+    Write-behind saver.
+    submit() serialises the data on the caller's thread (so later changes to
+    it can't leak into the save) and hands the text to a daemon thread. If a
+    newer save arrives before the thread gets to the previous one, only the
+    newest is written. Pending saves are flushed at interpreter exit.
+    """
+    def __init__(self, path=SAVE_FILE):
+        self.path = path
+        self.temp_path = path + '.tmp'
+        self.cond = threading.Condition()
+        self.pending = None # JSON text waiting to be written
+        self.busy = False # True while the thread is writing
+        self.closed = False
+        self.thread = None
+        self.written_signature = None # File signature right after our last write
+        self.writes = 0
+        self.coalesced = 0 # Saves replaced by a newer one before they hit the disk
+
+    def submit(self, data):
+        """Queues data to be written; returns immediately."""
+        text = json.dumps(data, indent=4) # Pretty print JSON
+        with self.cond:
+            if self.closed:
+                raise RuntimeError("SaveWriter is closed")
+            if self.pending is not None:
+                self.coalesced += 1
+            self.pending = text
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="save-writer", daemon=True)
+                self.thread.start()
+                atexit.register(self.close)
+            self.cond.notify_all()
+
+    def idle(self):
+        """True when nothing is queued or being written."""
+        with self.cond:
+            return self.pending is None and not self.busy
+
+    def flush(self, timeout=None):
+        """Blocks until every queued save is on disk. Returns False on timeout."""
+        with self.cond:
+            return self.cond.wait_for(lambda: self.pending is None and not self.busy, timeout)
+
+    def close(self, timeout=5.0):
+        """Flushes, then stops the thread. Safe to call more than once."""
+        self.flush(timeout)
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending is not None or self.closed)
+                if self.pending is None: # Closed with nothing left to write
+                    return
+                text = self.pending
+                self.pending = None
+                self.busy = True
+            try:
+                self._write_atomic(text)
+            except Exception as e:
+                print(f"Error saving game: {e}")
+            finally:
+                with self.cond:
+                    self.busy = False
+                    self.cond.notify_all()
+
+    def _write_atomic(self, text):
+        with open(self.temp_path, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.temp_path, self.path)
+        # Make the rename itself durable (POSIX only; Windows can't open directories)
+        if hasattr(os, 'O_DIRECTORY'):
+            dir_fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        self.written_signature = _file_signature(self.path)
+        self.writes += 1
+
+
+class SaveStore:
+    """
+    In-memory view of the save file.
+    `data` is the parsed dict (empty if there is no file or it's corrupted).
+    Call refresh() once per frame; it is cheap when nothing changed.
+    Changes made through set_character()/delete_character() update `data`
+    straight away and are written in the background by `writer`.
+    """
+    def __init__(self, path=SAVE_FILE, check_interval=SAVE_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self.data = {}
+        self.signature = None # (mtime_ns, size, inode) of the file last loaded
+        self.last_check = None
+        self.loads = 0 # How many times the file was actually parsed
+        self.writer = SaveWriter(path)
+
+    def refresh(self, force=False):
+        """Re-reads the file if it changed since the last load. Returns True if it did."""
+        now = time.monotonic()
+        if not force and self.last_check is not None and now - self.last_check < self.check_interval:
+            return False
+        self.last_check = now
+        if not self.writer.idle():
+            return False # Our own save is in flight; memory is already newer than the disk
+
+        signature = _file_signature(self.path)
+        if signature == self.signature:
+            return False
+        if signature is not None and signature == self.writer.written_signature:
+            self.signature = signature # The file is our last write, which `data` already holds
+            return False
+        self.signature = signature
+        self.data = self._read()
+        return True
+
+    def _read(self):
+        if self.signature is None: # No save file
+            return {}
+        self.loads += 1
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError, ValueError) as e: # Unreadable, not JSON, or not UTF-8
+            print(f"Error reading save file: {e}")
+            return {} # Treat a corrupted file as empty
+        return data if isinstance(data, dict) else {}
+
+    def has_save(self):
+        """True if any character has saved progress."""
+        return bool(self.data)
+
+    def _ensure_loaded(self):
+        # Never write before reading: that would drop every other character's progress
+        if self.last_check is None:
+            self.refresh(force=True)
+
+    def set_character(self, character_name, stats):
+        """Saves one character's stats, keeping everyone else's."""
+        self._ensure_loaded()
+        self.data[character_name] = dict(stats) # Snapshot: the caller keeps changing its copy
+        self.writer.submit(self.data)
+
+    def delete_character(self, character_name):
+        """Removes one character's progress (e.g. after beating the game)."""
+        self._ensure_loaded()
+        if character_name in self.data:
+            del self.data[character_name]
+            self.writer.submit(self.data)
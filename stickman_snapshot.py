@@ -0,0 +1,225 @@
+"""
+Packed snapshots of a running match, and a rewind buffer built on them.
+
+snapshot() packs everything that decides how the match plays on from here
+into one bytes object: both fighters, the boss clones, projectiles,
+platforms, the screen shake counter, the gameplay RNG and (optionally) the
+core.Round timer. restore() writes it back. The player and enemy are
+restored in place, so references the front end holds stay valid. A snapshot
+is a few kilobytes (mostly the Mersenne Twister state) and takes tens of
+microseconds each way, so one can be taken every simulation step.
+
+Particles and floating text are cosmetic (see core.cosmetic_rng) and are
+neither saved nor touched by restore().
+
+    data = snapshot(match_round)
+    ... step the match ...
+    restore(data, match_round) # Back exactly where it was, RNG included
+"""
+import array
+import struct
+import sys
+from operator import attrgetter
+
+import pygame # Rect only
+
+import stickman_core as core
+
+SNAPSHOT_MAGIC = b'STKS'
+SNAPSHOT_VERSION = 2
+REWIND_SECONDS = 10
+
+# Numeric Stickman attributes. Each is packed as a double; a bitmask records
+# which were ints, so restored values have the same type they had.
+STICKMAN_NUMBERS = (
+    'x', 'y', 'prev_x', 'prev_y', 'width', 'height', 'vel_x', 'vel_y', 'scale', 'jump_power', 'gravity',
+    'health', 'max_health', 'base_damage', 'base_speed', 'damage', 'speed', 'speed_multiplier',
+    'crit_chance', 'fireball_damage', 'stomp_damage', 'ultimate_damage', 'ult_charge_rate', 'lifesteal',
+    'attack_frame', 'attack_cooldown', 'combo_step', 'combo_timer', 'special_cooldown', 'max_special_cooldown',
+    'ultimate_charge', 'max_ultimate_charge', 'ult_step', 'ult_timer', 'ult_target_x', 'ult_hit_count',
+    'dodge_cooldown', 'hit_duration', 'death_anim_timer', 'parry_window', 'is_stunned', 'hit_anim_timer',
+    'shockwave_cooldown', 'summon_cooldown', 'dash_cooldown', 'max_dash_cooldown', 'dash_duration',
+    'dash_invulnerability', 'max_air_dash', 'air_dash_count', 'teleport_cooldown', 'max_teleport_cooldown',
+    'walk_frame', 'direction', 'level', 'xp',
+)
+STICKMAN_FLAGS = (
+    'is_clone', 'is_player', 'on_ground', 'can_reflect', 'has_ult_aura', 'is_attacking', 'is_ulting',
+    'is_alive', 'is_dying', 'is_blocking', 'is_hit', 'is_boss', 'took_damage_this_round', 'is_dashing',
+    'player_rules',
+)
+PROJECTILE_NUMBERS = ('x', 'y', 'prev_x', 'prev_y', 'direction', 'vel', 'radius', 'damage')
+
+# Strings are stored as indexes into these (order is part of the format)
+ATTACK_TYPES = ("punch", "kick", "air_kick", "ground_pound", "fireball", "ultimate_pound", "shadow_punch")
+PROJECTILE_KINDS = ("fireball", "shockwave")
+ROUND_MESSAGES = ("", "You Win!", "You Lose!", "Draw!")
+
+# magic, version, clones, projectiles, platforms, screen shake, has round,
+# round steps, time remaining, game over timer, pending, result, RNG gauss flag, RNG gauss value
+_HEADER = struct.Struct('<4sBBHBi?IiiBB?d')
+# numbers, int mask, flags, attack type, has attack hitbox, colour, attack rect
+_STICKMAN = struct.Struct(f'<{len(STICKMAN_NUMBERS)}dQIB?3B4i')
+# numbers, int mask, is player projectile, kind, colour
+_PROJECTILE = struct.Struct(f'<{len(PROJECTILE_NUMBERS)}dB?B3B')
+_PLATFORM = struct.Struct('<4i')
+_RNG_WORDS = 625 # Mersenne Twister state plus its position
+
+_get_stickman_numbers = attrgetter(*STICKMAN_NUMBERS)
+_get_stickman_flags = attrgetter(*STICKMAN_FLAGS)
+_get_projectile_numbers = attrgetter(*PROJECTILE_NUMBERS)
+_ATTACK_INDEX = {name: i for i, name in enumerate(ATTACK_TYPES)}
+_KIND_INDEX = {name: i for i, name in enumerate(PROJECTILE_KINDS)}
+_MESSAGE_INDEX = {text: i for i, text in enumerate(ROUND_MESSAGES)}
+
+
+def _int_mask(values):
+    mask = 0
+    for bit, value in enumerate(values):
+        if type(value) is int:
+            mask |= 1 << bit
+    return mask
+
+
+def _typed(values, mask):
+    return [int(v) if mask >> bit & 1 else v for bit, v in enumerate(values)]
+
+
+def _pack_stickman(s):
+    numbers = _get_stickman_numbers(s)
+    flags = 0
+    for bit, value in enumerate(_get_stickman_flags(s)):
+        if value:
+            flags |= 1 << bit
+    r = s.attack_rect
+    return _STICKMAN.pack(*numbers, _int_mask(numbers), flags, _ATTACK_INDEX[s.attack_type],
+                          s.attack_hitbox is not None, *s.color[:3], r.x, r.y, r.w, r.h)
+
+
+def _unpack_stickman(s, data, offset):
+    fields = _STICKMAN.unpack_from(data, offset)
+    n = len(STICKMAN_NUMBERS)
+    state = s.__dict__
+    state.update(zip(STICKMAN_NUMBERS, _typed(fields[:n], fields[n])))
+    flags = fields[n + 1]
+    state.update((name, bool(flags >> bit & 1)) for bit, name in enumerate(STICKMAN_FLAGS))
+    s.attack_type = ATTACK_TYPES[fields[n + 2]]
+    s.color = fields[n + 4:n + 7]
+    s.attack_rect.update(fields[n + 7:n + 11])
+    s.attack_hitbox = s.attack_rect if fields[n + 3] else None
+    return offset + _STICKMAN.size
+
+
+def snapshot(match_round=None):
+    """Packs the current match (and match_round's timer, if given) into bytes."""
+    rng_version, rng_words, gauss_next = core.rng.getstate()
+    if match_round is not None:
+        round_fields = (True, match_round.steps, match_round.time_remaining, match_round.game_over_timer,
+                        _MESSAGE_INDEX[match_round.pending], _MESSAGE_INDEX[match_round.result])
+    else:
+        round_fields = (False, 0, 0, 0, 0, 0)
+    parts = [_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(core.clones), len(core.projectiles),
+                          len(core.platforms), core.screen_shake, *round_fields,
+                          gauss_next is not None, gauss_next or 0.0)]
+    words = array.array('I', rng_words)
+    if sys.byteorder != 'little':
+        words.byteswap()
+    parts.append(words.tobytes())
+    for s in (core.player, core.enemy, *core.clones):
+        parts.append(_pack_stickman(s))
+    for p in core.projectiles:
+        numbers = _get_projectile_numbers(p)
+        parts.append(_PROJECTILE.pack(*numbers, _int_mask(numbers), p.is_player_projectile,
+                                      _KIND_INDEX[p.kind], *p.color[:3]))
+    for plat in core.platforms:
+        parts.append(_PLATFORM.pack(plat.x, plat.y, plat.w, plat.h))
+    return b''.join(parts)
+
+
+def restore(data, match_round=None):
+    """
+    Puts the match back to a snapshot. The level must already be set up
+    (core.player and core.enemy exist); they are overwritten in place.
+    """
+    (magic, version, clone_count, projectile_count, platform_count, screen_shake,
+     has_round, steps, time_remaining, game_over_timer, pending, result,
+     has_gauss, gauss) = _HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError("not a version %d match snapshot" % SNAPSHOT_VERSION)
+    offset = _HEADER.size
+
+    words = array.array('I')
+    words.frombytes(data[offset:offset + _RNG_WORDS * 4])
+    if sys.byteorder != 'little':
+        words.byteswap()
+    core.rng.setstate((3, tuple(words), gauss if has_gauss else None))
+    offset += _RNG_WORDS * 4
+
+    offset = _unpack_stickman(core.player, data, offset)
+    offset = _unpack_stickman(core.enemy, data, offset)
+    core.clones.clear()
+    for _ in range(clone_count):
+        clone = core.Stickman(0, 0, core.BLACK, is_player=False)
+        offset = _unpack_stickman(clone, data, offset)
+        core.clones.append(clone)
+
+    core.projectile_pool.release_all(core.projectiles)
+    n = len(PROJECTILE_NUMBERS)
+    for _ in range(projectile_count):
+        fields = _PROJECTILE.unpack_from(data, offset)
+        offset += _PROJECTILE.size
+        p = core.projectile_pool.acquire(0, 0, 1, fields[n + 3:n + 6], 0, fields[n + 1], kind=PROJECTILE_KINDS[fields[n + 2]])
+        for name, value in zip(PROJECTILE_NUMBERS, _typed(fields[:n], fields[n])): # Slotted: no __dict__
+            setattr(p, name, value)
+        core.projectiles.append(p)
+
+    platforms = [_PLATFORM.unpack_from(data, offset + i * _PLATFORM.size) for i in range(platform_count)]
+    if platforms != [tuple(plat) for plat in core.platforms]: # They never move, so this is almost always skipped
+        core.platforms[:] = [pygame.Rect(rect) for rect in platforms]
+        core.rebuild_platform_grid()
+    core.screen_shake = screen_shake
+
+    if match_round is not None and has_round:
+        match_round.steps = steps
+        match_round.time_remaining = time_remaining
+        match_round.game_over_timer = game_over_timer
+        match_round.pending = ROUND_MESSAGES[pending]
+        match_round.result = ROUND_MESSAGES[result]
+
+
+class RewindBuffer:
+    """
+    Ring buffer of the last `seconds` of snapshots, one pushed per simulation
+    step. Once full, each push overwrites the oldest slot; nothing is allocated
+    beyond the snapshots themselves.
+    """
+    def __init__(self, seconds=REWIND_SECONDS, steps_per_second=core.FPS):
+        self.capacity = seconds * steps_per_second
+        self.slots = [None] * self.capacity
+        self.start = 0 # Slot of the oldest snapshot
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.slots = [None] * self.capacity
+        self.start = 0
+        self.count = 0
+
+    def push(self, data):
+        if self.count < self.capacity:
+            self.slots[(self.start + self.count) % self.capacity] = data
+            self.count += 1
+        else:
+            self.slots[self.start] = data
+            self.start = (self.start + 1) % self.capacity
+
+    def rewind(self, steps):
+        """
+        Returns the snapshot `steps` before the newest one (or the oldest kept)
+        and forgets everything after it, so play continues from there. None if empty.
+        """
+        if self.count == 0:
+            return None
+        self.count = max(1, self.count - steps)
+        return self.slots[(self.start + self.count - 1) % self.capacity]
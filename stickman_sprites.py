@@ -0,0 +1,374 @@
+"""
+Pre-rendered sprite caches for Stickman Fighter.
+
+Things the game used to rebuild from draw primitives every frame are
+rasterised once into surfaces here, so drawing them is a single blit.
+Surfaces are converted for the display, so build them after set_mode().
+The caches take gameplay coordinates and draw at `render_scale` (see
+stickman_view): sprites are rasterised for that scale once, not per draw.
+"""
+import math
+from collections import OrderedDict
+
+import pygame
+
+from stickman_core import BLACK, WHITE, RED, BLUE, ORANGE, YELLOW, Stickman, cosmetic_rng
+
+FIREBALL_PALETTE = (RED, ORANGE, YELLOW) # Outer glow, middle, core
+FIREBALL_FRAME_COUNT = 12 # Jittered variants per (palette, radius)
+FIREBALL_PADDING = 2 # Room for the middle ring's jitter
+AURA_FRAME_COUNT = 16 # Samples of the ultimate aura's pulse
+AURA_PULSE_RATE = 0.01 # Pulse phase (radians of sin) per millisecond
+STICKMAN_WALK_FRAMES = 12 # Samples of the walk cycle (walk_frame gains 0.5 a step, so a stride is ~12.6 steps)
+STICKMAN_SPRITE_LIMIT = 1024 # Cached stickman poses; the least recently drawn is dropped past this
+STICKMAN_PADDING = 16 # Room around the skeleton for gloves, horns and line width
+STICKMAN_COLORKEY = (255, 0, 255) # Transparent background of stickman sprites; no fighter is drawn in it
+# Every pose update_clone_ai can put a boss clone in: standing, walking, airborne
+# after the summon or knocked back, each with or without its punch
+CLONE_POSES = [(stance, walk, attack, False)
+               for stance, walk in [('stand', 0), ('air', 0), ('hit', 0)] + [('walk', i) for i in range(STICKMAN_WALK_FRAMES)]
+               for attack in (None, 'punch')]
+
+
+class FireballSprites:
+    """
+    Fireball animation frames keyed by (palette, radius).
+    Each frame bakes in one random jitter of the middle and core circles, so
+    picking a random frame per draw gives the old flicker for one blit.
+    """
+    def __init__(self, frame_count=FIREBALL_FRAME_COUNT):
+        self.frame_count = frame_count
+        self.frames = {}
+        self.render_scale = 1.0
+
+    def set_render_scale(self, scale):
+        """Drops the frames if `scale` differs from the one they were built at."""
+        if scale != self.render_scale:
+            self.render_scale = scale
+            self.clear()
+
+    def prepare(self, radius, palette=FIREBALL_PALETTE):
+        """Builds (or returns) the frames for one palette and radius."""
+        key = (palette, radius)
+        frames = self.frames.get(key)
+        if frames is None:
+            frames = [self._render_frame(radius, palette) for _ in range(self.frame_count)]
+            self.frames[key] = frames
+        return frames
+
+    def _render_frame(self, radius, palette):
+        outer_color, middle_color, core_color = palette
+        center = radius + FIREBALL_PADDING
+        surf = pygame.Surface((center * 2, center * 2), pygame.SRCALPHA)
+        pygame.draw.circle(surf, outer_color, (center, center), radius)
+        pygame.draw.circle(surf, middle_color, (center + cosmetic_rng.randint(-2, 2), center + cosmetic_rng.randint(-2, 2)), int(radius * 0.75))
+        pygame.draw.circle(surf, core_color, (center + cosmetic_rng.randint(-1, 1), center + cosmetic_rng.randint(-1, 1)), int(radius * 0.5))
+        if self.render_scale != 1.0:
+            size = max(1, round(center * 2 * self.render_scale))
+            surf = pygame.transform.smoothscale(surf, (size, size))
+        return surf.convert_alpha()
+
+    def draw(self, surface, x, y, radius, palette=FIREBALL_PALETTE):
+        """Blits a randomly chosen frame centred on (x, y) and returns the rect it covered."""
+        frame = cosmetic_rng.choice(self.prepare(radius, palette))
+        center = frame.get_width() / 2
+        return surface.blit(frame, (x * self.render_scale - center, y * self.render_scale - center))
+
+    def clear(self):
+        self.frames.clear()
+
+
+class AuraSprites:
+    """
+    The pulsing glow behind a fighter whose ultimate is ready (or who is
+    shadow barraging), keyed by colour. The pulse, radius 20-30 and alpha
+    100-150 following |sin|, is sampled into `frame_count` frames, and
+    draw() picks the one for the current time.
+    """
+    def __init__(self, frame_count=AURA_FRAME_COUNT):
+        self.frame_count = frame_count
+        self.frames = {}
+        self.render_scale = 1.0
+
+    def set_render_scale(self, scale):
+        """Drops the frames if `scale` differs from the one they were built at."""
+        if scale != self.render_scale:
+            self.render_scale = scale
+            self.clear()
+
+    def prepare(self, color):
+        """Builds (or returns) the pulse frames for one colour."""
+        key = tuple(color[:3])
+        frames = self.frames.get(key)
+        if frames is None:
+            frames = [self._render_frame(key, abs(math.sin(math.pi * (i + 0.5) / self.frame_count)))
+                      for i in range(self.frame_count)]
+            self.frames[key] = frames
+        return frames
+
+    def _render_frame(self, color, pulse):
+        radius = (20 + pulse * 10) * self.render_scale
+        surf = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(surf, (*color, 100 + pulse * 50), (radius, radius), radius)
+        return surf.convert_alpha()
+
+    def draw(self, surface, x, y, color, ticks):
+        """
+        Blits the frame for `ticks` (milliseconds) around (x, y), the middle
+        of the fighter, and returns the rect it covered.
+        """
+        phase = (ticks * AURA_PULSE_RATE) % math.pi / math.pi # |sin| repeats every pi
+        frame = self.prepare(color)[min(int(phase * self.frame_count), self.frame_count - 1)]
+        radius = frame.get_width() / 2
+        # Half a radius low, as the aura has always been drawn
+        return surface.blit(frame, (x * self.render_scale - radius, y * self.render_scale - radius / 2))
+
+    def clear(self):
+        self.frames.clear()
+
+
+def stickman_pose(stickman):
+    """
+    The discrete pose a stickman is drawn in: (stance, walk sample, attack, charging ult).
+    Stances follow the old if/elif order: hit, dash, block, air, walk, stand.
+    """
+    charging = stickman.is_ulting and stickman.ult_step == 1
+    walk = 0
+    if stickman.is_hit:
+        stance = 'hit'
+    elif stickman.is_dashing:
+        stance = 'dash'
+    elif stickman.is_blocking:
+        stance = 'block'
+    elif not stickman.on_ground:
+        stance = 'stand' if charging else 'air' # No jump pose while charging the ult
+    elif stickman.vel_x != 0:
+        stance = 'walk'
+        walk = round(stickman.walk_frame / math.tau * STICKMAN_WALK_FRAMES) % STICKMAN_WALK_FRAMES
+    else:
+        stance = 'stand'
+    return stance, walk, stickman.attack_type if stickman.is_attacking else None, charging
+
+
+def stickman_skin(stickman):
+    """'player' (headband, cape, gloves), 'enemy' (eyes, horns, belt, pads, hands) or 'clone' (bare)."""
+    if stickman.is_player:
+        return 'player'
+    return 'clone' if stickman.is_clone else 'enemy'
+
+
+class StickmanSprites:
+    """
+    Stickman bodies, rasterised once per (pose, direction, colour, size, skin)
+    and then blitted. The walk cycle is sampled into STICKMAN_WALK_FRAMES
+    frames, so a walking fighter is cached too. Bounded LRU like TextCache.
+    Sprites are colour-keyed and RLE-accelerated rather than per-pixel
+    alpha: the body is mostly empty space, and RLE blits skip it. An RGBA
+    colour (boss clones) gives the whole sprite that alpha, so the figure is
+    evenly translucent, overlapping limbs included.
+    Boss clone sprites from prepare_clones() are kept apart from the LRU and
+    never evicted.
+    """
+    def __init__(self, max_entries=STICKMAN_SPRITE_LIMIT):
+        self.max_entries = max_entries
+        self.entries = OrderedDict() # key -> (surface, (origin x, origin y))
+        self.pinned = {} # Clone sprites, same keys; until drop_clones()
+        self.clone_color = None # What prepare_clones() built them in, to rebuild at a new scale
+        self.hits = 0
+        self.misses = 0
+        self.render_scale = 1.0
+
+    def set_render_scale(self, scale):
+        """Drops the cached sprites if `scale` differs from the one they were drawn at (pinned clones are redrawn)."""
+        if scale != self.render_scale:
+            self.render_scale = scale
+            self.clear()
+            if self.clone_color is not None:
+                self.prepare_clones(self.clone_color)
+
+    def draw(self, surface, stickman, x, y, color):
+        """
+        Blits `stickman` in its current pose with its feet at (x, y), in
+        `color` (RGB or RGBA), and returns the rect it covered.
+        """
+        skin = stickman_skin(stickman)
+        ult_ready = skin == 'player' and stickman.has_ult_aura and stickman.ultimate_charge == stickman.max_ultimate_charge
+        key = (stickman_pose(stickman), stickman.direction, tuple(color), stickman.width, stickman.height,
+               stickman.scale, skin, ult_ready)
+        entry = self.pinned.get(key) if skin == 'clone' else None
+        if entry is not None:
+            self.hits += 1
+        else:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                entry = self.entries[key] = self._render(*key)
+                if len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+        sprite, (origin_x, origin_y) = entry
+        return surface.blit(sprite, (int(x * self.render_scale) - origin_x, int(y * self.render_scale) - origin_y))
+
+    def prepare_clones(self, color):
+        """
+        Builds every CLONE_POSES sprite in `color` up front (call at the start
+        of a boss level), so clones appearing mid-fight rasterise nothing.
+        They stay pinned, whatever the LRU evicts, until drop_clones().
+        """
+        self.pinned.clear()
+        self.clone_color = color
+        clone = Stickman(0, 0, color, is_player=False) # Clones keep the default size
+        for pose in CLONE_POSES:
+            for direction in (1, -1):
+                key = (pose, direction, tuple(color), clone.width, clone.height, clone.scale, 'clone', False)
+                self.pinned[key] = self._render(*key)
+
+    def drop_clones(self):
+        """Frees the pinned clone sprites (call when a level without a boss starts)."""
+        self.pinned.clear()
+        self.clone_color = None
+
+    def _render(self, pose, direction, color, width, height, scale, skin, ult_ready):
+        """Draws one pose into a new surface; returns it and where the feet point (x, y) is on it."""
+        stance, walk, attack, charging = pose
+        half_width = int(width * 0.8) + STICKMAN_PADDING
+        top = int(height * (0.9 + 0.1 * scale)) + STICKMAN_PADDING
+        sprite = pygame.Surface((half_width * 2, top + STICKMAN_PADDING)).convert()
+        sprite.fill(STICKMAN_COLORKEY)
+        alpha = color[3] if len(color) > 3 else None
+        color = color[:3]
+        x, y = half_width, top # The feet point; every joint below is relative to it
+
+        head_pos = (int(x), int(y - height * 0.9))
+        body_start = head_pos
+        body_end = (int(x), int(y - height * 0.4))
+        leg1_end = (int(x - width * 0.25 * direction), int(y))
+        leg2_end = (int(x + width * 0.25 * direction), int(y))
+        arm1_start = (int(x), int(y - height * 0.7))
+        arm2_start = arm1_start
+        arm1_end = (int(x - width * 0.4 * direction), int(y - height * 0.5))
+        arm2_end = (int(x + width * 0.4 * direction), int(y - height * 0.5))
+
+        if stance == 'hit':
+            # Jerk body and head back, pull arms and legs in
+            head_pos = (int(x - 5 * direction), int(y - height * 0.9))
+            body_end = (int(x - 3 * direction), int(y - height * 0.4))
+            arm1_end = (int(x - width * 0.2 * direction), int(y - height * 0.6))
+            arm2_end = (int(x + width * 0.2 * direction), int(y - height * 0.6))
+            leg1_end = (int(x - width * 0.1 * direction), int(y - 10))
+            leg2_end = (int(x + width * 0.1 * direction), int(y - 10))
+        elif stance == 'dash':
+            body_end = (int(x + width * 0.3 * direction), int(y - height * 0.4))
+            arm1_end = (int(x - width * 0.2 * direction), int(y - height * 0.5))
+            arm2_end = (int(x + width * 0.5 * direction), int(y - height * 0.5))
+            leg1_end = (int(x - width * 0.1 * direction), int(y))
+            leg2_end = (int(x + width * 0.1 * direction), int(y))
+        elif stance == 'block':
+            arm1_end = (int(x + width * 0.4 * direction), int(y - height * 0.8))
+            arm2_end = (int(x - width * 0.4 * direction), int(y - height * 0.8))
+            leg1_end = (int(x - width * 0.2 * direction), int(y))
+            leg2_end = (int(x + width * 0.2 * direction), int(y))
+        elif stance == 'air':
+            leg1_end = (int(x - width * 0.1 * direction), int(y - height * 0.2))
+            leg2_end = (int(x + width * 0.1 * direction), int(y - height * 0.2))
+            arm1_end = (int(x - width * 0.3 * direction), int(y - height * 0.8))
+            arm2_end = (int(x + width * 0.3 * direction), int(y - height * 0.8))
+        elif stance == 'walk':
+            leg_offset = math.sin(walk * math.tau / STICKMAN_WALK_FRAMES) * width * 0.3
+            leg1_end = (int(x - leg_offset), int(y))
+            leg2_end = (int(x + leg_offset), int(y))
+
+        # Attack poses override the stance's limbs
+        if attack == "punch" or attack == "shadow_punch":
+            reach = 0.8 if attack == "punch" else 0.7 # Shadow barrage: rapid, shorter jabs
+            fist = (int(x + width * reach * direction), int(y - height * 0.7))
+            if direction == 1:
+                arm2_end = fist
+            else:
+                arm1_end = fist
+        elif attack == "kick":
+            foot = (int(x + width * 0.6 * direction), int(y - height * 0.2))
+            if direction == 1:
+                leg2_end = foot
+            else:
+                leg1_end = foot
+        elif attack == "fireball":
+            arm1_end = (int(x + width * 0.6 * direction), int(y - height * 0.7))
+            arm2_end = (int(x + width * 0.6 * direction), int(y - height * 0.7))
+        elif attack == "air_kick":
+            leg1_end = (int(x + width * 0.4 * direction), int(y - height * 0.3))
+            leg2_end = (int(x - width * 0.1 * direction), int(y - height * 0.1))
+            arm1_end = (int(x - width * 0.3 * direction), int(y - height * 0.8))
+            arm2_end = (int(x + width * 0.3 * direction), int(y - height * 0.8))
+        elif attack == "ground_pound":
+            leg1_end = (int(x - width * 0.1 * direction), int(y - height * 0.2))
+            leg2_end = (int(x + width * 0.1 * direction), int(y - height * 0.2))
+            arm1_end = (int(x - width * 0.3 * direction), int(y - height * 0.3))
+            arm2_end = (int(x + width * 0.3 * direction), int(y - height * 0.3))
+        elif attack == "ultimate_pound":
+            leg1_end = (int(x - width * 0.2 * direction), int(y - height * 0.1))
+            leg2_end = (int(x + width * 0.2 * direction), int(y - height * 0.1))
+            arm1_end = (int(x - width * 0.4 * direction), int(y - height * 0.3))
+            arm2_end = (int(x + width * 0.4 * direction), int(y - height * 0.3))
+
+        if charging: # Arms raised while the ult charges
+            arm1_end = (int(x - width * 0.3 * direction), int(y - height * 0.8))
+            arm2_end = (int(x + width * 0.3 * direction), int(y - height * 0.8))
+
+        line_width = int(5 * scale)
+        pygame.draw.circle(sprite, color, head_pos, int(height * 0.1 * scale)) # Head
+        pygame.draw.line(sprite, color, body_start, body_end, line_width) # Body
+        pygame.draw.line(sprite, color, body_end, leg1_end, line_width) # Leg 1
+        pygame.draw.line(sprite, color, body_end, leg2_end, line_width) # Leg 2
+        pygame.draw.line(sprite, color, arm1_start, arm1_end, line_width) # Arm 1
+        pygame.draw.line(sprite, color, arm2_start, arm2_end, line_width) # Arm 2
+
+        if skin == 'player':
+            head_radius = int(height * 0.1 * scale)
+            pygame.draw.line(sprite, YELLOW if ult_ready else WHITE, # Headband
+                             (head_pos[0] - head_radius, head_pos[1]), (head_pos[0] + head_radius, head_pos[1]), 4)
+            pygame.draw.rect(sprite, BLUE, (int(x - 3 * direction), int(y - height * 0.65), 8, 30)) # Cape
+            glove_color = YELLOW if ult_ready else BLUE
+            pygame.draw.circle(sprite, glove_color, arm1_end, 8)
+            pygame.draw.circle(sprite, glove_color, arm2_end, 8)
+        elif skin == 'enemy': # Clones have no accessories
+            # Angry eyes
+            eye_y = head_pos[1] - int(height * 0.03)
+            eye_drop = int(height * 0.02)
+            pygame.draw.line(sprite, BLACK, (head_pos[0] + height * 0.02 * direction, eye_y),
+                             (head_pos[0] + height * 0.07 * direction, eye_y + eye_drop), 3)
+            pygame.draw.line(sprite, BLACK, (head_pos[0] - height * 0.07 * direction, eye_y + eye_drop),
+                             (head_pos[0] - height * 0.02 * direction, eye_y), 3)
+            # Horns
+            head_top_y = head_pos[1] - int(height * 0.1)
+            pygame.draw.line(sprite, RED, (head_pos[0] + 5 * direction, head_top_y), (head_pos[0] + 8 * direction, head_top_y - 10), 4)
+            pygame.draw.line(sprite, RED, (head_pos[0] - 5 * direction, head_top_y), (head_pos[0] - 8 * direction, head_top_y - 10), 4)
+            # Belt
+            pygame.draw.rect(sprite, RED, (x - 10, int(y - height * 0.4) - 3, 20, 6))
+            # Shoulder pads
+            shoulder_y = int(y - height * 0.7)
+            shoulder_x_off = int(width * 0.1) * direction
+            pygame.draw.rect(sprite, RED, (x - shoulder_x_off - 5, shoulder_y - 5, 10, 10))
+            pygame.draw.rect(sprite, RED, (x + shoulder_x_off - 5, shoulder_y - 5, 10, 10))
+            # Hands
+            pygame.draw.circle(sprite, RED, arm1_end, 8)
+            pygame.draw.circle(sprite, RED, arm2_end, 8)
+        if self.render_scale != 1.0:
+            # Nearest-neighbour, so no pixel blends into the colour key
+            sprite = pygame.transform.scale_by(sprite, self.render_scale)
+            x, y = int(x * self.render_scale), int(y * self.render_scale)
+        sprite.set_colorkey(STICKMAN_COLORKEY, pygame.RLEACCEL)
+        if alpha is not None:
+            sprite.set_alpha(alpha, pygame.RLEACCEL)
+        return sprite, (x, y)
+
+    def hit_rate(self):
+        """Fraction of draws served from the cache so far."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        self.entries.clear()
+        self.pinned.clear()
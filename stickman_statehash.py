@@ -0,0 +1,169 @@
+"""
+Per-step state hashes for finding where two simulations part ways.
+
+state_hash() is a CRC32 over the fighters, boss clones and projectiles,
+each value rounded to 1/HASH_QUANT first, so two runs that differ only by
+float noise in the last bits still hash the same. It costs 10-20
+microseconds, so replays record one for every step and netplay exchanges
+them continuously.
+
+state_fields() is the slow, readable twin: the same values by name
+("enemy.vel_x", "projectile[1].x", ...), for reporting what differs.
+
+Compare two recordings of the same match (e.g. made on two machines, or by
+the two sides of a netplay session), or one recording against this build:
+
+    python stickman_statehash.py replays/a.stkr replays/b.stkr
+    python stickman_statehash.py replays/a.stkr
+"""
+import argparse
+import struct
+import sys
+import zlib
+from operator import attrgetter
+
+import numpy as np
+
+import stickman_core as core
+
+HASH_QUANT = 16 # Values are compared to 1/16 (of a pixel, a hit point, a frame)
+
+STICKMAN_HASH_FIELDS = (
+    'x', 'y', 'vel_x', 'vel_y', 'direction', 'health', 'max_health', 'damage', 'speed',
+    'attack_frame', 'attack_cooldown', 'special_cooldown', 'dash_cooldown', 'teleport_cooldown',
+    'ultimate_charge', 'ult_step', 'ult_timer', 'combo_step', 'combo_timer', 'parry_window',
+    'is_stunned', 'hit_anim_timer', 'dash_invulnerability', 'death_anim_timer', 'air_dash_count',
+    'shockwave_cooldown', 'summon_cooldown',
+    'on_ground', 'is_attacking', 'is_blocking', 'is_dashing', 'is_ulting', 'is_hit', 'is_dying', 'is_alive',
+)
+PROJECTILE_HASH_FIELDS = ('x', 'y', 'vel', 'damage', 'is_player_projectile')
+
+_get_stickman = attrgetter(*STICKMAN_HASH_FIELDS)
+_get_projectile = attrgetter(*PROJECTILE_HASH_FIELDS)
+
+
+def state_hash():
+    """CRC32 of the quantised gameplay state after the current step."""
+    values = [len(core.clones), len(core.projectiles)]
+    values += _get_stickman(core.player)
+    values += _get_stickman(core.enemy)
+    for clone in core.clones:
+        values += _get_stickman(clone)
+    for p in core.projectiles:
+        values += _get_projectile(p)
+    # One vectorised rounding pass; np.rint rounds halves to even like round() in state_fields()
+    quantised = np.rint(np.array(values, dtype=np.float64) * HASH_QUANT).astype(np.int64)
+    return zlib.crc32(quantised.tobytes())
+
+
+def state_fields():
+    """[(name, quantised value)] covering exactly what state_hash() covers."""
+    fields = [('clones', len(core.clones) * HASH_QUANT), ('projectiles', len(core.projectiles) * HASH_QUANT)]
+    entities = [('player', core.player, STICKMAN_HASH_FIELDS), ('enemy', core.enemy, STICKMAN_HASH_FIELDS)]
+    entities += [(f'clone[{i}]', c, STICKMAN_HASH_FIELDS) for i, c in enumerate(core.clones)]
+    entities += [(f'projectile[{i}]', p, PROJECTILE_HASH_FIELDS) for i, p in enumerate(core.projectiles)]
+    for prefix, obj, names in entities:
+        fields += [(f'{prefix}.{name}', round(getattr(obj, name) * HASH_QUANT)) for name in names]
+    return fields
+
+
+def field_differences(fields_a, fields_b):
+    """[(name, value a, value b)] for every field that differs, in state order (values in real units)."""
+    a, b = dict(fields_a), dict(fields_b)
+    names = [name for name, _ in fields_a] + [name for name, _ in fields_b if name not in a]
+    return [(name, _units(a.get(name)), _units(b.get(name))) for name in names if a.get(name) != b.get(name)]
+
+
+def _units(value):
+    return None if value is None else value / HASH_QUANT
+
+
+def first_divergence(hashes_a, hashes_b):
+    """Index of the first step whose hashes differ (or where one list runs out), None if identical."""
+    for i, (a, b) in enumerate(zip(hashes_a, hashes_b)):
+        if a != b:
+            return i
+    if len(hashes_a) != len(hashes_b):
+        return min(len(hashes_a), len(hashes_b))
+    return None
+
+
+def fields_at(replay, step_index):
+    """Re-simulates `replay` through step_index and returns (its state_hash, state_fields()) there."""
+    match_round = replay.start()
+    for i in range(step_index + 1):
+        match_round.step(replay.keys(i))
+    return state_hash(), state_fields()
+
+
+def resimulate_hashes(replay):
+    """state_hash() after every recorded step, from a fresh headless run."""
+    match_round = replay.start()
+    hashes = []
+    for i in range(len(replay)):
+        match_round.step(replay.keys(i))
+        hashes.append(state_hash())
+    return hashes
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Find the first step where two recordings of a match, or a "
+                                                 "recording and this build, stop matching.")
+    parser.add_argument('replay', metavar='REPLAY', help="A .stkr file recorded with state hashes")
+    parser.add_argument('other', metavar='OTHER_REPLAY', nargs='?',
+                        help="Compare against this recording instead of re-simulating REPLAY")
+    return parser
+
+
+def main(argv=None):
+    from stickman_replay import Replay # stickman_replay imports this module
+
+    args = build_parser().parse_args(argv)
+    paths = [args.replay] if args.other is None else [args.replay, args.other]
+    core.set_cosmetics(False)
+    replays = []
+    for path in paths:
+        try:
+            replays.append(Replay.load(path))
+        except (OSError, ValueError, KeyError, struct.error, zlib.error) as e:
+            print(f"{path}: can't load ({e})")
+            return 2
+    for path, replay in zip(paths, replays):
+        if replay.hashes is None:
+            print(f"{path} was recorded without state hashes")
+            return 2
+
+    if len(replays) == 1:
+        # This build against the recording
+        replay = replays[0]
+        step = first_divergence(replay.hashes, resimulate_hashes(replay))
+        if step is None:
+            print(f"{paths[0]}: all {len(replay)} steps match")
+            return 0
+        print(f"{paths[0]}: this build diverges from the recording at step {step} "
+              f"({step / core.FPS:.2f}s); the recording only has hashes, so the fields can't be compared")
+        _, fields = fields_at(replay, step)
+        for name, value in fields:
+            print(f"    {name} = {value / HASH_QUANT:g}")
+        return 1
+
+    a, b = replays
+    step = first_divergence(a.hashes, b.hashes)
+    if step is None:
+        print(f"Identical for all {len(a.hashes)} steps")
+        return 0
+    print(f"First divergence at step {step} ({step / core.FPS:.2f}s)")
+    if step >= min(len(a.hashes), len(b.hashes)):
+        print("    (one recording simply ends there)")
+        return 1
+    hash_a, fields_a = fields_at(a, step)
+    hash_b, fields_b = fields_at(b, step)
+    for path, replay, ours in ((paths[0], a, hash_a), (paths[1], b, hash_b)):
+        if ours != replay.hashes[step]:
+            print(f"    warning: re-simulating {path} here doesn't reproduce its own hash; the values below are this build's")
+    for name, value_a, value_b in field_differences(fields_a, fields_b):
+        print(f"    {name}: {value_a} vs {value_b}")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+Text surface cache for Stickman Fighter.
+
+Font rasterisation is one of the most expensive things the game does per
+frame, and almost every string it draws (HUD labels, menus, floating combat
+text) is the same from one frame to the next. TextCache keeps the rendered
+surfaces around so each string is only rasterised once.
+"""
+from collections import OrderedDict
+
+import pygame
+
+
+class TextCache:
+    """
+    Bounded LRU cache of rendered text surfaces.
+    Keyed by (font, text, colour, antialias, scale); the least recently used entry is
+    dropped once max_entries is reached. Returned surfaces are shared, so
+    callers that change their alpha must restore it (see blit_faded).
+    """
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, antialias, color, scale=1.0):
+        """
+        Same arguments as font.render(text, antialias, color), but cached.
+        With `scale`, the text is rendered at the font's size and then
+        resized (for a scaled render target, see stickman_view).
+        """
+        key = (font, text, tuple(color), antialias, scale)
+        surf = self.entries.get(key)
+        if surf is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return surf
+
+        self.misses += 1
+        surf = font.render(text, antialias, color)
+        if scale != 1.0:
+            resize = pygame.transform.smoothscale_by if surf.get_bitsize() >= 24 else pygame.transform.scale_by
+            surf = resize(surf, scale)
+        self.entries[key] = surf
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False) # Evict least recently used
+        return surf
+
+    def blit_faded(self, surface, text_surf, dest, alpha):
+        """
+        Blits a cached surface at the given alpha without leaving it faded for
+        other users. Returns the rect it covered, like Surface.blit.
+        """
+        text_surf.set_alpha(alpha)
+        rect = surface.blit(text_surf, dest)
+        text_surf.set_alpha(None)
+        return rect
+
+    def hit_rate(self):
+        """Fraction of lookups served from the cache so far."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        """Drops every cached surface (e.g. after the fonts change). Counters are kept."""
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,185 @@
+"""
+Multi-process tournament runner for balance sweeps.
+
+Spreads the stickman_balance match grid (character x level x difficulty x
+power-up set) over a pool of worker processes. The grid is cut into chunks
+of matches; workers take chunks from a task queue, play them headless and
+stream the raw results back through a result queue. The parent puts each
+configuration's matches back in index order and summarises it as soon as
+its last chunk arrives, so memory stays flat however big the sweep is.
+
+Every match is seeded from its place in the grid (stickman_balance.match_seed),
+never from the worker that plays it, so the merged summary is identical for
+1 worker or 32.
+
+    python stickman_tournament.py --workers 32 --powerup-sets 1 --matches 200 --json sweep.json
+"""
+import os
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1') # Otherwise every worker prints the banner
+
+import itertools
+import json
+import multiprocessing
+import queue
+import sys
+import time
+
+import stickman_balance as balance
+from stickman_core import all_powerups
+
+DEFAULT_CHUNK_SIZE = 20 # Matches per task: big enough to amortise the queues, small enough to balance load
+RESULT_POLL_INTERVAL = 1.0 # Seconds between worker health checks while waiting for results
+
+
+def powerup_sets(size):
+    """Every combination of `size` distinct power-ups (by name); size 0 is just the empty set."""
+    return list(itertools.combinations([p['name'] for p in all_powerups], size))
+
+
+def build_grid(args):
+    """Every (character, level, difficulty, power-up set) the sweep covers, in report order."""
+    sets = []
+    for size in args.powerup_sets:
+        sets.extend(powerup_sets(size))
+    return [(character, level, difficulty, names)
+            for character in args.characters for level in args.levels
+            for difficulty in args.difficulties for names in sets]
+
+
+def make_tasks(grid, matches, chunk_size):
+    """Splits every configuration's matches into (config index, first match, end) chunks."""
+    return [(config_index, start, min(start + chunk_size, matches))
+            for config_index in range(len(grid)) for start in range(0, matches, chunk_size)]
+
+
+def worker(grid, settings, tasks, results):
+    """Worker process: plays chunks from `tasks` until it gets None, posting results as it goes."""
+    base_seed, controller, char_level, powerups = settings
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        config_index, start, end = task
+        character, level, difficulty, names = grid[config_index]
+        chunk = [balance.simulate_match(character, level, difficulty,
+                                        # Same seeds for every power-up set, so sets are compared on the same matches
+                                        balance.match_seed(base_seed, character, level, difficulty, i),
+                                        controller, char_level, powerups, names)
+                 for i in range(start, end)]
+        results.put((config_index, start, chunk))
+
+
+class Tournament:
+    """
+    Runs a sweep grid on `workers` processes and collects one summary per configuration.
+    summaries[i] is stickman_balance.summarize() of grid[i]'s matches, in match order.
+    """
+    def __init__(self, grid, matches, settings, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.grid = grid
+        self.matches = matches
+        self.settings = settings # (base_seed, controller, char_level, random powerups)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.summaries = [None] * len(grid)
+        self.game_seconds = 0.0
+
+    def run(self, on_summary=None):
+        """Plays the whole grid. on_summary(config_index, summary) is called as each configuration finishes."""
+        tasks = make_tasks(self.grid, self.matches, self.chunk_size)
+        task_queue = multiprocessing.Queue()
+        result_queue = multiprocessing.Queue()
+        for task in tasks:
+            task_queue.put(task)
+        for _ in range(self.workers):
+            task_queue.put(None) # One stop sentinel each
+
+        processes = [multiprocessing.Process(target=worker, args=(self.grid, self.settings, task_queue, result_queue), daemon=True)
+                     for _ in range(self.workers)]
+        for process in processes:
+            process.start()
+
+        pending = {} # config index -> [match results or None]
+        remaining = {} # config index -> matches still to come
+        try:
+            for _ in range(len(tasks)):
+                config_index, start, chunk = self._next_result(result_queue, processes)
+                slots = pending.get(config_index)
+                if slots is None:
+                    slots = pending[config_index] = [None] * self.matches
+                    remaining[config_index] = self.matches
+                slots[start:start + len(chunk)] = chunk
+                remaining[config_index] -= len(chunk)
+                self.game_seconds += sum(r['seconds'] for r in chunk)
+                if remaining[config_index] == 0:
+                    summary = balance.summarize(pending.pop(config_index))
+                    del remaining[config_index]
+                    self.summaries[config_index] = summary
+                    if on_summary:
+                        on_summary(config_index, summary)
+        finally:
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+        return self.summaries
+
+    def _next_result(self, result_queue, processes):
+        # A crashed worker never posts its chunk; fail instead of waiting forever
+        while True:
+            try:
+                return result_queue.get(timeout=RESULT_POLL_INTERVAL)
+            except queue.Empty:
+                crashed = [p.exitcode for p in processes if p.exitcode not in (None, 0)]
+                if crashed:
+                    raise RuntimeError(f"Tournament worker exited with code {crashed[0]}")
+
+
+def write_report(grid, summaries, args, path):
+    """Writes the sweep as a flat JSON list, one record per configuration, in grid order."""
+    report = {
+        'settings': {k: v for k, v in vars(args).items() if k not in ('json', 'workers', 'chunk_size')},
+        'results': [{'character': character, 'level': level, 'difficulty': difficulty,
+                     'powerups': list(names), 'summary': summary}
+                    for (character, level, difficulty, names), summary in zip(grid, summaries)],
+    }
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=4)
+
+
+def build_parser():
+    parser = balance.build_parser()
+    parser.description = "Run a balance sweep across every core and merge the results."
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes (default: all cores)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Matches per task")
+    parser.add_argument('--powerup-sets', type=int, nargs='+', default=[0],
+                        help="Sizes of power-up combinations to sweep, e.g. '0 1' = none, then each power-up alone")
+    parser.add_argument('--quiet', action='store_true', help="Only print the totals")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    grid = build_grid(args)
+    settings = (args.seed, args.player, args.char_level, args.powerups)
+    tournament = Tournament(grid, args.matches, settings, args.workers, args.chunk_size)
+    print(f"{len(grid)} configurations x {args.matches} matches on {tournament.workers} workers")
+
+    def report(config_index, summary):
+        if not args.quiet:
+            character, level, difficulty, names = grid[config_index]
+            row = balance.format_row(character, level, difficulty, summary)
+            print(row + (f"  [{' + '.join(names)}]" if names else ""))
+
+    start = time.perf_counter()
+    summaries = tournament.run(report)
+    wall = time.perf_counter() - start
+
+    print(f"{len(grid) * args.matches} matches, {tournament.game_seconds:.0f}s of game time in {wall:.1f}s "
+          f"({tournament.game_seconds / wall if wall else 0:.0f}x real time)")
+    if args.json:
+        write_report(grid, summaries, args, args.json)
+        print(f"Summary written to {args.json}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
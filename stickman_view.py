@@ -0,0 +1,74 @@
+"""
+Internal render target for Stickman Fighter fights.
+
+Gameplay always runs in SCREEN_WIDTH x SCREEN_HEIGHT coordinates, and the
+window always has that size. At render scale 1.0 (the default) fights draw
+straight into the window. Below 1.0 they draw into an off-screen surface of
+the scaled size (0.5 = 800x450 for 1600x900), and resolve() stretches it
+onto the window in one pass: the background, sprites and effects fill a
+quarter of the pixels, which is what caps the frame rate on low-end kiosks.
+
+Fight drawing maps gameplay coordinates through point()/length(); the
+sprite caches and the HUD render at the same scale. Menus and the profiler
+overlay draw into the window at full resolution as before.
+"""
+import math
+
+import pygame
+
+from stickman_core import SCREEN_WIDTH, SCREEN_HEIGHT
+
+
+def parse_resolution(text):
+    """'800x450' -> render scale (0.5 for a 1600x900 game). The aspect ratio must match the game's."""
+    width, _, height = text.lower().partition('x')
+    width, height = int(width), int(height)
+    scale = width / SCREEN_WIDTH
+    if not 0 < scale <= 1 or height != round(SCREEN_HEIGHT * scale):
+        raise ValueError(f"{text}: expected WxH at most {SCREEN_WIDTH}x{SCREEN_HEIGHT}, in the same aspect ratio")
+    return scale
+
+
+class RenderTarget:
+    """
+    Where fights are drawn: `surface`, at `scale` of the window's size. At
+    scale 1.0 it is the window itself and resolve() has nothing to do.
+    Create it after set_mode(); the surface is converted for the display.
+    """
+    def __init__(self, window, scale=1.0):
+        self.window = window
+        self.scale = None
+        self.surface = None
+        self.set_scale(scale)
+
+    def set_scale(self, scale):
+        """Switches to a render target at `scale` (0 < scale <= 1)."""
+        if scale == self.scale:
+            return
+        if scale == 1.0:
+            self.surface = self.window
+        else:
+            size = (round(SCREEN_WIDTH * scale), round(SCREEN_HEIGHT * scale))
+            self.surface = pygame.Surface(size).convert()
+        self.scale = scale
+
+    def point(self, x, y):
+        """Gameplay coordinates -> position on `surface` (unrounded, like the coordinates pygame takes)."""
+        return x * self.scale, y * self.scale
+
+    def length(self, value, minimum=1):
+        """A gameplay-space size in `surface` pixels, never below `minimum`."""
+        return max(minimum, int(value * self.scale))
+
+    def to_window(self, rect):
+        """A rect on `surface` -> the window pixels resolve() stretches it over."""
+        if self.scale == 1.0:
+            return rect
+        left, top = math.floor(rect.left / self.scale), math.floor(rect.top / self.scale)
+        right, bottom = math.ceil(rect.right / self.scale), math.ceil(rect.bottom / self.scale)
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def resolve(self):
+        """Stretches the finished frame onto the window (nearest neighbour, one pass)."""
+        if self.surface is not self.window:
+            pygame.transform.scale(self.surface, self.window.get_size(), self.window)
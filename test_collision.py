@@ -0,0 +1,93 @@
+"""SpatialGrid must give exactly the answers (and order) of a plain list scan."""
+import random
+
+import pygame
+import pytest
+
+from stickman_collision import SpatialGrid, LINEAR_SCAN_LIMIT, BODY, ATTACK, PROJECTILE, PLAYER_TEAM, ENEMY_TEAM
+
+
+def random_entries(rng, count):
+    """(name, rect, kind, team) tuples scattered over a 1600x900 field, some of them overlapping."""
+    entries = []
+    for i in range(count):
+        rect = pygame.Rect(rng.randrange(0, 1600), rng.randrange(0, 900), rng.randrange(1, 200), rng.randrange(1, 200))
+        entries.append((f"obj{i}", rect, rng.choice((BODY, ATTACK, PROJECTILE)), rng.choice((PLAYER_TEAM, ENEMY_TEAM))))
+    return entries
+
+
+def filled_grid(entries):
+    grid = SpatialGrid()
+    for name, rect, kind, team in entries:
+        grid.insert(name, rect, kind, team)
+    return grid
+
+
+def scan_query(entries, rect, kind=None, team=None):
+    return [name for name, r, k, t in entries
+            if r.colliderect(rect) and (kind is None or k == kind) and (team is None or t == team)]
+
+
+def scan_pairs(entries, kind_a, team_a, kind_b, team_b):
+    return [(a[0], b[0]) for i, a in enumerate(entries) for j, b in enumerate(entries)
+            if i != j and a[2:] == (kind_a, team_a) and b[2:] == (kind_b, team_b) and a[1].colliderect(b[1])]
+
+
+# Below and above LINEAR_SCAN_LIMIT, so both the linear path and the cells are covered
+@pytest.mark.parametrize('count', [3, LINEAR_SCAN_LIMIT, LINEAR_SCAN_LIMIT + 1, 200])
+def test_query_matches_list_scan(count):
+    rng = random.Random(count)
+    entries = random_entries(rng, count)
+    grid = filled_grid(entries)
+    for _ in range(50):
+        probe = pygame.Rect(rng.randrange(-100, 1600), rng.randrange(-100, 900), rng.randrange(1, 400), rng.randrange(1, 400))
+        assert grid.query(probe) == scan_query(entries, probe)
+        assert grid.query(probe, BODY, ENEMY_TEAM) == scan_query(entries, probe, BODY, ENEMY_TEAM)
+        assert grid.query(probe, team=PLAYER_TEAM) == scan_query(entries, probe, team=PLAYER_TEAM)
+
+
+@pytest.mark.parametrize('count', [5, 200])
+def test_colliding_pairs_match_list_scan_in_insertion_order(count):
+    entries = random_entries(random.Random(count), count)
+    grid = filled_grid(entries)
+    assert (grid.colliding_pairs(PROJECTILE, PLAYER_TEAM, PROJECTILE, ENEMY_TEAM)
+            == scan_pairs(entries, PROJECTILE, PLAYER_TEAM, PROJECTILE, ENEMY_TEAM))
+    assert (grid.colliding_pairs(PROJECTILE, PLAYER_TEAM, BODY, ENEMY_TEAM)
+            == scan_pairs(entries, PROJECTILE, PLAYER_TEAM, BODY, ENEMY_TEAM))
+
+
+@pytest.mark.parametrize('count', [5, 200])
+def test_pairs_within_one_kind_and_team_skip_self(count):
+    entries = random_entries(random.Random(count), count)
+    grid = filled_grid(entries)
+    pairs = grid.colliding_pairs(BODY, PLAYER_TEAM, BODY, PLAYER_TEAM)
+    assert pairs == scan_pairs(entries, BODY, PLAYER_TEAM, BODY, PLAYER_TEAM)
+    assert all(a != b for a, b in pairs)
+
+
+def test_pair_spanning_many_cells_is_reported_once():
+    grid = SpatialGrid()
+    for i in range(LINEAR_SCAN_LIMIT): # Filler far away, to get past the linear path
+        grid.insert(f"far{i}", pygame.Rect(1500, 800, 1, 1), BODY, ENEMY_TEAM)
+    grid.insert("big", pygame.Rect(0, 0, 500, 500), PROJECTILE, PLAYER_TEAM)
+    grid.insert("also big", pygame.Rect(100, 100, 500, 500), PROJECTILE, ENEMY_TEAM)
+    assert grid.colliding_pairs(PROJECTILE, PLAYER_TEAM, PROJECTILE, ENEMY_TEAM) == [("big", "also big")]
+
+
+def test_zero_area_rect_never_collides():
+    grid = SpatialGrid()
+    grid.insert("gone", pygame.Rect(0, 0, 0, 0), BODY, ENEMY_TEAM)
+    grid.insert("fireball", pygame.Rect(-10, -10, 20, 20), PROJECTILE, PLAYER_TEAM)
+    assert grid.query(pygame.Rect(-10, -10, 20, 20), BODY) == []
+    assert grid.colliding_pairs(PROJECTILE, PLAYER_TEAM, BODY, ENEMY_TEAM) == []
+
+
+def test_clear_forgets_everything_and_rebuilds_cells():
+    entries = random_entries(random.Random(7), 100)
+    grid = filled_grid(entries)
+    everything = pygame.Rect(-1000, -1000, 4000, 4000)
+    assert len(grid.query(everything)) == 100
+    grid.clear()
+    assert len(grid) == 0 and grid.query(everything) == []
+    grid.insert("only", pygame.Rect(10, 10, 5, 5), BODY, PLAYER_TEAM)
+    assert grid.query(everything) == ["only"]
@@ -0,0 +1,71 @@
+"""ObjectPool capacity, overflow and release accounting."""
+from stickman_core import Projectile, TextAnimation
+from stickman_pool import ObjectPool
+
+
+def fireball(pool):
+    return pool.acquire(0, 0, 1, (255, 0, 0), 10, True)
+
+
+def test_acquire_reuses_released_objects():
+    pool = ObjectPool(Projectile, 2)
+    first = fireball(pool)
+    pool.release(first)
+    assert fireball(pool) is first
+    assert pool.in_use == 1
+
+
+def test_acquire_resets_the_object():
+    pool = ObjectPool(Projectile, 1)
+    p = pool.acquire(5, 6, 1, (1, 2, 3), 10, True)
+    p.x = 999
+    pool.release(p)
+    p = pool.acquire(7, 8, -1, (4, 5, 6), 20, False, kind='shockwave')
+    assert (p.x, p.y, p.direction, p.damage, p.is_player_projectile, p.kind) == (7, 8, -1, 20, False, 'shockwave')
+
+
+def test_exhausted_pool_drops_without_overflow():
+    pool = ObjectPool(Projectile, 2)
+    fireball(pool), fireball(pool)
+    assert fireball(pool) is None
+    assert pool.stats() == {'in_use': 2, 'capacity': 2, 'high_water': 2, 'dropped': 1, 'overflowed': 0}
+
+
+def test_overflow_objects_are_built_and_not_taken_back():
+    pool = ObjectPool(Projectile, 1, overflow=True)
+    pooled = fireball(pool)
+    extra = fireball(pool)
+    assert isinstance(extra, Projectile) and extra is not pooled
+    pool.release(extra)
+    assert pool.in_use == 1 and pool.overflowed == 1 and pool.free == []
+    pool.release(pooled)
+    assert pool.in_use == 0 and pool.free == [pooled]
+
+
+def test_second_release_is_ignored():
+    pool = ObjectPool(Projectile, 2)
+    p = fireball(pool)
+    live = [p]
+    pool.release(p)
+    pool.release_all(live) # Already back: must not go on the free list twice
+    assert live == [] and pool.in_use == 0 and len(pool.free) == 2
+    a, b = fireball(pool), fireball(pool)
+    assert a is not b
+    assert fireball(pool) is None
+
+
+def test_foreign_objects_are_ignored():
+    pool = ObjectPool(Projectile, 1)
+    pool.release(Projectile())
+    assert pool.in_use == 0 and len(pool.free) == 1
+
+
+def test_high_water_and_reset_stats():
+    pool = ObjectPool(TextAnimation, 4)
+    texts = [pool.acquire("hit", 0, 0, (255, 255, 255), 'main', 30) for _ in range(3)]
+    pool.release_all(texts)
+    assert pool.high_water == 3 and pool.in_use == 0
+    kept = pool.acquire("hit", 0, 0, (255, 255, 255), 'main', 30)
+    pool.reset_stats()
+    assert pool.high_water == 1 and pool.dropped == 0 # Restarts from what is out now
+    pool.release(kept)
@@ -0,0 +1,109 @@
+"""STKR recordings: what is saved loads back unchanged, and plays back to the same match."""
+import json
+import random
+import struct
+import zlib
+
+import pygame
+import pytest
+
+import stickman_core as core
+from stickman_replay import (MatchRecorder, Replay, MaskKeys, REPLAY_KEYS, REPLAY_MAGIC, keys_to_mask, run_headless,
+                             main)
+
+SEED = 20261017
+
+
+@pytest.fixture(autouse=True)
+def headless():
+    core.set_cosmetics(False)
+    yield
+    core.set_cosmetics(True)
+
+
+def record_match(steps=900, level=3, seed=SEED):
+    """Plays `steps` steps of random button mashing on a recorder; returns (recorder, result)."""
+    stats = core.new_player_stats("Agile")
+    recorder = MatchRecorder(seed, "Agile", level, "Medium", stats)
+    core.seed_match(seed)
+    core.setup_level(stats, "Agile", level, "Medium")
+    match_round = core.Round(level)
+    mashing = random.Random(seed)
+    result = ""
+    for _ in range(steps):
+        keys = MaskKeys(mashing.getrandbits(len(REPLAY_KEYS)))
+        recorder.record(keys)
+        result = match_round.step(keys) or result
+        recorder.record_state()
+    return recorder, result
+
+
+@pytest.fixture(scope='module')
+def recording(tmp_path_factory):
+    core.set_cosmetics(False)
+    recorder, result = record_match()
+    path = tmp_path_factory.mktemp('replays') / 'match.stkr'
+    recorder.save(path, result)
+    return recorder, result, path
+
+
+def test_keys_survive_the_mask():
+    for mask in (0, 1, 0b1010101010, (1 << len(REPLAY_KEYS)) - 1):
+        keys = MaskKeys(mask)
+        assert keys_to_mask(keys) == mask
+        assert [keys[k] for k in REPLAY_KEYS] == [bool(mask >> bit & 1) for bit in range(len(REPLAY_KEYS))]
+    assert not MaskKeys(0xFFFF)[pygame.K_ESCAPE] # Keys the simulation doesn't read are never held
+
+
+def test_load_gives_back_what_was_saved(recording):
+    recorder, result, path = recording
+    replay = Replay.load(path)
+    assert replay.seed == SEED
+    assert list(replay.masks) == list(recorder.masks)
+    assert list(replay.hashes) == list(recorder.hashes)
+    assert (replay.character, replay.level, replay.difficulty) == ("Agile", 3, "Medium")
+    assert replay.meta['result'] == result and replay.meta['frames'] == len(recorder.masks)
+    assert not replay.keys(len(replay))[pygame.K_j] # Nothing held past the end
+
+
+def test_replay_reproduces_recorded_hashes(recording):
+    _, _, path = recording
+    replay = Replay.load(path)
+    result, digest, diverged, _ = run_headless(replay)
+    assert diverged is None
+    assert result == replay.meta['result'] and digest == replay.meta['digest']
+
+
+def test_changed_input_is_caught_at_its_step(recording):
+    _, _, path = recording
+    replay = Replay.load(path)
+    for step in range(30, 90): # Walk left for a second instead of mashing
+        replay.masks[step] = 1 << REPLAY_KEYS.index(pygame.K_a)
+    _, _, diverged, _ = run_headless(replay)
+    assert diverged is not None and 30 <= diverged < 90
+
+
+def test_version_1_files_load_without_hashes(tmp_path, recording):
+    recorder, _, _ = recording
+    meta = json.dumps(dict(recorder.meta, result="", digest=0)).encode('utf-8')
+    path = tmp_path / 'old.stkr'
+    path.write_bytes(struct.pack('<4sBQI', REPLAY_MAGIC, 1, SEED, len(meta)) + meta
+                     + zlib.compress(recorder.masks.tobytes()))
+    replay = Replay.load(path)
+    assert replay.hashes is None
+    assert list(replay.masks) == list(recorder.masks)
+
+
+def test_other_files_are_refused(tmp_path):
+    path = tmp_path / 'not-a-replay.stkr'
+    path.write_bytes(b'PK\x03\x04' + bytes(64))
+    with pytest.raises(ValueError):
+        Replay.load(path)
+
+
+def test_checker_exit_codes(recording, tmp_path, capsys):
+    _, _, path = recording
+    assert main([str(path)]) == 0
+    assert main([str(tmp_path / 'missing.stkr')]) == 1
+    assert 'reproduced' in capsys.readouterr().out
+
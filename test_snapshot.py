@@ -0,0 +1,99 @@
+"""Snapshots must put a match back exactly, and RewindBuffer must keep the right ones."""
+import pytest
+
+import stickman_core as core
+from stickman_replay import MaskKeys
+from stickman_snapshot import snapshot, restore, RewindBuffer
+from stickman_statehash import state_hash
+
+NO_KEYS = MaskKeys(0)
+
+
+@pytest.fixture(autouse=True)
+def headless():
+    core.set_cosmetics(False)
+    yield
+    core.set_cosmetics(True)
+
+
+def start_match(level, seed=1234, difficulty="Medium"):
+    core.seed_match(seed)
+    core.setup_level(core.new_player_stats("Brawler"), "Brawler", level, difficulty)
+    return core.Round(level, player_ai=True)
+
+
+def run(match_round, steps):
+    """state_hash() after each of `steps` AI-vs-AI steps."""
+    hashes = []
+    for _ in range(steps):
+        match_round.step(NO_KEYS)
+        hashes.append(state_hash())
+    return hashes
+
+
+def busy_moment(match_round, limit=3000):
+    """Steps until there are projectiles (and, on the boss level, clones) in play."""
+    if core.enemy.is_boss:
+        core.enemy.health = core.enemy.max_health * 0.7 # Below the summon threshold
+    for _ in range(limit):
+        if core.projectiles and (core.clones or not core.enemy.is_boss):
+            return
+        match_round.step(NO_KEYS)
+    pytest.skip("the AI never got clones and projectiles out at once")
+
+
+@pytest.mark.parametrize('level', [1, 10])
+def test_restore_replays_the_same_steps(level):
+    match_round = start_match(level)
+    busy_moment(match_round)
+    data = snapshot(match_round)
+    first = run(match_round, 300)
+    restore(data, match_round)
+    assert run(match_round, 300) == first
+
+
+def test_restore_round_trips_bytes_and_round_timer():
+    match_round = start_match(10)
+    busy_moment(match_round)
+    data = snapshot(match_round)
+    steps, time_remaining = match_round.steps, match_round.time_remaining
+    run(match_round, 120)
+    restore(data, match_round)
+    assert snapshot(match_round) == data
+    assert (match_round.steps, match_round.time_remaining) == (steps, time_remaining)
+
+
+def test_restore_keeps_fighter_objects():
+    match_round = start_match(1)
+    player, enemy = core.player, core.enemy
+    data = snapshot(match_round)
+    run(match_round, 60)
+    restore(data, match_round)
+    assert core.player is player and core.enemy is enemy
+
+
+def test_restore_rejects_other_data():
+    start_match(1)
+    with pytest.raises(ValueError):
+        restore(b'STKR' + bytes(200))
+
+
+def test_rewind_buffer_wraps_around():
+    buffer = RewindBuffer(seconds=1, steps_per_second=4)
+    for i in range(10): # Capacity 4: only 6..9 stay
+        buffer.push(i)
+    assert len(buffer) == 4
+    assert buffer.rewind(0) == 9
+    assert buffer.rewind(2) == 7 # ... and 8 and 9 are forgotten
+    assert len(buffer) == 2
+    buffer.push(10) # Goes after 7, not after the overwritten 9
+    assert buffer.rewind(1) == 7
+    assert buffer.rewind(100) == 6 # Never past the oldest kept
+
+
+def test_rewind_buffer_empty_and_clear():
+    buffer = RewindBuffer(seconds=1, steps_per_second=3)
+    assert buffer.rewind(1) is None
+    buffer.push('a')
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.rewind(0) is None
@@ -0,0 +1,60 @@
+"""state_hash() quantisation and the divergence helpers."""
+import pytest
+
+import stickman_core as core
+from stickman_statehash import HASH_QUANT, state_hash, state_fields, field_differences, first_divergence
+
+
+@pytest.fixture(autouse=True)
+def level():
+    core.seed_match(7)
+    core.setup_level(core.new_player_stats("Tank"), "Tank", 1, "Medium")
+
+
+def test_float_noise_hashes_the_same():
+    before = state_hash()
+    core.player.x += 1e-9
+    core.enemy.vel_y -= 1e-12
+    assert state_hash() == before
+
+
+def test_a_sixteenth_changes_the_hash():
+    before = state_hash()
+    core.enemy.health -= 1 / HASH_QUANT
+    assert state_hash() != before
+
+
+def test_hash_covers_clones_and_projectiles():
+    before = state_hash()
+    core.projectiles.append(core.Projectile(100, 100, 1, core.RED, 10, True))
+    with_projectile = state_hash()
+    assert with_projectile != before
+    core.clones.append(core.Stickman(300, core.GROUND_Y, core.BLACK, is_player=False))
+    assert state_hash() != with_projectile
+    core.projectiles.clear()
+    core.clones.clear()
+    assert state_hash() == before
+
+
+@pytest.mark.parametrize('offset', [0.5, 1.5, 2.5, -0.5]) # Exact halves of a 1/16 step
+def test_halves_round_like_state_fields(offset):
+    # state_hash (np.rint) and state_fields (round) must agree, or the diff tool blames the wrong field
+    core.player.x = 500 + offset / HASH_QUANT
+    moved = state_hash()
+    x_field = dict(state_fields())['player.x']
+    core.player.x = x_field / HASH_QUANT # Exactly on the grid the field reports
+    assert state_hash() == moved
+
+
+def test_field_differences_names_the_changed_field():
+    before = state_fields()
+    core.enemy.health -= 5
+    diffs = field_differences(before, state_fields())
+    assert diffs == [('enemy.health', core.enemy.health + 5, core.enemy.health)]
+
+
+def test_first_divergence():
+    assert first_divergence([1, 2, 3], [1, 2, 3]) is None
+    assert first_divergence([1, 2, 3], [1, 9, 3]) == 1
+    assert first_divergence([1, 2, 3], [1, 2]) == 2 # One run simply ends there
+    assert first_divergence([], []) is None